@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+SQLite article database
+One durable table of articles keyed by canonical URL. Saving an article that is already
+stored updates it in place (upsert), so reruns, re-extraction and overlapping scrapes never
+create duplicates. Queries filter on indexed newspaper, category and date columns, and an
+FTS5 index over title and body answers full-text searches. Rows only hold the content_hash
+and snippet of a body: the text itself stays in the body store, and the index is contentless,
+so it keeps the search terms but not a second copy of the text.
+
+The database is the source of truth for articles and clusters: cluster_articles.py and
+process_scraped_data.py read articles from it and save their clusters to it, and the web
+app's cluster views query it. static/cluster_data.json is written as an export.
+
+    python article_db.py import news_data/all_articles.csv   # load articles from a CSV file
+    python article_db.py search "fuel prices"                 # full-text search
+"""
+import os
+import re
+import html
+import sqlite3
+import argparse
+import threading
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from scrape_frontier import canonical_url
+from article_record import Article, clean_value
+from article_store import DEFAULT_CSV, load_articles
+from body_store import BodyStore, make_snippet, normalize_text
+
+logger = logging.getLogger(__name__)
+
+DATABASE_COLUMNS = ['newspaper', 'category', 'title', 'url', 'content_hash', 'snippet', 'date_scraped']
+# Rows looked up per query when the full-text index of an upserted batch is updated
+LOOKUP_CHUNK_ROWS = 500
+
+
+class ArticleDatabase:
+    """SQLite table of articles with upsert by canonical URL and full-text search"""
+
+    def __init__(self, db_path='news_data/articles.db', bodies=None):
+        self.db_path = db_path
+        # Where the bodies of the articles are kept
+        self.bodies = bodies or BodyStore()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    url_key TEXT NOT NULL UNIQUE,
+                    url TEXT NOT NULL,
+                    newspaper TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    title TEXT,
+                    content_hash TEXT,
+                    snippet TEXT,
+                    indexed_hash TEXT,
+                    date_scraped TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            for column in ('newspaper', 'category', 'date_scraped'):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_articles_{column} ON articles ({column})")
+            # The clusters of the last clustering run, article by article in the order they were saved
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS clusters (
+                    position INTEGER PRIMARY KEY,
+                    cluster_id TEXT NOT NULL,
+                    article_id INTEGER NOT NULL REFERENCES articles (id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_clusters_cluster_id ON clusters (cluster_id)")
+            self.full_text = self._create_full_text_index()
+
+    def _create_full_text_index(self):
+        """Create the contentless FTS5 index; False if SQLite lacks FTS5"""
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS articles_text USING fts5(title, body, content='')")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search is unavailable: {str(e)}")
+            return False
+        return True
+
+    def _lookup(self, columns, url_keys):
+        """Yield the `columns` of the stored articles with these url_keys"""
+        for start in range(0, len(url_keys), LOOKUP_CHUNK_ROWS):
+            chunk = url_keys[start:start + LOOKUP_CHUNK_ROWS]
+            yield from self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM articles WHERE url_key IN ({', '.join('?' * len(chunk))})", chunk)
+
+    def _index(self, row_id, title, body, command=None):
+        """Add (or with command='delete' remove) the index entry of an article
+
+        Bodies are indexed in their normalised form, the text their content_hash is taken
+        of, so an entry can be removed again with whichever copy the body store kept.
+        """
+        if command is None:
+            self._conn.execute("INSERT INTO articles_text (rowid, title, body) VALUES (?, ?, ?)",
+                               (row_id, title or '', normalize_text(body or '')))
+        else:
+            self._conn.execute("INSERT INTO articles_text (articles_text, rowid, title, body) VALUES (?, ?, ?, ?)",
+                               (command, row_id, title or '', normalize_text(body or '')))
+
+    def _rebuild_full_text_index(self):
+        """Index every article again from the body store"""
+        self._conn.execute("INSERT INTO articles_text (articles_text) VALUES ('delete-all')")
+        rows = self._conn.execute("SELECT id, title, content_hash FROM articles").fetchall()
+        for row_id, title, key in rows:
+            body = self.bodies.get(key) if key else None
+            self._index(row_id, title, body)
+            self._conn.execute("UPDATE articles SET indexed_hash = ? WHERE id = ?", (key if body else None, row_id))
+        logger.info(f"Indexed {len(rows)} articles of {self.db_path} for full-text search")
+
+    def _update_full_text_index(self, bodies, previous):
+        """Index upserted articles whose title or body changed
+
+        `bodies` maps url_key to the body just saved (None if unknown) and `previous` maps
+        url_key to the (id, title, indexed_hash) the index held before the upsert. A
+        contentless index can only drop an entry given the text it was made from, which
+        is read back from the body store.
+        """
+        rows = list(self._lookup(['url_key', 'id', 'title', 'content_hash'], list(bodies)))
+        for url_key, row_id, title, key in rows:
+            old = previous.get(url_key)
+            body = bodies[url_key]
+            if body is None and key:
+                body = self.bodies.get(key)
+            indexed_hash = key if body else None
+            if old is not None and (old[1], old[2]) == (title, indexed_hash):
+                continue
+            if old is not None:
+                old_body = self.bodies.get(old[2]) if old[2] else ''
+                if old_body is None:
+                    # The indexed text is gone from the body store, so the entry cannot be removed
+                    logger.warning(f"Body {old[2]} is missing from the body store, rebuilding the full-text index")
+                    self._rebuild_full_text_index()
+                    return
+                self._index(row_id, old[1], old_body, command='delete')
+            self._index(row_id, title, body)
+            self._conn.execute("UPDATE articles SET indexed_hash = ? WHERE id = ?", (indexed_hash, row_id))
+
+    def _body(self, article):
+        """Return (content, content_hash, snippet) of an article; bodies that come with it are put in the store"""
+        content = clean_value(article.get('content')) or None
+        key = clean_value(article.get('content_hash')) or None
+        snippet = clean_value(article.get('snippet')) or None
+        if content is not None:
+            key = self.bodies.put(content, key)
+            snippet = snippet or make_snippet(content)
+        return content, key, snippet
+
+    def upsert(self, articles):
+        """Insert or update articles (Articles or dicts with the CSV columns) in one transaction
+
+        An article that is already stored gets the new title, body and category but keeps
+        the date it was first scraped; an article without a body keeps the stored one.
+        Returns the number of articles written.
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        rows, bodies = [], {}
+        for article in articles:
+            if not article.get('url'):
+                continue
+            url_key = canonical_url(article['url'])
+            content, key, snippet = self._body(article)
+            rows.append((url_key, article['url'], article['newspaper'], article['category'],
+                         article.get('title'), key, snippet, article.get('date_scraped') or now[:10], now))
+            bodies[url_key] = content
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            previous = {}
+            if self.full_text:
+                previous = {url_key: (row_id, title, indexed_hash) for url_key, row_id, title, indexed_hash
+                            in self._lookup(['url_key', 'id', 'title', 'indexed_hash'], list(bodies))}
+            self._conn.executemany("""
+                INSERT INTO articles (url_key, url, newspaper, category, title, content_hash, snippet,
+                                      date_scraped, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url_key) DO UPDATE SET
+                    url = excluded.url, newspaper = excluded.newspaper, category = excluded.category,
+                    title = excluded.title, content_hash = COALESCE(excluded.content_hash, content_hash),
+                    snippet = COALESCE(excluded.snippet, snippet), updated_at = excluded.updated_at
+            """, rows)
+            if self.full_text:
+                self._update_full_text_index(bodies, previous)
+        return len(rows)
+
+    def _where(self, newspapers=None, categories=None, since=None, until=None):
+        clauses, params = [], []
+        if newspapers:
+            clauses.append(f"newspaper IN ({', '.join('?' * len(newspapers))})")
+            params.extend(newspapers)
+        if categories:
+            clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        if since:
+            clauses.append("date_scraped >= ?")
+            params.append(str(since))
+        if until:
+            clauses.append("date_scraped <= ?")
+            params.append(str(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _columns(self, columns):
+        columns = columns or DATABASE_COLUMNS
+        unknown = [column for column in columns if column not in DATABASE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown article columns: {', '.join(unknown)}")
+        return columns
+
+    def query(self, columns=None, newspapers=None, categories=None, since=None, until=None, limit=None):
+        """Return matching articles as dicts, oldest first"""
+        columns = self._columns(columns)
+        where, params = self._where(newspapers, categories, since, until)
+        sql = f"SELECT {', '.join(columns)} FROM articles{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def articles(self, newspapers=None, categories=None, since=None, until=None, with_content=True):
+        """Return matching articles as Article records, oldest first
+
+        With with_content=True the bodies are read from the body store; otherwise
+        `content` is None and articles only carry their snippet.
+        """
+        where, params = self._where(newspapers, categories, since, until)
+        sql = (f"SELECT newspaper, category, title, url, date_scraped, content_hash, snippet "
+               f"FROM articles{where} ORDER BY id")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [Article(newspaper, category, title, url, self.bodies.get(key) if with_content else None,
+                        date_scraped, key, snippet)
+                for newspaper, category, title, url, date_scraped, key, snippet in rows]
+
+    def read(self, columns=None, newspapers=None, categories=None, since=None, until=None):
+        """Return matching articles as a DataFrame with the requested columns"""
+        columns = self._columns(columns)
+        return pd.DataFrame(self.query(columns, newspapers, categories, since, until), columns=columns)
+
+    def categories(self):
+        """Return the distinct categories in the order they were first scraped"""
+        with self._lock:
+            rows = self._conn.execute("SELECT category FROM articles GROUP BY category ORDER BY MIN(id)").fetchall()
+        return [row['category'] for row in rows]
+
+    def count(self, newspapers=None, categories=None, since=None, until=None):
+        where, params = self._where(newspapers, categories, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM articles{where}", params).fetchone()[0]
+
+    def save_clusters(self, clusters):
+        """Replace the saved clusters with {cluster_id: [articles]}; returns the number of articles saved
+
+        Articles are matched to the stored ones by canonical URL; articles that are not
+        stored are left out.
+        """
+        rows = [(str(cluster_id), canonical_url(article.url))
+                for cluster_id, articles in clusters.items() for article in articles]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM clusters")
+            self._conn.executemany(
+                "INSERT INTO clusters (cluster_id, article_id) SELECT ?, id FROM articles WHERE url_key = ?", rows)
+            saved = self._conn.execute("SELECT COUNT(*) FROM clusters").fetchone()[0]
+        if saved < len(rows):
+            logger.warning(f"{len(rows) - saved} clustered articles are not in the article database")
+        return saved
+
+    def has_clusters(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM clusters LIMIT 1").fetchone() is not None
+
+    def clusters(self, cluster_id=None):
+        """Return the saved clusters as {cluster_id: [Article]} (only `cluster_id` if given)
+
+        Articles carry their snippet and content_hash but no body.
+        """
+        where, params = ("WHERE c.cluster_id = ?", [str(cluster_id)]) if cluster_id is not None else ("", [])
+        sql = f"""
+            SELECT c.cluster_id, a.newspaper, a.category, a.title, a.url, a.date_scraped, a.content_hash, a.snippet
+            FROM clusters AS c JOIN articles AS a ON a.id = c.article_id
+            {where}
+            ORDER BY c.position
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        clusters = {}
+        for cluster, newspaper, category, title, url, date_scraped, key, snippet in rows:
+            clusters.setdefault(cluster, []).append(
+                Article(newspaper, category, title, url, None, date_scraped, key, snippet))
+        return clusters
+
+    def search(self, text, limit=20, newspapers=None, categories=None):
+        """Full-text search over titles and bodies, best matches first
+
+        Results carry the article columns and content_hash, plus the `snippet` as escaped
+        HTML with the search words wrapped in <b> tags.
+        """
+        if not self.full_text:
+            raise RuntimeError("This SQLite build has no FTS5, so full-text search is unavailable")
+        # Quote every word so user input is never read as FTS5 query syntax
+        words = text.split()
+        match = ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+        if not match:
+            return []
+        where, params = self._where(newspapers, categories)
+        where = where.replace(" WHERE ", " AND ")
+        sql = f"""
+            SELECT a.newspaper, a.category, a.title, a.url, a.date_scraped, a.content_hash, a.snippet
+            FROM articles_text JOIN articles AS a ON a.id = articles_text.rowid
+            WHERE articles_text MATCH ?{where}
+            ORDER BY bm25(articles_text, 5.0, 1.0)
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, [match] + params + [int(limit)]).fetchall()
+        # The contentless index cannot make snippets, so the stored one is highlighted instead
+        # Snippets are scraped text, so they are escaped before any markup is added
+        pattern = re.compile(r'\b(' + '|'.join(re.escape(html.escape(word)) for word in words) + r')\b',
+                             re.IGNORECASE)
+        results = [dict(row) for row in rows]
+        for result in results:
+            if result['snippet']:
+                result['snippet'] = pattern.sub(r'<b>\1</b>', html.escape(result['snippet']))
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_article_database(db_path='news_data/articles.db', csv_path=DEFAULT_CSV, engine=None, bodies=None):
+    """Open the article database, first importing the article store (or `csv_path`) if it is empty
+
+    Databases only start empty when the articles were scraped before the database
+    existed; the scraper upserts everything it saves from then on.
+    """
+    db = ArticleDatabase(db_path, bodies)
+    if db.count() == 0:
+        if os.path.exists(csv_path):
+            # Bodies a CSV file still holds go to the body store before its rows are imported
+            db.bodies.migrate_csv(csv_path)
+        try:
+            df = load_articles(csv_path=csv_path, engine=engine)
+        except FileNotFoundError:
+            return db
+        logger.info(f"Imported {db.upsert(df.to_dict('records'))} articles into the article database {db_path}")
+    return db
+
+
+def main(argv=None):
+    """Import articles from a CSV file into the database, or search it"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage the SQLite article database")
+    parser.add_argument('--db', default='news_data/articles.db', help="Article database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="Upsert the articles of a CSV file")
+    import_parser.add_argument('csv', nargs='?', default='news_data/all_articles.csv')
+    search_parser = subparsers.add_parser('search', help="Full-text search over titles and bodies")
+    search_parser.add_argument('text')
+    search_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    db = ArticleDatabase(args.db)
+    try:
+        if args.command == 'import':
+            df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+            logger.info(f"Upserted {db.upsert(df.to_dict('records'))} articles from {args.csv}")
+        else:
+            for result in db.search(args.text, limit=args.limit):
+                print(f"{result['newspaper']} | {result['category']} | {result['title']}\n"
+                      f"    {result['url']}\n    {result['snippet']}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
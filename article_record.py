@@ -0,0 +1,147 @@
+"""
+Compact in-memory article records
+Article keeps its fields in __slots__ instead of a per-article dict, and interns the
+newspaper, category and date values, which repeat across thousands of articles, so each
+distinct value is stored once. Articles move from the scraper through the clusterers to the
+cluster JSON file without being turned into lists of dicts.
+
+Saved rows carry the content_hash and a snippet of the body instead of the body itself; the
+full text lives in the body store (see body_store.py) and is only loaded where it is shown.
+"""
+import sys
+import json
+import math
+from datetime import date
+
+import pandas as pd
+
+from body_store import content_hash as body_hash, make_snippet
+
+# Columns of saved article rows: CSV files, the article store and the cluster JSON files
+ARTICLE_COLUMNS = ['newspaper', 'category', 'title', 'url', 'content_hash', 'snippet', 'date_scraped']
+
+# Arguments of Article(), in order; `content` is the body while it is held in memory
+ARTICLE_FIELDS = ('newspaper', 'category', 'title', 'url', 'content', 'date_scraped', 'content_hash', 'snippet')
+
+# Fields whose few distinct values are shared by every article that has them
+INTERNED_COLUMNS = ('newspaper', 'category', 'date_scraped')
+
+
+def intern_value(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def clean_value(value):
+    """Missing values read by pandas (NaN) become None, which is written to JSON as null"""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+_today = (None, None)
+
+
+def scrape_date():
+    """Return today's date as an interned YYYY-MM-DD string, formatted once per day"""
+    global _today
+    today = date.today()
+    if _today[0] != today:
+        _today = (today, sys.intern(today.isoformat()))
+    return _today[1]
+
+
+class Article:
+    """One scraped article
+
+    Supports article['url'] and article.get('title') so code written for the dict rows
+    keeps working. Given the body, the content_hash and snippet are derived from it; rows
+    read back from disk have only those two and `content` is None.
+    """
+    __slots__ = ARTICLE_FIELDS
+
+    def __init__(self, newspaper, category, title, url, content=None, date_scraped=None,
+                 content_hash=None, snippet=None):
+        self.newspaper = intern_value(newspaper)
+        self.category = intern_value(category)
+        self.title = title
+        self.url = url
+        self.content = content
+        self.date_scraped = intern_value(date_scraped) if date_scraped is not None else scrape_date()
+        self.content_hash = content_hash or (body_hash(content) if content else None)
+        self.snippet = snippet if snippet is not None or not content else make_snippet(content)
+
+    @classmethod
+    def from_dict(cls, row):
+        """Build an Article from a row; rows written before the body store have `content` instead of a hash"""
+        return cls(*(clean_value(row.get(field)) for field in ARTICLE_FIELDS))
+
+    def __getitem__(self, column):
+        try:
+            return getattr(self, column)
+        except AttributeError:
+            raise KeyError(column) from None
+
+    def get(self, column, default=None):
+        return getattr(self, column, default)
+
+    def items(self):
+        for column in ARTICLE_COLUMNS:
+            yield column, getattr(self, column)
+
+    def values(self):
+        return [getattr(self, column) for column in ARTICLE_COLUMNS]
+
+    def body(self, bodies):
+        """Return the full text, from memory or else from the BodyStore `bodies` (None if unknown)"""
+        return self.content if self.content is not None else bodies.get(self.content_hash)
+
+    def replace(self, **changes):
+        """Return a copy with some fields changed; a new content gets a new hash and snippet"""
+        fields = {field: getattr(self, field) for field in ARTICLE_FIELDS}
+        if 'content' in changes:
+            fields.update(content_hash=None, snippet=None)
+        fields.update(changes)
+        return Article(**fields)
+
+    def __eq__(self, other):
+        return isinstance(other, Article) and self.values() == other.values()
+
+    def __repr__(self):
+        return f"Article({self.newspaper!r}, {self.category!r}, {self.title!r}, {self.url!r})"
+
+
+def articles_from_frame(df):
+    """Turn a DataFrame with the article columns into a list of Articles, column by column"""
+    columns = [df[field] if field in df.columns else [None] * len(df) for field in ARTICLE_FIELDS]
+    return [Article(*(clean_value(value) for value in row)) for row in zip(*columns)]
+
+
+def articles_to_frame(articles):
+    """Build a DataFrame from Articles without creating a dict per article"""
+    return pd.DataFrame({column: [getattr(article, column) for article in articles]
+                         for column in ARTICLE_COLUMNS}, columns=ARTICLE_COLUMNS)
+
+
+def group_by_category(articles):
+    """Return {cluster_id: [articles]} with one cluster per category, in order of first appearance"""
+    clusters = {}
+    cluster_ids = {}
+    for article in articles:
+        cluster_id = cluster_ids.setdefault(article.category, str(len(cluster_ids)))
+        clusters.setdefault(cluster_id, []).append(article)
+    return clusters
+
+
+def dump_clusters(clusters, f):
+    """Write {cluster_id: [articles]} as indented JSON, encoding one article at a time
+
+    Articles may be Article records or dicts; records are written with their hash and
+    snippet, never the full body.
+    """
+    f.write('{')
+    for position, (cluster_id, articles) in enumerate(clusters.items()):
+        f.write(f"{',' if position else ''}\n  {json.dumps(str(cluster_id))}: [")
+        for index, article in enumerate(articles):
+            fields = ', '.join(f"{json.dumps(column)}: {json.dumps(clean_value(value))}"
+                               for column, value in article.items())
+            f.write(f"{',' if index else ''}\n    {{{fields}}}")
+        f.write('\n  ]' if articles else ']')
+    f.write('\n}\n' if clusters else '}\n')
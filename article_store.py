@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Columnar article store
+Articles are saved as Parquet files partitioned by scrape date and newspaper
+(news_data/articles/date_scraped=2025-05-08/newspaper=BBC/part-<id>.parquet). Readers only
+load the columns they ask for, and filters on newspaper, category and date skip whole
+partitions and row groups, so a load costs what it actually needs instead of the whole corpus.
+
+pyarrow is optional: without it the scraper keeps writing news_data/all_articles.csv and
+every reader falls back to that file. Either way newspaper, category and date_scraped are
+returned as categoricals, which store each distinct value once. Article bodies are not part
+of the rows; they live in the body store (see body_store.py).
+
+    python article_store.py import news_data/all_articles.csv   # build the store from a CSV file
+    python article_store.py export news_data/all_articles.csv   # write the store out as CSV
+"""
+import os
+import uuid
+import shutil
+import argparse
+import logging
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from article_record import ARTICLE_COLUMNS
+from body_store import split_content
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = pa_csv = ds = None
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ['date_scraped', 'newspaper']
+DEFAULT_CSV = 'news_data/all_articles.csv'
+
+# Columns with few distinct values, loaded as categoricals
+CATEGORICAL_COLUMNS = ['newspaper', 'category', 'date_scraped']
+CSV_CHUNK_ROWS = 20000
+
+
+class ArticleStore:
+    """Parquet dataset of articles, partitioned by date_scraped and newspaper"""
+
+    def __init__(self, root='news_data/articles'):
+        self.root = root
+
+    @property
+    def available(self):
+        """True if pyarrow is installed"""
+        return pa is not None
+
+    def exists(self):
+        """Return True if the store holds any articles"""
+        if not self.available or not os.path.isdir(self.root):
+            return False
+        return any(name.endswith('.parquet') for _, _, files in os.walk(self.root) for name in files)
+
+    def _schema(self):
+        return pa.schema([(column, pa.string()) for column in ARTICLE_COLUMNS])
+
+    def _partitioning(self):
+        return ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]), flavor='hive')
+
+    def _write(self, df, directory):
+        """Write articles into `directory` as new files; nothing existing is overwritten"""
+        df = df.reindex(columns=ARTICLE_COLUMNS).astype('string')
+        table = pa.Table.from_pandas(df, schema=self._schema(), preserve_index=False)
+        # Sorted rows give each row group a narrow category range, so category filters skip most of them
+        table = table.sort_by([('newspaper', 'ascending'), ('category', 'ascending')])
+        ds.write_dataset(
+            table, directory, format='parquet', partitioning=self._partitioning(),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'))
+
+    def append(self, df):
+        """Add articles to the store; returns how many were written"""
+        if df.empty:
+            return 0
+        # Files are written aside and moved into place, so readers never see a partial file
+        staging = f"{self.root}.staging-{uuid.uuid4().hex}"
+        try:
+            self._write(df, staging)
+            for directory, _, files in os.walk(staging):
+                target = os.path.join(self.root, os.path.relpath(directory, staging))
+                for name in files:
+                    os.makedirs(target, exist_ok=True)
+                    os.replace(os.path.join(directory, name), os.path.join(target, name))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Added {len(df)} articles to the article store {self.root}")
+        return len(df)
+
+    def replace(self, df):
+        """Replace the whole store with these articles"""
+        new_root = f"{self.root}.new"
+        old_root = f"{self.root}.old"
+        shutil.rmtree(new_root, ignore_errors=True)
+        os.makedirs(new_root, exist_ok=True)
+        if not df.empty:
+            self._write(df, new_root)
+        if os.path.exists(self.root):
+            os.replace(self.root, old_root)
+        os.replace(new_root, self.root)
+        shutil.rmtree(old_root, ignore_errors=True)
+        logger.info(f"Saved {len(df)} articles to the article store {self.root}")
+        return len(df)
+
+    def _dataset(self):
+        return ds.dataset(self.root, format='parquet', schema=self._schema(), partitioning=self._partitioning())
+
+    def _filter(self, newspapers=None, categories=None, since=None, until=None):
+        expression = None
+        for condition in (
+                ds.field('newspaper').isin(list(newspapers)) if newspapers else None,
+                ds.field('category').isin(list(categories)) if categories else None,
+                # ISO dates compare correctly as strings
+                ds.field('date_scraped') >= str(since) if since else None,
+                ds.field('date_scraped') <= str(until) if until else None):
+            if condition is not None:
+                expression = condition if expression is None else expression & condition
+        return expression
+
+    def read(self, columns=None, newspapers=None, categories=None, since=None, until=None):
+        """Load articles as a DataFrame
+
+        `columns` limits the columns read; newspapers, categories and the inclusive
+        since/until date range are pushed down to the Parquet scan.
+        """
+        columns = columns or ARTICLE_COLUMNS
+        table = self._dataset().to_table(columns=columns,
+                                         filter=self._filter(newspapers, categories, since, until))
+        # Dictionary-encoded columns become categoricals without a string per row
+        for column in CATEGORICAL_COLUMNS:
+            if column in table.column_names:
+                index = table.column_names.index(column)
+                table = table.set_column(index, column, table.column(column).dictionary_encode())
+        return table.to_pandas()
+
+    def count(self, newspapers=None, categories=None, since=None, until=None):
+        """Count articles from the Parquet metadata without reading any column"""
+        return self._dataset().count_rows(filter=self._filter(newspapers, categories, since, until))
+
+
+def read_articles_csv(csv_path, columns=None, engine=None, chunksize=CSV_CHUNK_ROWS):
+    """Read an articles CSV file with compact dtypes, only parsing the requested columns
+
+    newspaper, category and date_scraped become categoricals. The 'pyarrow' engine parses
+    the whole file on several threads, and falls back to 'c' when pyarrow is not installed.
+    The default 'c' engine reads it in chunks and keeps only the requested columns of each
+    chunk, which are joined into the result at the end. Reading never writes: files
+    written before the body store get hashes and snippets of their content column in memory
+    only, until `python body_store.py migrate` moves their bodies into the store.
+    """
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    legacy = 'content' in header and 'content_hash' not in header
+    if legacy and (columns is None or 'content_hash' in columns or 'snippet' in columns):
+        columns = None if columns is None else set(columns) | {'content'}
+    usecols = [column for column in header if columns is None or column in columns]
+    dtype = {column: 'category' if column in CATEGORICAL_COLUMNS else str for column in usecols}
+
+    df = _read_csv_columns(csv_path, usecols, dtype, engine, chunksize)
+    if legacy:
+        logger.warning(f"{csv_path} still holds article bodies; move them to the body store with "
+                       f"python body_store.py migrate {csv_path}")
+    if legacy and 'content' in df.columns:
+        df = split_content(df)
+    return df
+
+
+def _read_csv_columns(csv_path, usecols, dtype, engine, chunksize):
+    """Parse the `usecols` columns of a CSV file with the chosen engine"""
+    if engine == 'pyarrow' and pa_csv is None:
+        logger.warning("pyarrow is not installed, parsing the CSV file with the 'c' engine")
+        engine = 'c'
+    if engine == 'pyarrow':
+        # Article bodies contain newlines, which pandas' pyarrow engine cannot parse
+        table = pa_csv.read_csv(
+            csv_path, parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(include_columns=usecols,
+                                                  column_types={column: pa.string() for column in usecols}))
+        for column in CATEGORICAL_COLUMNS:
+            if column in usecols:
+                index = table.column_names.index(column)
+                table = table.set_column(index, column, table.column(column).dictionary_encode())
+        return table.to_pandas()
+
+    columns = {column: [] for column in usecols}
+    for chunk in pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        for column in usecols:
+            columns[column].append(chunk[column])
+    if not usecols or not columns[usecols[0]]:
+        return pd.read_csv(csv_path, usecols=usecols, dtype=dtype)
+    result = {}
+    for column, parts in columns.items():
+        if column in CATEGORICAL_COLUMNS:
+            # Chunks have different categories; merge them instead of falling back to strings
+            result[column] = pd.Categorical(union_categoricals(parts))
+        else:
+            result[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(result, columns=usecols)
+
+
+def load_articles(columns=None, newspapers=None, categories=None, since=None, until=None,
+                  csv_path=DEFAULT_CSV, store=None, engine=None):
+    """Load articles from the article store, or from `csv_path` when the store is unavailable
+
+    Takes the same projection and filters as ArticleStore.read and returns the same columns
+    and dtypes in either case; `engine` selects the CSV parser (see read_articles_csv).
+    Raises FileNotFoundError if there is no data at all.
+    """
+    store = store or ArticleStore()
+    if store.exists():
+        df = store.read(columns, newspapers, categories, since, until)
+        logger.info(f"Loaded {len(df)} articles from the article store {store.root}")
+        return df
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"No article store at {store.root} and no CSV file at {csv_path}")
+
+    filter_columns = [column for column, wanted in (('newspaper', newspapers), ('category', categories),
+                                                    ('date_scraped', since or until)) if wanted]
+    needed = None if columns is None else set(columns) | set(filter_columns)
+    df = read_articles_csv(csv_path, needed, engine)
+    if newspapers:
+        df = df[df['newspaper'].isin(list(newspapers))]
+    if categories:
+        df = df[df['category'].isin(list(categories))]
+    if since:
+        df = df[df['date_scraped'].astype(str) >= str(since)]
+    if until:
+        df = df[df['date_scraped'].astype(str) <= str(until)]
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+    logger.info(f"Loaded {len(df)} articles from {csv_path}")
+    return df.reset_index(drop=True)
+
+
+def count_articles(csv_path=DEFAULT_CSV, store=None):
+    """Return the number of stored articles, or None if there are none"""
+    store = store or ArticleStore()
+    if store.exists():
+        return store.count()
+    if os.path.exists(csv_path):
+        return len(pd.read_csv(csv_path, usecols=['url']))
+    return None
+
+
+def main(argv=None):
+    """Import articles from a CSV file into the store, or export the store as CSV"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage the columnar article store")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CSV, help=f"CSV file (default: {DEFAULT_CSV})")
+    parser.add_argument('--root', default='news_data/articles', help="Directory of the article store")
+    args = parser.parse_args(argv)
+
+    store = ArticleStore(args.root)
+    if not store.available:
+        parser.error("the article store needs pyarrow (pip install pyarrow)")
+    if args.command == 'import':
+        store.replace(read_articles_csv(args.csv))
+    else:
+        df = store.read()
+        df.to_csv(args.csv + '.tmp', index=False)
+        os.replace(args.csv + '.tmp', args.csv)
+        logger.info(f"Exported {len(df)} articles to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the newspaper scraper
+Runs fully offline against saved listing pages, or against synthetic pages built
+from each newspaper's selectors when no saved pages are available
+"""
+import os
+import re
+import glob
+import time
+import shutil
+import tempfile
+import argparse
+import logging
+import tracemalloc
+from functools import partial
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from newspaper_scrapper import (NewspaperScraper, SessionPool, extract_article_links, get_random_user_agent,
+                                parse_html, DEFAULT_PARSER)
+from page_archive import PageArchive
+from scrape_frontier import canonical_url
+from replay_server import (ReplayServer, ReplayAdapter, build_synthetic_archive,
+                           synthetic_listing_page, synthetic_article_page)
+
+# Keep the scraper's per-page log lines out of the timings
+logging.getLogger('newspaper_scrapper').setLevel(logging.WARNING)
+logging.getLogger('replay_server').setLevel(logging.WARNING)
+
+SAVED_PAGES_DIR = 'news_data/listing_pages'
+
+def legacy_extract_links(soup, newspaper):
+    """The original nested-loop link extraction, kept as the benchmark baseline"""
+    selectors = newspaper['article_selector'].split(', ')
+    article_links = []
+
+    for selector in selectors:
+        elements = soup.select(selector)
+        if elements:
+            title_selectors = newspaper['title_selector'].split(', ')
+            for title_selector in title_selectors:
+                for element in elements:
+                    title_elem = element.select_one(title_selector)
+                    if title_elem and title_elem.get('href'):
+                        href = title_elem.get('href')
+                        title = title_elem.text.strip()
+                        if not href.startswith('http'):
+                            href = urljoin(newspaper['base_url'], href)
+                        article_links.append({'url': href, 'title': title})
+
+                    links = element.find_all('a')
+                    for link in links:
+                        href = link.get('href')
+                        if href and (
+                            '/news/' in href or
+                            '/article/' in href or
+                            '/story/' in href or
+                            '/business/' in href or
+                            '/politics/' in href or
+                            '/sport/' in href
+                        ):
+                            title = link.text.strip() or link.get('title', '')
+                            if not title and link.find('h2'):
+                                title = link.find('h2').text.strip()
+                            if not title and link.find('h3'):
+                                title = link.find('h3').text.strip()
+                            if not href.startswith('http'):
+                                href = urljoin(newspaper['base_url'], href)
+                            article_links.append({'url': href, 'title': title or "No title found"})
+
+    unique_links = []
+    seen_urls = set()
+    for article in article_links:
+        if article['url'] not in seen_urls and article['title']:
+            unique_links.append(article)
+            seen_urls.add(article['url'])
+    return unique_links
+
+
+def load_listing_pages(pages_dir, newspapers, synthetic_articles=40):
+    """Return (newspaper_id, label, html) for saved listing pages, or synthetic ones if none are saved"""
+    pages = []
+    for newspaper_id in newspapers:
+        for path in sorted(glob.glob(os.path.join(pages_dir, f"{newspaper_id}_*.html"))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages.append((newspaper_id, os.path.basename(path), f.read()))
+
+    if pages:
+        return pages
+
+    print(f"No saved listing pages in {pages_dir}, using synthetic pages")
+    for newspaper_id, newspaper in newspapers.items():
+        for seed in range(4):
+            pages.append((newspaper_id, f"{newspaper_id}_synthetic_{seed}",
+                          synthetic_listing_page(newspaper_id, newspaper, synthetic_articles, seed)))
+    return pages
+
+
+def save_listing_pages(pages_dir, newspapers):
+    """Download every category page once so later benchmarks can run offline"""
+    import requests
+
+    os.makedirs(pages_dir, exist_ok=True)
+    for newspaper_id, newspaper in newspapers.items():
+        for category, urls in newspaper['categories'].items():
+            for index, url in enumerate(urls):
+                response = requests.get(url, headers={'User-Agent': get_random_user_agent()}, timeout=15)
+                if response.status_code != 200:
+                    print(f"  ✗ {url}: status {response.status_code}")
+                    continue
+                slug = re.sub(r'[^a-z0-9]+', '-', category.lower()).strip('-')
+                path = os.path.join(pages_dir, f"{newspaper_id}_{slug}_{index}.html")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+                print(f"  ✓ Saved {url} to {path}")
+
+
+def time_call(function, repeat):
+    """Return the best wall-clock time of `repeat` calls and the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_links(args):
+    """Compare the legacy and single-pass link extraction on the same parsed pages"""
+    newspapers = NewspaperScraper().newspapers
+    if args.save_pages:
+        save_listing_pages(args.pages, newspapers)
+    pages = load_listing_pages(args.pages, newspapers, args.synthetic_articles)
+
+    print(f"{'page':40} {'links':>6} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+    total_legacy = total_new = 0.0
+    for newspaper_id, label, html in pages:
+        newspaper = newspapers[newspaper_id]
+        soup = BeautifulSoup(html, 'html.parser')
+
+        legacy_time, legacy_links = time_call(lambda: legacy_extract_links(soup, newspaper), args.repeat)
+        new_time, new_links = time_call(lambda: extract_article_links(soup, newspaper), args.repeat)
+
+        # The single-pass extraction emits canonical URLs, so compare both sides in that form,
+        # in the order the links were found
+        legacy_urls = list(dict.fromkeys(canonical_url(link['url']) for link in legacy_links))
+        new_urls = [canonical_url(link['url']) for link in new_links]
+        if set(legacy_urls) != set(new_urls):
+            print(f"  ✗ {label}: extracted URLs differ ({len(legacy_urls)} vs {len(new_urls)})")
+        elif legacy_urls != new_urls:
+            print(f"  ✗ {label}: extracted URLs are in a different order")
+
+        total_legacy += legacy_time
+        total_new += new_time
+        speedup = legacy_time / new_time if new_time else float('inf')
+        print(f"{label:40} {len(new_links):>6} {legacy_time * 1000:>10.2f} {new_time * 1000:>10.2f} {speedup:>7.1f}x")
+
+    if total_new:
+        print(f"\nTotal: legacy {total_legacy * 1000:.1f} ms, single-pass {total_new * 1000:.1f} ms "
+              f"({total_legacy / total_new:.1f}x faster)")
+
+
+def benchmark_parse(args):
+    """Compare a full html.parser parse with each newspaper's configured backend"""
+    newspapers = NewspaperScraper().newspapers
+    pages = [(newspaper_id, label, html, 'listing')
+             for newspaper_id, label, html in load_listing_pages(args.pages, newspapers)]
+    for newspaper_id, newspaper in newspapers.items():
+        pages.append((newspaper_id, f"{newspaper_id}_synthetic_article",
+                      synthetic_article_page(newspaper, f"{newspaper['name']} story"), 'article'))
+
+    print(f"{'page':40} {'html.parser ms':>15} {'configured ms':>14} {'speedup':>8}")
+    for newspaper_id, label, html, page_type in pages:
+        newspaper = newspapers[newspaper_id]
+        baseline, _ = time_call(lambda: BeautifulSoup(html, 'html.parser'), args.repeat)
+        configured, _ = time_call(lambda: parse_html(html, newspaper, page_type), args.repeat)
+        print(f"{label:40} {baseline * 1000:>15.2f} {configured * 1000:>14.2f} {baseline / configured:>7.1f}x")
+    print(f"\nDefault parser backend: {DEFAULT_PARSER}")
+
+
+def run_scrape(server, newspapers, workers, parse_workers, args, discovery='html'):
+    """Run one full scrape against the replay server and return its measurements"""
+    data_dir = tempfile.mkdtemp(prefix='scraper-benchmark-')
+    sessions = SessionPool(adapter_factory=partial(ReplayAdapter, server.url))
+    scraper = NewspaperScraper(max_workers=workers, min_delay=args.delay, max_delay=args.delay,
+                               sessions=sessions, parse_workers=parse_workers, data_dir=data_dir,
+                               stream_articles=args.stream, discovery=discovery)
+    scraper.newspapers = newspapers
+
+    server.reset_counters()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        df = scraper.scrape_all_newspapers(max_articles_per_category=args.max_articles)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sessions.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    parsed_pages = sum(pages for pages, _ in scraper.parse_stats.values())
+    parse_seconds = sum(seconds for _, seconds in scraper.parse_stats.values())
+    return {
+        'articles': len(df),
+        'pages': server.requests_served,
+        'seconds': elapsed,
+        'pages_per_second': server.requests_served / elapsed if elapsed else 0.0,
+        'parse_ms_per_page': parse_seconds * 1000 / parsed_pages if parsed_pages else 0.0,
+        'peak_mb': peak_bytes / (1024 * 1024),
+        'saved_kb': sum(totals['bytes_saved'] for totals in scraper.stream_stats.values()) / 1024,
+        'requests_per_article': server.requests_served / len(df) if len(df) else 0.0,
+        'kb_per_article': server.bytes_served / 1024 / len(df) if len(df) else 0.0
+    }
+
+
+def benchmark_scrape(args):
+    """Measure end-to-end scraper throughput against a local replay server"""
+    newspapers = NewspaperScraper().newspapers
+    if args.newspapers:
+        newspapers = {newspaper_id: newspapers[newspaper_id] for newspaper_id in args.newspapers}
+
+    temp_archive = None
+    if args.archive:
+        archive = PageArchive(args.archive)
+        print(f"Replaying {len(archive)} recorded pages from {args.archive}")
+    else:
+        temp_archive = tempfile.mkdtemp(prefix='scraper-archive-')
+        archive = build_synthetic_archive(newspapers, PageArchive(temp_archive), args.max_articles * 2)
+        print(f"Replaying {len(archive)} synthetic pages")
+
+    server = ReplayServer(archive, latency=args.latency)
+    server.start()
+    try:
+        print(f"{'discovery':>9} {'workers':>7} {'parsers':>7} {'articles':>8} {'pages':>6} {'seconds':>8} "
+              f"{'pages/s':>8} {'parse ms':>9} {'peak MB':>8} {'saved KB':>9} {'req/art':>8} {'KB/art':>7}")
+        for discovery in args.discovery:
+            for workers in args.workers:
+                for parse_workers in args.parse_workers:
+                    result = run_scrape(server, newspapers, workers, parse_workers, args, discovery)
+                    print(f"{discovery:>9} {workers:>7} {parse_workers:>7} {result['articles']:>8} {result['pages']:>6} "
+                          f"{result['seconds']:>8.2f} {result['pages_per_second']:>8.1f} "
+                          f"{result['parse_ms_per_page']:>9.2f} {result['peak_mb']:>8.1f} {result['saved_kb']:>9.0f} "
+                          f"{result['requests_per_article']:>8.2f} {result['kb_per_article']:>7.1f}")
+    finally:
+        server.stop()
+        archive.close()
+        if temp_archive:
+            shutil.rmtree(temp_archive, ignore_errors=True)
+
+    print("\npeak MB is the Python heap of the scraping process (parser processes are not included)")
+
+
+def parse_args(argv=None):
+    """Parse command line options for the benchmarks"""
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the newspaper scraper")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    links = subparsers.add_parser('links', help="Benchmark article link extraction on listing pages")
+    links.add_argument('--pages', default=SAVED_PAGES_DIR,
+                       help="Directory of saved listing pages named <newspaper_id>_*.html")
+    links.add_argument('--save-pages', action='store_true',
+                       help="Download the live category pages into --pages first (needs network access)")
+    links.add_argument('--synthetic-articles', type=int, default=40,
+                       help="Article cards per synthetic page when no saved pages exist")
+    links.add_argument('--repeat', type=int, default=5, help="Timing repetitions per page (best is reported)")
+    links.set_defaults(run=benchmark_links)
+
+    parse = subparsers.add_parser('parse', help="Benchmark HTML parsing with the configured backends")
+    parse.add_argument('--pages', default=SAVED_PAGES_DIR,
+                       help="Directory of saved listing pages named <newspaper_id>_*.html")
+    parse.add_argument('--repeat', type=int, default=5, help="Timing repetitions per page (best is reported)")
+    parse.set_defaults(run=benchmark_parse)
+
+    scrape = subparsers.add_parser('scrape', help="Benchmark full scrapes against a local replay server")
+    scrape.add_argument('--archive', help="Page archive written by newspaper_scrapper.py, e.g. news_data/html_archive "
+                                          "(default: synthetic pages)")
+    scrape.add_argument('--newspapers', nargs='+', help="Only scrape these newspaper ids")
+    scrape.add_argument('--workers', type=int, nargs='+', default=[1, 5],
+                        help="Newspaper worker thread counts to compare")
+    scrape.add_argument('--parse-workers', type=int, nargs='+', default=[0, 2],
+                        help="Parser process counts to compare")
+    scrape.add_argument('--max-articles', type=int, default=5, help="Articles per category")
+    scrape.add_argument('--latency', type=float, default=0.02, help="Simulated server latency in seconds")
+    scrape.add_argument('--stream', action='store_true',
+                        help="Stream article pages and stop reading once the content is complete")
+    scrape.add_argument('--discovery', choices=['html', 'feeds'], nargs='+', default=['html'],
+                        help="Article discovery modes to compare (category pages or RSS feeds)")
+    scrape.add_argument('--delay', type=float, default=0.0, help="Politeness delay between requests to a host")
+    scrape.set_defaults(run=benchmark_scrape)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function to run the selected benchmark"""
+    args = parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store of article bodies
+Every distinct article text is saved once, gzip-compressed, under a hash of its normalised
+form (news_data/bodies/3f/3fa9...c1.txt.gz). Article rows and cluster files only carry that
+hash and a short snippet, so a body scraped again on a later run, or published by several
+newspapers, is never written twice, and the full text is only read where it is shown.
+
+    python body_store.py migrate news_data/*.csv   # move the bodies of older CSV files into the store
+"""
+import os
+import re
+import csv
+import gzip
+import uuid
+import hashlib
+import argparse
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+HASH_BYTES = 16
+SNIPPET_CHARS = 200
+HASH_PATTERN = re.compile(r'[0-9a-f]{%d}' % (HASH_BYTES * 2))
+
+
+def normalize_text(text):
+    """NFC-normalise a body and collapse whitespace, so bodies that only differ in spacing share a hash"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def content_hash(text):
+    """Return the hex key of an article body"""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=HASH_BYTES).hexdigest()
+
+
+def make_snippet(text, length=SNIPPET_CHARS):
+    """Return the start of a body, cut at a word boundary"""
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text.rfind(' ', 0, length)
+    return text[:cut if cut > length // 2 else length].rstrip() + '...'
+
+
+class BodyStore:
+    """Directory of gzip-compressed article bodies keyed by content_hash"""
+
+    def __init__(self, root='news_data/bodies'):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.txt.gz")
+
+    def __contains__(self, key):
+        return bool(key) and HASH_PATTERN.fullmatch(key) is not None and os.path.exists(self.path(key))
+
+    def put(self, text, key=None):
+        """Save a body unless an identical one is stored already; returns its key"""
+        key = key or content_hash(text)
+        path = self.path(key)
+        if os.path.exists(path):
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temporary names let several threads and processes store the same body at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(text.encode('utf-8'), compresslevel=6))
+        os.replace(tmp_path, path)
+        return key
+
+    def get(self, key):
+        """Return the body stored under `key`, or None if it is unknown"""
+        # Keys come from URLs too, so anything but a hash is rejected before touching the filesystem
+        if not key or HASH_PATTERN.fullmatch(key) is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def migrate_csv(self, csv_path):
+        """Rewrite an articles CSV file that still holds bodies with hashes and snippets
+
+        Returns the number of rows rewritten, or 0 if the file is already migrated.
+        """
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+        if 'content' not in header or 'content_hash' in header:
+            return 0
+
+        position = header.index('content')
+        rows = 0
+        with open(csv_path, newline='', encoding='utf-8') as source, \
+                open(csv_path + '.tmp', 'w', newline='', encoding='utf-8') as target:
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            next(reader)
+            writer.writerow(header[:position] + ['content_hash', 'snippet'] + header[position + 1:])
+            for row in reader:
+                text = row[position] if position < len(row) else ''
+                replacement = [self.put(text), make_snippet(text)] if text else ['', '']
+                writer.writerow(row[:position] + replacement + row[position + 1:])
+                rows += 1
+        os.replace(csv_path + '.tmp', csv_path)
+        logger.info(f"Moved the bodies of {rows} articles in {csv_path} to the body store {self.root}")
+        return rows
+
+
+def split_content(df):
+    """Replace the `content` column of older article data with content_hash and snippet
+
+    Nothing is written to a store; migrate_csv moves the bodies of a file there.
+    """
+    bodies = [text if isinstance(text, str) and text else None for text in df['content']]
+    position = df.columns.get_loc('content')
+    df = df.drop(columns='content')
+    df.insert(position, 'content_hash', [content_hash(text) if text else None for text in bodies])
+    df.insert(position + 1, 'snippet', [make_snippet(text) if text else None for text in bodies])
+    return df
+
+
+def main(argv=None):
+    """Move the bodies of CSV files written before the body store existed into it"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage the content-addressed article body store")
+    parser.add_argument('--root', default='news_data/bodies', help="Directory of the body store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="Replace the content column of CSV files")
+    migrate_parser.add_argument('csv', nargs='+')
+    args = parser.parse_args(argv)
+
+    bodies = BodyStore(args.root)
+    for csv_path in args.csv:
+        if not bodies.migrate_csv(csv_path):
+            logger.info(f"{csv_path} has no content column, nothing to migrate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Per-host circuit breakers for the newspaper scraper
+After a number of consecutive failures a host's breaker opens and the remaining requests
+to it fail immediately instead of waiting out their timeouts. Open breakers are saved to
+disk and probed with a single half-open request on a later run.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose breaker is open"""
+
+    def __init__(self, host):
+        super().__init__(f"Circuit breaker open for {host}, skipping request")
+        self.host = host
+
+
+class CircuitBreakerRegistry:
+    """Consecutive-failure circuit breakers keyed by host, persisted between runs
+
+    A breaker opened in an earlier run starts the next run half-open (once `cooldown`
+    seconds have passed): the first request is a probe, and concurrent requests wait
+    for its outcome. A successful probe closes the breaker, a failed one reopens it.
+    """
+
+    def __init__(self, path='news_data/circuit_breakers.json', failure_threshold=3, cooldown=0):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers = {}
+        self._skipped = {}
+        self._probing = set()
+        self._condition = threading.Condition()
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable circuit breaker state {path}: {str(e)}")
+                saved = {}
+            for host, breaker in saved.items():
+                if breaker.get('state') == OPEN and time.time() - breaker.get('opened_at', 0) >= cooldown:
+                    breaker['state'] = HALF_OPEN
+                    logger.info(f"Circuit breaker for {host} is half-open, the next request will probe it")
+                self._breakers[host] = breaker
+
+    def _breaker(self, host):
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = {'state': CLOSED, 'failures': 0, 'opened_at': None}
+        return breaker
+
+    def before_request(self, url):
+        """Return the host if a request may be sent, otherwise raise CircuitOpenError"""
+        host = urlparse(url).netloc
+        with self._condition:
+            while True:
+                breaker = self._breaker(host)
+                if breaker['state'] == CLOSED:
+                    return host
+                if breaker['state'] == OPEN:
+                    self._skipped[host] = self._skipped.get(host, 0) + 1
+                    raise CircuitOpenError(host)
+                # Half-open: let exactly one probe through and hold the rest until it finishes
+                if host not in self._probing:
+                    self._probing.add(host)
+                    return host
+                self._condition.wait()
+
+    def record_success(self, host):
+        with self._condition:
+            breaker = self._breaker(host)
+            if breaker['state'] != CLOSED:
+                logger.info(f"Circuit breaker for {host} closed again")
+            breaker.update(state=CLOSED, failures=0, opened_at=None)
+            self._probing.discard(host)
+            self._condition.notify_all()
+
+    def record_failure(self, host):
+        with self._condition:
+            breaker = self._breaker(host)
+            breaker['failures'] += 1
+            if breaker['state'] == HALF_OPEN or breaker['failures'] >= self.failure_threshold:
+                if breaker['state'] != OPEN:
+                    logger.warning(f"Circuit breaker for {host} opened after "
+                                   f"{breaker['failures']} consecutive failures")
+                breaker.update(state=OPEN, opened_at=time.time())
+            self._probing.discard(host)
+            self._condition.notify_all()
+
+    def skipped(self):
+        """Return the number of requests skipped per host"""
+        with self._condition:
+            return dict(self._skipped)
+
+    def summary(self):
+        """Return the state, failure count and skipped requests of every known host"""
+        with self._condition:
+            return {host: {'state': breaker['state'],
+                           'consecutive_failures': breaker['failures'],
+                           'skipped_requests': self._skipped.get(host, 0)}
+                    for host, breaker in self._breakers.items()}
+
+    def save(self):
+        """Persist the breakers so open circuits are probed on the next run"""
+        if not self.path:
+            return
+        with self._condition:
+            data = {host: dict(breaker) for host, breaker in self._breakers.items()}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(self.path + '.tmp', self.path)
@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 """
-Script to cluster news articles based on their categories
-Takes CSV file input and outputs JSON clusters for the web application
+Script to cluster news articles based on their categories or their content
+Reads the articles from the article database, the source of truth for articles and
+clusters (an empty one is first filled from the article store or CSV file), saves the
+clusters to it for the web application and exports them as JSON. The default 'category' engine makes one cluster per category;
+the 'tfidf' engine groups articles by the similarity of their text (see content_clustering.py).
+With --incremental, the fitted model is saved and later runs only assign the new articles.
 """
 import os
-import json
+import time
+import argparse
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
 import logging
 
+from article_store import ArticleStore, load_articles
+from article_db import open_article_database
+from article_record import articles_from_frame, group_by_category, dump_clusters
+from content_clustering import (ALGORITHMS, DEFAULT_MAX_FEATURES, DEFAULT_SEED, MAX_SIMILARITY_DROP, MAX_GROWTH,
+                                ClusterModel, article_keys, cluster_by_content)
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,14 +31,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def load_data(input_csv):
+def load_data(input_csv, columns=None, engine=None):
     """
-    Load article data from CSV file
+    Load article data from the article store, or from the CSV file when there is no store
+    Only `columns` are read (all by default); newspaper, category and date_scraped are categoricals.
+    `engine` is the CSV parser: 'c' (chunked, the default) or 'pyarrow' (faster, needs pyarrow)
     """
     logger.info(f"Loading data from {input_csv}")
 
+    store = ArticleStore()
     # Check if file exists
-    if not os.path.exists(input_csv):
+    if not store.exists() and not os.path.exists(input_csv):
         logger.error(f"File {input_csv} does not exist!")
 
         # If the real data doesn't exist, create a sample dataset for testing
@@ -37,10 +49,10 @@ def load_data(input_csv):
         data = create_sample_data()
         return data
 
-    # Load the CSV file
+    # Load the articles, only reading the requested columns
     try:
-        df = pd.read_csv(input_csv)
-        logger.info(f"Loaded {len(df)} articles from {input_csv}")
+        df = load_articles(columns=columns, csv_path=input_csv, store=store, engine=engine)
+        logger.info(f"Loaded {len(df)} articles")
         return df
     except Exception as e:
         logger.error(f"Error loading CSV: {str(e)}")
@@ -82,53 +94,88 @@ def create_sample_data():
     return df
 
 
-def cluster_articles(df):
+def cluster_articles(df, engine='category', **options):
     """
-    Cluster articles based on their categories
-    In this implementation, we're simply using the category as the cluster
-    but you could modify this to use more sophisticated clustering
+    Cluster articles based on their categories ('category' engine)
+    or on the similarity of their content ('tfidf' engine)
+    `options` go to content_clustering.cluster_by_content: n_clusters, algorithm, seed, max_features
     """
     logger.info("Clustering articles...")
 
-    # Method 1: Simple clustering by category
-    # Create a dictionary where each category is a cluster
-    clusters = {}
+    if engine == 'tfidf':
+        # Method 2: TF-IDF vectors of title and body grouped with k-means
+        clusters = cluster_by_content(articles_from_frame(df), **options)
+        logger.info(f"Created {len(clusters)} clusters using TF-IDF and k-means")
+        return clusters
 
-    # For each unique category, create a cluster
-    for i, category in enumerate(df['category'].unique()):
-        # Get all articles in this category
-        articles = df[df['category'] == category].to_dict('records')
-        # Add them to the cluster
-        clusters[str(i)] = articles
+    # Method 1: Simple clustering by category
+    # Each category becomes a cluster of compact Article records
+    clusters = group_by_category(articles_from_frame(df))
 
     logger.info(f"Created {len(clusters)} clusters based on categories")
 
-    # Method 2: Advanced clustering using TF-IDF and K-means (uncomment to use)
-    # This would cluster based on content similarity rather than just category
-    """
-    # Create a TF-IDF vectorizer
-    vectorizer = TfidfVectorizer(stop_words='english')
+    return clusters
 
-    # Fit and transform the article content
-    tfidf_matrix = vectorizer.fit_transform(df['content'])
 
-    # Use K-means to cluster the articles
-    # You can adjust the number of clusters (n_clusters) as needed
-    kmeans = KMeans(n_clusters=4, random_state=42)
-    df['cluster'] = kmeans.fit_predict(tfidf_matrix)
+def cluster_from_database(db, snippets=True):
+    """
+    Cluster articles by category with one indexed query per category,
+    without loading the whole table first or reading whole bodies
+    """
+    logger.info("Clustering articles from the article database...")
 
-    # Create a dictionary where each cluster is a list of articles
     clusters = {}
-    for cluster_id in df['cluster'].unique():
-        articles = df[df['cluster'] == cluster_id].to_dict('records')
-        clusters[str(cluster_id)] = articles
-
-    logger.info(f"Created {len(clusters)} clusters using TF-IDF and K-means")
-    """
+    for i, category in enumerate(db.categories()):
+        articles = db.articles(categories=[category], with_content=False)
+        if not snippets:
+            for article in articles:
+                article.snippet = None
+        clusters[str(i)] = articles
 
+    logger.info(f"Created {len(clusters)} clusters based on categories")
     return clusters
 
 
+def cluster_incrementally(articles, model_path, options, max_similarity_drop=MAX_SIMILARITY_DROP,
+                          max_growth=MAX_GROWTH):
+    """
+    Assign the articles that are new since the last run to the clusters of the saved model,
+    fitting a new model on every article when there is none yet, it was fitted with other
+    `options` or drift crosses a threshold
+    """
+    if not articles:
+        return {}
+    model = ClusterModel.load(model_path)
+    changed = model.changed_options(options) if model is not None else []
+    if changed:
+        logger.info(f"{model_path} was fitted with other options ({', '.join(changed)}), "
+                    f"refitting the clusters on all articles")
+        model = None
+    if model is not None:
+        start = time.perf_counter()
+        keys = article_keys(articles)
+        labels = [model.assignments.get(key) for key in keys]
+        new_positions = [i for i, label in enumerate(labels) if label is None]
+        new_articles = [articles[i] for i in new_positions]
+        for i, label in zip(new_positions, model.add(new_articles, keys=[keys[i] for i in new_positions])):
+            labels[i] = int(label)
+        # Only the current articles stay assigned, so removed or replaced ones do not pile up
+        model.assignments = dict(zip(keys, labels))
+        drift = model.drift()
+        logger.info(f"Assigned {len(new_articles)} new articles to the {len(model.counts)} clusters of "
+                    f"{model_path} in {(time.perf_counter() - start) * 1000:.0f} ms; since the fit at "
+                    f"{model.fitted_at}: similarity drop {drift['similarity_drop']:.1%}, "
+                    f"growth {drift['growth']:.1%}, without known terms {drift['unknown_terms']:.1%}")
+        if not model.needs_refit(max_similarity_drop, max_growth):
+            model.save(model_path)
+            return model.clusters(articles, labels)
+        logger.info("Drift crossed its threshold, refitting the clusters on all articles")
+
+    model = ClusterModel.fit(articles, **options)
+    model.save(model_path)
+    return model.fitted_clusters(articles)
+
+
 def save_clusters(clusters, output_json):
     """
     Save the clusters to a JSON file
@@ -138,28 +185,94 @@ def save_clusters(clusters, output_json):
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(output_json), exist_ok=True)
 
-    # Save to JSON
+    # Save to JSON, one article at a time
     with open(output_json, 'w') as f:
-        json.dump(clusters, f, indent=2)
+        dump_clusters(clusters, f)
 
     logger.info(f"Saved {len(clusters)} clusters to {output_json}")
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options for clustering"""
+    parser = argparse.ArgumentParser(description="Cluster scraped news articles")
+    parser.add_argument('--engine', choices=['category', 'tfidf'], default='category',
+                        help="Cluster by category, or by content with TF-IDF and k-means")
+    parser.add_argument('--clusters', type=int, default=None,
+                        help="Number of content clusters (default: sqrt(articles / 2), at most 200)")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='spherical',
+                        help="k-means variant of the tfidf engine: spherical (cosine) k-means or MiniBatchKMeans")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help="Random seed; the same articles and seed always give the same clusters")
+    parser.add_argument('--max-features', type=int, default=DEFAULT_MAX_FEATURES,
+                        help="Largest TF-IDF vocabulary of the tfidf engine")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Use the tfidf engine, save the fitted model and on later runs only assign new articles")
+    parser.add_argument('--model', default='news_data/cluster_model.pkl',
+                        help="Saved model of --incremental")
+    parser.add_argument('--max-similarity-drop', type=float, default=MAX_SIMILARITY_DROP,
+                        help="Refit when new articles are this much less similar to their cluster "
+                             "than the fitted ones (relative)")
+    parser.add_argument('--max-growth', type=float, default=MAX_GROWTH,
+                        help="Refit once the articles added since the fit reach this fraction of the fitted ones")
+    parser.add_argument('--no-snippets', action='store_true',
+                        help="Do not load article snippets; the cluster file gets snippet: null")
+    parser.add_argument('--csv-engine', choices=['c', 'pyarrow'], default='c',
+                        help="Parser for all_articles.csv when it is imported into an empty article database")
+    args = parser.parse_args(argv)
+    if args.incremental:
+        args.engine = 'tfidf'
+    return args
+
+
+def main(argv=None):
     """
     Main function to run the clustering process
     """
+    args = parse_args(argv)
     logger.info("Starting article clustering")
 
     # Define input and output files
     input_csv = "news_data/all_articles.csv"
     output_json = "static/cluster_data.json"
 
-    # Load data
-    df = load_data(input_csv)
+    db_path = "news_data/articles.db"
+    content_engine = args.engine == 'tfidf'
+    options = dict(n_clusters=args.clusters, algorithm=args.algorithm, seed=args.seed,
+                   max_features=args.max_features) if content_engine else {}
 
-    # Cluster articles
-    clusters = cluster_articles(df)
+    clusters = None
+    articles = None
+    db = open_article_database(db_path, input_csv, engine=args.csv_engine)
+    try:
+        if db.count() and content_engine:
+            # Bodies are streamed from the body store while the articles are vectorized
+            articles = db.articles(with_content=False)
+        elif db.count():
+            clusters = cluster_from_database(db, snippets=not args.no_snippets)
+        else:
+            # Nothing has been scraped yet: cluster sample data, which never enters the database
+            df = load_data(input_csv)
+            if args.incremental:
+                articles = articles_from_frame(df)
+            else:
+                clusters = cluster_articles(df, args.engine, **options)
+
+        if articles is not None:
+            if args.incremental:
+                clusters = cluster_incrementally(articles, args.model, options, args.max_similarity_drop,
+                                                 args.max_growth)
+            else:
+                clusters = cluster_by_content(articles, **options)
+
+        if db.count():
+            logger.info(f"Saved {db.save_clusters(clusters)} clustered articles to the article database")
+    finally:
+        db.close()
+
+    if args.no_snippets:
+        for articles in clusters.values():
+            for article in articles:
+                article.snippet = None
 
     # Save clusters
     save_clusters(clusters, output_json)
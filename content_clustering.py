@@ -0,0 +1,325 @@
+"""
+Content clustering of articles with TF-IDF and k-means
+Articles are turned into sparse float32 TF-IDF vectors of their title and body and grouped
+with spherical k-means, which compares articles by cosine similarity, or with
+MiniBatchKMeans. Bodies are read from the body store one at a time while the vectorizer streams
+over them, and similarities are computed in blocks of rows, so memory stays proportional to
+the sparse matrix rather than to articles x clusters. Seeding is deterministic: the same
+articles, k and seed always give the same clusters.
+
+A ClusterModel keeps the fitted vectorizer and centroids, so articles scraped later can be
+assigned to the existing clusters without refitting until they drift away from them.
+"""
+import os
+import time
+import pickle
+import logging
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans, kmeans_plusplus
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from body_store import BodyStore
+from scrape_frontier import canonical_url
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ('spherical', 'minibatch')
+DEFAULT_MAX_FEATURES = 100000
+DEFAULT_SEED = 42
+BATCH_SIZE = 4096
+# Rows whose similarities to every centroid are computed at once
+ASSIGN_CHUNK_ROWS = 50000
+# Below this many articles every term is kept, however rare or common
+MIN_PRUNED_ARTICLES = 100
+# Articles used to pick the initial spherical k-means centroids
+SEED_SAMPLE_ROWS = 5000
+# Incremental clustering refits once new articles are this much less similar to their
+# centroid than the fitted ones (relative), or once this many articles per fitted article were added
+MAX_SIMILARITY_DROP = 0.2
+MAX_GROWTH = 0.5
+# Options of ClusterModel.fit and their defaults; a saved model is only reused with the same ones
+FIT_OPTIONS = {'n_clusters': None, 'algorithm': 'spherical', 'seed': DEFAULT_SEED,
+               'max_features': DEFAULT_MAX_FEATURES}
+
+
+def default_clusters(n_articles):
+    """Rule-of-thumb number of clusters, sqrt(n / 2), between 2 and 200"""
+    return int(min(200, max(2, round((n_articles / 2) ** 0.5))))
+
+
+def article_text(article, bodies):
+    """Title and body of an article; the snippet stands in for a body missing from the store"""
+    return f"{article.title or ''}\n{article.body(bodies) or article.snippet or ''}"
+
+
+def article_keys(articles):
+    """Keys that tell articles apart in a saved model, one per article
+
+    Articles are keyed by canonical URL, so a re-extracted article keeps its key. Some sites
+    reuse one URL for several articles: an article whose URL is already taken by an earlier
+    one in `articles` is keyed by its URL and title instead.
+    """
+    keys = []
+    taken = set()
+    for article in articles:
+        key = canonical_url(article.url) if article.url else article.title
+        if key in taken:
+            key = (key, article.title)
+        taken.add(key)
+        keys.append(key)
+    return keys
+
+
+def build_vectorizer(max_features=DEFAULT_MAX_FEATURES, n_articles=None):
+    """TF-IDF vectorizer producing L2-normalised float32 rows"""
+    # Terms in a single article cannot link articles and terms in most of them cannot tell them
+    # apart, but a handful of articles (or identical ones) would lose every term to that pruning
+    prune = n_articles is None or n_articles >= MIN_PRUNED_ARTICLES
+    return TfidfVectorizer(stop_words='english', sublinear_tf=True, min_df=2 if prune else 1,
+                           max_df=0.5 if prune else 1.0, max_features=max_features, dtype=np.float32)
+
+
+def assign(X, centers, chunk_rows=ASSIGN_CHUNK_ROWS):
+    """Return the most similar centroid of every row and that similarity (rows and centroids unit length)"""
+    labels = np.empty(X.shape[0], dtype=np.int32)
+    similarities = np.empty(X.shape[0], dtype=np.float32)
+    centers_t = np.ascontiguousarray(centers.T)
+    for start in range(0, X.shape[0], chunk_rows):
+        block = np.asarray(X[start:start + chunk_rows] @ centers_t)
+        labels[start:start + len(block)] = block.argmax(axis=1)
+        similarities[start:start + len(block)] = block.max(axis=1)
+    return labels, similarities
+
+
+def cluster_sums(X, labels, n_clusters):
+    """Sum of the rows of every cluster, as a sparse n_clusters x terms matrix"""
+    membership = sp.csr_matrix((np.ones(X.shape[0], dtype=np.float32), (labels, np.arange(X.shape[0]))),
+                               shape=(n_clusters, X.shape[0]))
+    return (membership @ X).tocsr()
+
+
+def spherical_kmeans(X, n_clusters, seed=DEFAULT_SEED, max_iter=20, tol=1e-4):
+    """k-means on the unit sphere: articles join the centroid with the highest cosine similarity
+
+    Centroids are seeded with k-means++ on a sample of rows. Iteration stops when no
+    article changes cluster or the mean similarity improves by less than `tol` (relative).
+    Returns (labels, centers).
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(X.shape[0], size=min(X.shape[0], SEED_SAMPLE_ROWS), replace=False))
+    centers, _ = kmeans_plusplus(X[sample], n_clusters, random_state=seed)
+    centers = normalize(np.asarray(centers, dtype=np.float32))
+
+    labels = None
+    previous = None
+    for iteration in range(max_iter):
+        new_labels, similarities = assign(X, centers)
+        changed = X.shape[0] if labels is None else int((new_labels != labels).sum())
+        labels = new_labels
+        objective = float(similarities.mean())
+        sums = cluster_sums(X, labels, n_clusters).toarray()
+        # A centroid that lost all its articles stays where it was
+        occupied = np.bincount(labels, minlength=n_clusters) > 0
+        centers[occupied] = normalize(sums[occupied])
+        logger.debug(f"Spherical k-means iteration {iteration + 1}: {changed} articles moved, "
+                     f"mean similarity {objective:.4f}")
+        if changed == 0 or (previous is not None and objective - previous <= tol * previous):
+            break
+        previous = objective
+    return labels, centers
+
+
+def fit_clusters(X, n_clusters, algorithm='spherical', seed=DEFAULT_SEED, batch_size=BATCH_SIZE):
+    """Cluster TF-IDF rows; returns (labels, centers) with unit-length centroids"""
+    if algorithm == 'spherical':
+        return spherical_kmeans(X, n_clusters, seed=seed)
+    if algorithm != 'minibatch':
+        raise ValueError(f"Unknown clustering algorithm: {algorithm} (choose from {', '.join(ALGORITHMS)})")
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, n_init=1, random_state=seed)
+    labels = kmeans.fit_predict(X)
+    return labels.astype(np.int32), normalize(kmeans.cluster_centers_.astype(np.float32))
+
+
+def top_terms(centers, vectorizer, n_terms=6):
+    """Return the highest-weighted terms of every centroid"""
+    terms = vectorizer.get_feature_names_out()
+    return [[terms[i] for i in np.argsort(center)[::-1][:n_terms] if center[i] > 0] for center in centers]
+
+
+class ClusterModel:
+    """Fitted TF-IDF vectorizer and centroids that new articles can be assigned to
+
+    Every centroid is kept as the sum of its articles' unit vectors, so adding articles
+    moves it exactly like a partial_fit step with a 1/n learning rate. `labels` holds the
+    cluster of every fitted article in input order and `assignments` maps the article_keys()
+    of the articles seen so far to their cluster. Drift since the fit is measured on the
+    articles added afterwards (see drift()).
+    """
+
+    def __init__(self, vectorizer, sums, counts, labels, assignments, baseline_similarity, options):
+        self.vectorizer = vectorizer
+        self.sums = sums
+        self.counts = counts
+        self.labels = labels
+        self.assignments = assignments
+        # Mean similarity of the fitted articles to their closest centroid
+        self.baseline_similarity = baseline_similarity
+        # The fit options as requested (see FIT_OPTIONS)
+        self.options = options
+        self.fitted_articles = len(labels)
+        self.fitted_at = datetime.now().isoformat(timespec='seconds')
+        # Articles added since the fit, their summed similarity and how many had no known term
+        self.added = 0
+        self.added_similarity = 0.0
+        self.added_unknown = 0
+
+    @property
+    def centers(self):
+        return normalize(self.sums)
+
+    @classmethod
+    def fit(cls, articles, n_clusters=None, algorithm='spherical', seed=DEFAULT_SEED,
+            max_features=DEFAULT_MAX_FEATURES, bodies=None):
+        """Vectorize and cluster articles; `n_clusters` defaults to default_clusters(len(articles))"""
+        bodies = bodies or BodyStore()
+        options = dict(n_clusters=n_clusters, algorithm=algorithm, seed=seed, max_features=max_features)
+        n_clusters = min(n_clusters or default_clusters(len(articles)), len(articles))
+
+        start = time.perf_counter()
+        vectorizer = build_vectorizer(max_features, len(articles))
+        try:
+            X = vectorizer.fit_transform(article_text(article, bodies) for article in articles)
+        except ValueError as e:
+            # No text or nothing but stop words: there is nothing to tell the articles apart by
+            logger.warning(f"No TF-IDF terms in {len(articles)} articles ({str(e)}), putting them in one cluster")
+            labels = np.zeros(len(articles), dtype=np.int32)
+            return cls(None, np.zeros((1, 0), dtype=np.float32), np.array([len(articles)]), labels,
+                       dict.fromkeys(article_keys(articles), 0), 0.0, options)
+        logger.info(f"Vectorized {X.shape[0]} articles into {X.shape[1]} TF-IDF terms "
+                    f"({X.nnz} non-zeros) in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        labels, _ = fit_clusters(X, n_clusters, algorithm, seed)
+        logger.info(f"Clustered {X.shape[0]} articles into {n_clusters} clusters with {algorithm} k-means "
+                    f"in {time.perf_counter() - start:.1f}s")
+
+        sums = cluster_sums(X, labels, n_clusters).toarray()
+        _, similarities = assign(X, normalize(sums))
+        model = cls(vectorizer, sums, np.bincount(labels, minlength=n_clusters), labels,
+                    dict(zip(article_keys(articles), labels.tolist())),
+                    float(similarities.mean()), options)
+        for label, terms in enumerate(top_terms(model.centers, vectorizer)):
+            if model.counts[label]:
+                logger.info(f"Cluster {label} ({model.counts[label]} articles): {', '.join(terms)}")
+        return model
+
+    def add(self, articles, bodies=None, keys=None):
+        """Assign articles to their most similar centroid and move the centroids towards them
+
+        `keys` are their article_keys() within the whole corpus, by default within `articles`.
+        Returns their labels. Costs time in proportion to the number of articles added, not to the corpus.
+        """
+        if not articles:
+            return np.empty(0, dtype=np.int32)
+        keys = keys if keys is not None else article_keys(articles)
+        if self.vectorizer is None:
+            # Fitted without a vocabulary: one cluster, and every article counts as unknown
+            labels = np.zeros(len(articles), dtype=np.int32)
+            self.counts[0] += len(articles)
+            self.assignments.update(dict.fromkeys(keys, 0))
+            self.added += len(articles)
+            self.added_unknown += len(articles)
+            return labels
+        bodies = bodies or BodyStore()
+        X = self.vectorizer.transform(article_text(article, bodies) for article in articles)
+        labels, similarities = assign(X, self.centers)
+        touched = np.unique(labels)
+        self.sums[touched] += cluster_sums(X, labels, len(self.counts))[touched].toarray()
+        self.counts += np.bincount(labels, minlength=len(self.counts))
+        self.assignments.update(zip(keys, labels.tolist()))
+        self.added += len(articles)
+        self.added_similarity += float(similarities.sum())
+        self.added_unknown += int((X.getnnz(axis=1) == 0).sum())
+        return labels
+
+    def drift(self):
+        """Drift of the articles added since the fit
+
+        similarity_drop: how much less similar they are to their centroid than the fitted
+        articles were (relative); growth: how many were added relative to the fitted
+        articles; unknown_terms: the share without a single term of the vocabulary.
+        """
+        if not self.added:
+            return {'similarity_drop': 0.0, 'growth': 0.0, 'unknown_terms': 0.0}
+        mean_similarity = self.added_similarity / self.added
+        return {'similarity_drop': 1 - mean_similarity / self.baseline_similarity if self.baseline_similarity else 0.0,
+                'growth': self.added / max(1, self.fitted_articles),
+                'unknown_terms': self.added_unknown / self.added}
+
+    def changed_options(self, options):
+        """Return the names of the fit options that differ from those of this model"""
+        requested = {**FIT_OPTIONS, **options}
+        return [name for name in FIT_OPTIONS if self.options.get(name) != requested[name]]
+
+    def needs_refit(self, max_similarity_drop=MAX_SIMILARITY_DROP, max_growth=MAX_GROWTH):
+        drift = self.drift()
+        return drift['similarity_drop'] > max_similarity_drop or drift['growth'] > max_growth
+
+    def clusters(self, articles, labels=None):
+        """Return {cluster_id: [articles]}, by cluster id
+
+        `labels` gives the cluster of every article by position; without them articles are
+        looked up in the assignments and those never assigned are left out.
+        """
+        if labels is None:
+            labels = [self.assignments.get(key) for key in article_keys(articles)]
+        groups = {}
+        for article, label in zip(articles, labels):
+            if label is not None:
+                groups.setdefault(int(label), []).append(article)
+        return {str(label): groups[label] for label in sorted(groups)}
+
+    def fitted_clusters(self, articles):
+        """Return the clusters of the articles the model was fitted on, in the order they were given"""
+        if len(articles) != len(self.labels):
+            raise ValueError(f"The model was fitted on {len(self.labels)} articles, not {len(articles)}")
+        clusters = self.clusters(articles, self.labels)
+        fitted = int(np.count_nonzero(np.bincount(self.labels, minlength=len(self.counts))))
+        if len(clusters) != fitted:
+            raise RuntimeError(f"Grouped the articles into {len(clusters)} clusters but fitted {fitted}")
+        return clusters
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved model; None if there is none or it cannot be read"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cluster model {path}: {str(e)}")
+            return None
+
+
+def cluster_by_content(articles, n_clusters=None, algorithm='spherical', seed=DEFAULT_SEED,
+                       max_features=DEFAULT_MAX_FEATURES, bodies=None):
+    """Cluster articles by the similarity of their text
+
+    Returns {cluster_id: [articles]} like the category clustering; cluster ids are the
+    k-means labels and empty clusters are left out. `n_clusters` defaults to
+    default_clusters(len(articles)).
+    """
+    if not articles:
+        return {}
+    return ClusterModel.fit(articles, n_clusters, algorithm, seed, max_features, bodies).fitted_clusters(articles)
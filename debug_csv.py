@@ -6,7 +6,9 @@ This script helps diagnose issues with reading and processing the CSV data
 import os
 import sys
 import pandas as pd
-import json
+
+from article_store import ArticleStore, load_articles
+from article_record import ARTICLE_COLUMNS, articles_from_frame, group_by_category, dump_clusters
 
 
 def print_header(message):
@@ -22,6 +24,11 @@ def check_csv_file():
 
     csv_path = "news_data/all_articles.csv"
 
+    store = ArticleStore()
+    if store.exists():
+        print(f"✅ Article store found at {store.root} with {store.count()} articles")
+        return True
+
     if not os.path.exists(csv_path):
         print(f"❌ Error: CSV file not found at {csv_path}")
         print("Possible solutions:")
@@ -48,8 +55,8 @@ def read_csv_file():
     csv_path = "news_data/all_articles.csv"
 
     try:
-        df = pd.read_csv(csv_path)
-        print(f"✅ Successfully read CSV file with {len(df)} rows and {len(df.columns)} columns")
+        df = load_articles(csv_path=csv_path)
+        print(f"✅ Successfully read the articles: {len(df)} rows and {len(df.columns)} columns")
 
         # Display column names
         print("\nColumns:")
@@ -57,7 +64,7 @@ def read_csv_file():
             print(f"  {i + 1}. {col}")
 
         # Check if required columns exist
-        required_columns = ['newspaper', 'category', 'title', 'url', 'content', 'date_scraped']
+        required_columns = ARTICLE_COLUMNS
         missing_columns = [col for col in required_columns if col not in df.columns]
 
         if missing_columns:
@@ -99,8 +106,8 @@ def check_clustering():
     csv_path = "news_data/all_articles.csv"
 
     try:
-        # Read CSV
-        df = pd.read_csv(csv_path)
+        # Read the articles
+        df = load_articles(csv_path=csv_path)
 
         # Get unique categories
         if 'category' in df.columns:
@@ -108,23 +115,14 @@ def check_clustering():
             print(f"Found {len(categories)} unique categories: {', '.join(categories)}")
 
             # Create clusters based on categories
-            clusters = {}
-            for i, category in enumerate(categories):
-                # Filter articles for this category
-                category_articles = df[df['category'] == category]
-
-                # Convert to list of dictionaries for JSON serialization
-                articles_list = category_articles.to_dict('records')
-
-                # Add to clusters
-                clusters[str(i)] = articles_list
-
-                print(f"Created cluster {i} for category '{category}' with {len(articles_list)} articles")
+            clusters = group_by_category(articles_from_frame(df))
+            for cluster_id, articles in clusters.items():
+                print(f"Created cluster {cluster_id} for category '{articles[0].category}' with {len(articles)} articles")
 
             # Save to a test file
             test_output = "static/test_cluster_data.json"
             with open(test_output, 'w') as f:
-                json.dump(clusters, f, indent=2)
+                dump_clusters(clusters, f)
 
             print(f"\n✅ Successfully created test clusters and saved to {test_output}")
             print(f"To use this test data, rename the file to cluster_data.json")
@@ -151,7 +149,7 @@ def fix_csv_issues(df):
     modified = False
 
     # Fix missing columns
-    required_columns = ['newspaper', 'category', 'title', 'url', 'content', 'date_scraped']
+    required_columns = ARTICLE_COLUMNS
     for col in required_columns:
         if col not in df.columns:
             print(f"Adding missing column: {col}")
@@ -167,12 +165,16 @@ def fix_csv_issues(df):
         if count > 0:
             print(f"Fixing {count} empty values in column: {col}")
             if col == 'date_scraped':
-                df[col].fillna(pd.Timestamp.now().strftime('%Y-%m-%d'), inplace=True)
+                value = pd.Timestamp.now().strftime('%Y-%m-%d')
             elif col == 'category':
                 # Try to infer categories from the title or content
-                df[col].fillna('Uncategorized', inplace=True)
+                value = 'Uncategorized'
             else:
-                df[col].fillna(f"Missing {col}", inplace=True)
+                value = f"Missing {col}"
+            # Categorical columns only accept values that are already categories
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([value])
+            df[col] = df[col].fillna(value)
             modified = True
 
     if modified:
@@ -0,0 +1,243 @@
+"""
+Distributed mode for the newspaper scraper
+Category pages and articles are processed as tasks from a shared work queue, so any number
+of worker processes, on this machine or on others sharing the queue, scrape together.
+Articles are appended to the shared per-newspaper CSV files.
+
+    python distributed_scraper.py seed                 # queue every category page
+    python distributed_scraper.py work --processes 4   # run workers until the queue is empty
+    python distributed_scraper.py status               # task counts
+    python distributed_scraper.py collect              # rebuild the article store (or all_articles.csv)
+"""
+import os
+import time
+import argparse
+import logging
+import multiprocessing
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+from newspaper_scrapper import NewspaperScraper, SessionPool, combine_newspaper_csvs
+from article_store import ArticleStore
+from article_db import ArticleDatabase
+from article_record import Article, scrape_date
+from body_store import BodyStore
+from host_controller import HostController
+from page_archive import PageArchive
+from replay_server import ReplayServer, ReplayAdapter
+from work_queue import SQLiteWorkQueue, CSVArticleSink
+
+logger = logging.getLogger(__name__)
+
+
+def build_scraper(args, server_url=None):
+    """Create the scraper a worker process uses for fetching and extraction"""
+    adapter_factory = partial(ReplayAdapter, server_url) if server_url else HTTPAdapter
+    sessions = SessionPool(timeout=args.timeout, adapter_factory=adapter_factory)
+    # The queue spaces requests to each host across all workers; the local controller
+    # only adds backoff after errors and honours Retry-After
+    controller = HostController(min_delay=0, max_delay=0, max_concurrency=args.threads)
+    near_duplicates = None
+    if args.near_duplicates != 'off':
+        from near_duplicates import NearDuplicateIndex
+        near_duplicates = NearDuplicateIndex(os.path.join(args.data_dir, 'near_duplicates.db'))
+    return NewspaperScraper(sessions=sessions, controller=controller, data_dir=args.data_dir,
+                            near_duplicates=near_duplicates, duplicate_mode=args.near_duplicates)
+
+
+def process_category(scraper, queue, task, max_articles):
+    """Queue the new article links of a category page; returns False if the page could not be used"""
+    newspaper = scraper.newspapers[task['newspaper_id']]
+    with scraper.telemetry.scope(newspaper=newspaper['name'], category=task['category'], page_type='listing'):
+        try:
+            links = scraper.scrape_article_links(task['url'], newspaper, raise_errors=True)
+        except Exception:
+            # Already logged by the scraper; the task is returned to the queue and retried
+            return False
+    added = queue.add_articles(task['newspaper_id'], task['category'], links, limit=max_articles)
+    logger.info(f"Queued {added} new articles from {task['url']}")
+    return True
+
+
+def process_article(scraper, sink, task):
+    """Fetch, extract and save one article; returns False if it should be retried"""
+    newspaper = scraper.newspapers[task['newspaper_id']]
+    article = {'url': task['url'], 'title': task['title']}
+    extraction = scraper.download_and_queue(article, newspaper, task['category'])
+    with scraper.telemetry.scope(newspaper=newspaper['name'], category=task['category']):
+        content = scraper.article_content_result(extraction, task['url'], newspaper)
+    if len(content) < 50:
+        logger.warning(f"Article content too short: {task['url']}")
+        return False
+
+    if scraper.near_duplicates is not None and scraper.is_dropped_duplicate(task['url'], content, newspaper):
+        return True
+
+    sink.write(task['newspaper_id'], Article(newspaper['name'], task['category'], task['title'], task['url'],
+                                             content, scrape_date()))
+    with scraper.telemetry.scope(newspaper=newspaper['name'], category=task['category']):
+        scraper.telemetry.record_yield(saved=1)
+    return True
+
+
+def work_loop(worker_id, scraper, queue, sink, args):
+    """Lease and process tasks until the queue is empty; returns the number of tasks processed"""
+    processed = 0
+    while True:
+        task = queue.lease(worker_id)
+        if task is None:
+            if queue.drained():
+                return processed
+            # Everything left is leased by other workers or waiting for its host
+            time.sleep(args.poll_interval)
+            continue
+
+        try:
+            if task['kind'] == 'category':
+                done = process_category(scraper, queue, task, args.max_articles)
+            else:
+                done = process_article(scraper, sink, task)
+        except Exception as e:
+            logger.error(f"Error processing {task['url']}: {str(e)}")
+            done = False
+
+        if done:
+            queue.ack(task['id'], worker_id)
+        else:
+            queue.fail(task['id'], worker_id)
+        processed += 1
+
+        # Share backoff requested by the host (Retry-After) with every other worker
+        blocked_for = scraper.controller.state(urlparse(task['url']).netloc)['blocked_for']
+        if blocked_for:
+            queue.defer_host(task['host'], blocked_for)
+
+
+def run_worker(worker_id, args):
+    """Entry point of one worker process; runs `args.threads` work loops"""
+    replay_server = None
+    server_url = None
+    if args.replay:
+        replay_server = ReplayServer(PageArchive(args.replay))
+        server_url = replay_server.start()
+
+    scraper = build_scraper(args, server_url)
+    queue = SQLiteWorkQueue(args.queue, lease_seconds=args.lease_seconds, host_delay=args.host_delay)
+    sink = CSVArticleSink(args.data_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix=worker_id) as executor:
+            futures = [executor.submit(work_loop, f"{worker_id}-{i}", scraper, queue, sink, args)
+                       for i in range(args.threads)]
+            processed = sum(future.result() for future in futures)
+        logger.info(f"Worker {worker_id} processed {processed} tasks")
+        return processed
+    finally:
+        scraper.sessions.close()
+        if scraper.near_duplicates is not None:
+            scraper.near_duplicates.close()
+        queue.close()
+        if replay_server is not None:
+            replay_server.stop()
+
+
+def seed(args):
+    queue = SQLiteWorkQueue(args.queue)
+    newspapers = NewspaperScraper(data_dir=args.data_dir).newspapers
+    bodies = BodyStore(os.path.join(args.data_dir, 'bodies'))
+    for newspaper_id in args.newspapers or newspapers:
+        # Workers append rows without bodies, so files that still hold them are migrated
+        # now, before any worker has them open
+        csv_filename = os.path.join(args.data_dir, f"{newspaper_id}.csv")
+        if os.path.exists(csv_filename) and os.path.getsize(csv_filename) > 0:
+            bodies.migrate_csv(csv_filename)
+        added = queue.add_categories(newspaper_id, newspapers[newspaper_id]['categories'])
+        logger.info(f"Queued {added} category pages of {newspapers[newspaper_id]['name']}")
+    queue.close()
+
+
+def work(args):
+    node = f"{os.uname().nodename if hasattr(os, 'uname') else 'node'}-{os.getpid()}"
+    start = time.perf_counter()
+    if args.processes == 1:
+        run_worker(f"{node}-0", args)
+    else:
+        processes = [multiprocessing.Process(target=run_worker, args=(f"{node}-{i}", args))
+                     for i in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    logger.info(f"Queue drained in {time.perf_counter() - start:.1f}s")
+    status(args)
+
+
+def status(args):
+    queue = SQLiteWorkQueue(args.queue)
+    for kind, counts in sorted(queue.counts().items()):
+        logger.info(f"{kind} tasks: " + ', '.join(f"{count} {state}" for state, count in sorted(counts.items())))
+    queue.close()
+
+
+def collect(args):
+    """Rebuild the article store (all_articles.csv without pyarrow) from the shared per-newspaper CSV files"""
+    newspapers = NewspaperScraper(data_dir=args.data_dir).newspapers
+    df = combine_newspaper_csvs(newspapers.keys(), args.data_dir)
+    article_db = ArticleDatabase(os.path.join(args.data_dir, 'articles.db'),
+                                 bodies=BodyStore(os.path.join(args.data_dir, 'bodies')))
+    try:
+        logger.info(f"Upserted {article_db.upsert(df.to_dict('records'))} articles into the article database")
+    finally:
+        article_db.close()
+    store = ArticleStore(os.path.join(args.data_dir, 'articles'))
+    if store.available:
+        store.replace(df)
+        return
+    output = os.path.join(args.data_dir, 'all_articles.csv')
+    df.to_csv(output + '.tmp', index=False)
+    os.replace(output + '.tmp', output)
+    logger.info(f"Saved {len(df)} articles to {output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed newspaper scraping from a shared work queue")
+    parser.add_argument('--queue', default='news_data/work_queue.db', help="Shared work queue database")
+    parser.add_argument('--data-dir', default='news_data', help="Directory of the shared per-newspaper CSV files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help="Queue the category pages of every newspaper")
+    seed_parser.add_argument('--newspapers', nargs='+', help="Only queue these newspaper ids")
+    seed_parser.set_defaults(run=seed)
+
+    work_parser = subparsers.add_parser('work', help="Process tasks until the queue is empty")
+    work_parser.add_argument('--processes', type=int, default=1, help="Worker processes on this machine")
+    work_parser.add_argument('--threads', type=int, default=2, help="Concurrent tasks per worker process")
+    work_parser.add_argument('--max-articles', type=int, default=5,
+                             help="New articles queued per category page")
+    work_parser.add_argument('--host-delay', type=float, default=1.0,
+                             help="Seconds between requests to one host across all workers")
+    work_parser.add_argument('--lease-seconds', type=float, default=120,
+                             help="Time after which an unacknowledged task is handed to another worker")
+    work_parser.add_argument('--poll-interval', type=float, default=0.2,
+                             help="Wait between lease attempts when no task is available")
+    work_parser.add_argument('--near-duplicates', choices=['drop', 'mark', 'off'], default='drop',
+                             help="Near-duplicate handling, as for newspaper_scrapper.py")
+    work_parser.add_argument('--timeout', type=float, default=15, help="Request timeout in seconds")
+    work_parser.add_argument('--replay', metavar='DIR',
+                             help="Serve pages from a page archive through a local replay server")
+    work_parser.set_defaults(run=work)
+
+    subparsers.add_parser('status', help="Show task counts").set_defaults(run=status)
+    subparsers.add_parser('collect', help="Rebuild the article store").set_defaults(run=collect)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
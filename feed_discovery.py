@@ -0,0 +1,177 @@
+"""
+Article discovery from RSS/Atom feeds and XML sitemaps
+Feeds are parsed incrementally while they download, so large sitemaps never have to be
+held in memory. Entries published before a feed was last read are skipped, and the time
+of every successful read is persisted for the next run.
+"""
+import os
+import re
+import json
+import threading
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime, format_datetime
+from urllib.parse import urlparse
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16 * 1024
+
+# Elements that describe one article, and the element that lists a child sitemap
+ENTRY_ELEMENTS = {'item', 'entry', 'url'}
+SITEMAP_ELEMENT = 'sitemap'
+DATE_ELEMENTS = ('lastmod', 'publication_date', 'pubDate', 'updated', 'published', 'date')
+
+
+def local_name(tag):
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_date(text):
+    """Parse an RFC 822 (RSS) or ISO 8601 (Atom, sitemaps) date into an aware datetime, or None"""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        parsed = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def title_from_url(url):
+    """Make a readable title from the slug of an article URL (sitemaps without news titles)"""
+    slug = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+    slug = re.sub(r'\.\w+$', '', slug)
+    words = re.sub(r'[-_]+', ' ', slug).strip()
+    return words[:1].upper() + words[1:] if words else url
+
+
+class FeedReader:
+    """Incremental parser for RSS, Atom, sitemap and sitemap index documents
+
+    Collects article entries ({'url', 'title', 'date'}) and child sitemap URLs; anything
+    dated at or before `since` is skipped.
+    """
+
+    def __init__(self, since=None):
+        self.since = since
+        self.entries = []
+        self.sitemaps = []
+        self.skipped = 0
+        self.bytes_read = 0
+        self._parser = XMLPullParser(events=('start', 'end'))
+        # Elements that are open, outermost first
+        self._open = []
+
+    def feed(self, chunk):
+        self.bytes_read += len(chunk)
+        self._parser.feed(chunk)
+        self._process_events()
+
+    def close(self):
+        try:
+            self._parser.close()
+        except ParseError as e:
+            logger.warning(f"Feed ended with malformed XML: {str(e)}")
+        self._process_events()
+
+    def _process_events(self):
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self._open.append(element)
+                continue
+
+            self._open.pop()
+            name = local_name(element.tag)
+            if name in ENTRY_ELEMENTS or name == SITEMAP_ELEMENT:
+                self._add(name, element)
+                # Drop finished entries so memory stays flat however long the document is
+                if self._open:
+                    self._open[-1].remove(element)
+
+    def _add(self, name, element):
+        fields = {}
+        for child in element.iter():
+            child_name = local_name(child.tag)
+            if child_name == 'link' and child.get('href') and child.get('rel', 'alternate') == 'alternate':
+                fields.setdefault('link', child.get('href'))  # Atom
+            elif child.text and child.text.strip():
+                fields.setdefault(child_name, child.text.strip())
+
+        url = fields.get('loc') or fields.get('link')
+        if not url:
+            return
+        date = next((parse_date(fields[field]) for field in DATE_ELEMENTS if field in fields), None)
+        if self.since is not None and date is not None and date <= self.since:
+            self.skipped += 1
+            return
+
+        if name == SITEMAP_ELEMENT:
+            self.sitemaps.append(url)
+        else:
+            # The <title> of a sitemap <url> is the news:title of its news extension
+            title = fields.get('title') or title_from_url(url)
+            self.entries.append({'url': url, 'title': title, 'date': date})
+
+
+def read_feed_response(response, reader, raw=None):
+    """Stream a response body into a FeedReader and close the response
+
+    The chunks are also appended to the bytearray `raw` when one is given.
+    """
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            reader.feed(chunk)
+            if raw is not None:
+                raw.extend(chunk)
+        reader.close()
+    finally:
+        response.close()
+    return reader
+
+
+class DiscoveryState:
+    """When each feed was last read successfully, persisted between runs"""
+
+    def __init__(self, path='news_data/discovery_state.json'):
+        self.path = path
+        self._last_read = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._last_read = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable discovery state {path}: {str(e)}")
+
+    def since(self, feed_url):
+        """Return the time the feed was last read, or None"""
+        with self._lock:
+            value = self._last_read.get(feed_url)
+        return datetime.fromisoformat(value) if value else None
+
+    def if_modified_since(self, feed_url):
+        since = self.since(feed_url)
+        return format_datetime(since.astimezone(timezone.utc), usegmt=True) if since else None
+
+    def mark_read(self, feed_url, read_at):
+        with self._lock:
+            self._last_read[feed_url] = read_at.isoformat(timespec='seconds')
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self._last_read)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(self.path + '.tmp', self.path)
@@ -4,7 +4,10 @@ import webbrowser
 import threading
 import json
 import logging
-from flask import Flask, render_template, jsonify, send_from_directory, redirect, url_for
+from flask import Flask, render_template, jsonify, send_from_directory, redirect, url_for, request
+
+from article_db import ArticleDatabase
+from body_store import BodyStore
 
 # Configure logging
 logging.basicConfig(
@@ -22,8 +25,39 @@ class WebApp:
     def __init__(self):
         self.app = Flask(__name__)
         self.port = 1234
+        self.article_db_path = 'news_data/articles.db'
+        self._article_db = None
+        # Full article texts, fetched one at a time when a reader expands an article
+        self.bodies = BodyStore()
         self.setup_routes()
 
+    def article_db(self):
+        """Open the article database on first use; None if it has not been created yet"""
+        if self._article_db is None and os.path.exists(self.article_db_path):
+            self._article_db = ArticleDatabase(self.article_db_path)
+        return self._article_db
+
+    def load_clusters(self, cluster_id=None):
+        """Return {cluster_id: [articles]} from the article database
+
+        static/cluster_data.json is only read when the database holds no clusters, as
+        with the sample data written before anything has been scraped. Returns None if
+        there are no clusters at all.
+        """
+        db = self.article_db()
+        if db is not None and db.has_clusters():
+            return {cluster: [dict(article.items()) for article in articles]
+                    for cluster, articles in db.clusters(cluster_id).items()}
+
+        cluster_data_path = 'static/cluster_data.json'
+        if not os.path.exists(cluster_data_path):
+            return None
+        with open(cluster_data_path, 'r') as f:
+            cluster_data = json.load(f)
+        if cluster_id is not None:
+            return {cluster_id: cluster_data[cluster_id]} if cluster_id in cluster_data else {}
+        return cluster_data
+
     def setup_routes(self):
         """Set up the Flask routes with error handling"""
 
@@ -73,14 +107,12 @@ class WebApp:
         def get_clusters():
             try:
                 logger.info("Fetching cluster data")
-                cluster_data_path = 'static/cluster_data.json'
+                cluster_data = self.load_clusters()
 
-                if os.path.exists(cluster_data_path):
-                    with open(cluster_data_path, 'r') as f:
-                        cluster_data = json.load(f)
+                if cluster_data is not None:
                     return jsonify(cluster_data)
                 else:
-                    logger.error("Cluster data file not found")
+                    logger.error("Cluster data not found")
                     return jsonify({"error": "Cluster data not found"}), 404
             except Exception as e:
                 logger.exception(f"Error retrieving cluster data: {str(e)}")
@@ -91,13 +123,10 @@ class WebApp:
         def show_cluster(cluster_id):
             try:
                 logger.info(f"Showing cluster {cluster_id}")
-                cluster_data_path = 'static/cluster_data.json'
+                cluster_id_str = str(cluster_id)
+                cluster_data = self.load_clusters(cluster_id_str)
 
-                if os.path.exists(cluster_data_path):
-                    with open(cluster_data_path, 'r') as f:
-                        cluster_data = json.load(f)
-
-                    cluster_id_str = str(cluster_id)
+                if cluster_data is not None:
                     if cluster_id_str in cluster_data:
                         if os.path.exists('templates/cluster.html'):
                             return render_template('cluster.html',
@@ -110,12 +139,59 @@ class WebApp:
                         logger.warning(f"Cluster {cluster_id} not found")
                         return f"Cluster {cluster_id} not found", 404
                 else:
-                    logger.error("Cluster data file not found")
+                    logger.error("Cluster data not found")
                     return "Cluster data not found", 404
             except Exception as e:
                 logger.exception(f"Error displaying cluster {cluster_id}: {str(e)}")
                 return f"Error: {str(e)}", 500
 
+        # Articles queried from the article database, e.g. /api/articles?category=Business&limit=50
+        @self.app.route('/api/articles')
+        def get_articles():
+            try:
+                db = self.article_db()
+                if db is None:
+                    return jsonify({"error": "Article database not found"}), 404
+                articles = db.query(
+                    columns=['newspaper', 'category', 'title', 'url', 'date_scraped'],
+                    newspapers=request.args.getlist('newspaper'),
+                    categories=request.args.getlist('category'),
+                    since=request.args.get('since'),
+                    until=request.args.get('until'),
+                    limit=request.args.get('limit', 100, type=int))
+                return jsonify(articles)
+            except Exception as e:
+                logger.exception(f"Error querying articles: {str(e)}")
+                return jsonify({"error": str(e)}), 500
+
+        # Full-text search over titles and content, e.g. /api/search?q=fuel+prices
+        @self.app.route('/api/search')
+        def search_articles():
+            try:
+                db = self.article_db()
+                if db is None:
+                    return jsonify({"error": "Article database not found"}), 404
+                results = db.search(request.args.get('q', ''),
+                                    limit=request.args.get('limit', 20, type=int),
+                                    newspapers=request.args.getlist('newspaper'),
+                                    categories=request.args.getlist('category'))
+                return jsonify(results)
+            except Exception as e:
+                logger.exception(f"Error searching articles: {str(e)}")
+                return jsonify({"error": str(e)}), 500
+
+        # The full text of one article, by the content_hash in the cluster data
+        @self.app.route('/api/body/<content_hash>')
+        def get_body(content_hash):
+            try:
+                body = self.bodies.get(content_hash)
+                if body is None:
+                    return jsonify({"error": "Article text not found"}), 404
+                return jsonify({"content_hash": content_hash, "content": body})
+            except Exception as e:
+                logger.exception(f"Error reading article text {content_hash}: {str(e)}")
+                return jsonify({"error": str(e)}), 500
+
         # Test route to verify basic functionality
         @self.app.route('/test')
         def test():
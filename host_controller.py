@@ -0,0 +1,156 @@
+"""
+Adaptive per-host politeness controller for the newspaper scraper
+Adjusts the delay between requests and the number of parallel requests for each host
+with an AIMD policy: healthy fast responses slowly speed a host up, while 429/5xx
+responses, timeouts and slow responses back it off multiplicatively
+"""
+import time
+import random
+import threading
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean the host wants us to slow down
+BACKOFF_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """Return the number of seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostState:
+    """Current delay, concurrency limit and counters for one host"""
+
+    def __init__(self, delay, concurrency):
+        self.delay = delay
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.next_allowed = 0.0
+        self.blocked_until = 0.0
+        self.successes = 0
+        self.backoffs = 0
+        self.latency_ewma = None
+
+    def as_dict(self):
+        return {
+            'delay': round(self.delay, 3),
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'latency': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'successes': self.successes,
+            'backoffs': self.backoffs,
+            'blocked_for': round(max(0.0, self.blocked_until - time.monotonic()), 1)
+        }
+
+
+class HostController:
+    """AIMD controller for per-host request spacing and concurrency
+
+    Every host starts at the middle of [min_delay, max_delay] with one request in flight.
+    Each fast success subtracts `delay_step` from the delay (down to `min_delay * floor_ratio`)
+    and every `increase_every` successes allow one more parallel request (up to
+    `max_concurrency`). A 429/5xx, a failed request or a response slower than
+    `slow_latency` multiplies the delay (at least `min_backoff`) by `backoff_factor`, up to
+    `max_backoff`, and halves the concurrency. Retry-After headers block the host for the requested time.
+    """
+
+    def __init__(self, min_delay=1, max_delay=3, floor_ratio=0.25, max_backoff=60,
+                 max_concurrency=4, delay_step=0.1, increase_every=5,
+                 target_latency=1.0, slow_latency=5.0, backoff_factor=2.0, min_backoff=1.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.floor = min_delay * floor_ratio
+        self.max_backoff = max(max_backoff, max_delay)
+        self.min_backoff = min_backoff
+        self.max_concurrency = max_concurrency
+        self.delay_step = delay_step
+        self.increase_every = increase_every
+        self.target_latency = target_latency
+        self.slow_latency = slow_latency
+        self.backoff_factor = backoff_factor
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState((self.min_delay + self.max_delay) / 2, 1)
+        return state
+
+    def acquire(self, url):
+        """Block until a request to the URL's host is allowed; returns the host"""
+        host = urlparse(url).netloc
+        with self._condition:
+            while True:
+                state = self._state(host)
+                now = time.monotonic()
+                if state.in_flight < state.concurrency:
+                    start = max(now, state.next_allowed, state.blocked_until)
+                    if start <= now:
+                        # Jitter the spacing so requests do not arrive on a fixed beat
+                        state.next_allowed = now + state.delay * random.uniform(0.75, 1.25)
+                        state.in_flight += 1
+                        return host
+                    self._condition.wait(start - now)
+                else:
+                    self._condition.wait()
+
+    def release(self, host, status_code=None, latency=None, retry_after=None):
+        """Record the outcome of a request started with acquire()
+
+        `status_code` is None when the request failed without a response.
+        """
+        with self._condition:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+
+            if latency is not None:
+                state.latency_ewma = latency if state.latency_ewma is None else \
+                    0.8 * state.latency_ewma + 0.2 * latency
+
+            if status_code is None or status_code in BACKOFF_STATUS_CODES or \
+                    (latency is not None and latency > self.slow_latency):
+                # Multiplicative decrease of the request rate
+                state.delay = min(self.max_backoff,
+                                  max(state.delay, self.min_delay, self.min_backoff) * self.backoff_factor)
+                state.concurrency = max(1, state.concurrency // 2)
+                state.backoffs += 1
+                logger.info(f"Backing off {host}: status {status_code}, delay now {state.delay:.1f}s, "
+                            f"concurrency {state.concurrency}")
+            elif latency is None or latency <= self.target_latency:
+                # Additive increase of the request rate
+                state.successes += 1
+                state.delay = max(self.floor, state.delay - self.delay_step)
+                if state.successes % self.increase_every == 0:
+                    state.concurrency = min(self.max_concurrency, state.concurrency + 1)
+            else:
+                state.successes += 1
+
+            if retry_after is not None:
+                state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+                logger.info(f"{host} asked us to retry after {retry_after:.0f}s")
+
+            self._condition.notify_all()
+
+    def state(self, host=None):
+        """Return the current state of one host, or of every host keyed by host name"""
+        with self._condition:
+            if host is not None:
+                return self._state(host).as_dict()
+            return {name: state.as_dict() for name, state in self._hosts.items()}
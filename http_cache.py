@@ -0,0 +1,175 @@
+"""
+Persistent HTTP cache for the newspaper scraper
+Stores response bodies on disk together with their ETag/Last-Modified validators,
+revalidates them with conditional GETs and serves 304 responses from disk
+"""
+import os
+import json
+import gzip
+import time
+import uuid
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Minimal response object returned when a body is served from the cache"""
+
+    def __init__(self, url, content, encoding, headers, status_code=200, from_cache=True):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.headers = headers
+        self.status_code = status_code
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class HTTPCache:
+    """Size-bounded on-disk cache with conditional revalidation and LRU eviction"""
+
+    def __init__(self, cache_dir='news_data/http_cache', max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # url key -> (size on disk, last access time), rebuilt from the files on disk
+        self._entries = {}
+        self._total_bytes = 0
+        for filename in os.listdir(cache_dir):
+            if filename.endswith('.body'):
+                path = os.path.join(cache_dir, filename)
+                key = filename[:-len('.body')]
+                stat = os.stat(path)
+                self._entries[key] = (stat.st_size, stat.st_mtime)
+                self._total_bytes += stat.st_size
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.body', base + '.json'
+
+    def _load(self, key):
+        """Return (metadata, body) for a cache entry, or (None, None) if it is missing or corrupt"""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError, EOFError):
+            return None, None
+
+    def _store(self, key, url, response):
+        """Write a response body and its validators to disk"""
+        body_path, meta_path = self._paths(key)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': response.encoding or response.apparent_encoding,
+            'content_type': response.headers.get('Content-Type'),
+            'stored_at': time.time()
+        }
+
+        # Write to temporary files first so a crash never leaves a half-written entry; unique
+        # names let several threads store the same URL at once
+        suffix = f".{uuid.uuid4().hex}.tmp"
+        with gzip.open(body_path + suffix, 'wb') as f:
+            f.write(response.content)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        size = os.path.getsize(body_path + suffix)
+
+        # Files are only moved into place or removed under the lock, so eviction never
+        # deletes an entry while it is being stored
+        with self._lock:
+            os.replace(meta_path + suffix, meta_path)
+            os.replace(body_path + suffix, body_path)
+            old_size, _ = self._entries.get(key, (0, 0))
+            self._entries[key] = (size, time.time())
+            self._total_bytes += size - old_size
+            self._evict()
+
+    def _touch(self, key):
+        """Mark an entry as recently used"""
+        body_path, _ = self._paths(key)
+        now = time.time()
+        try:
+            os.utime(body_path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (self._entries[key][0], now)
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes; called with the lock held"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        victims = []
+        for key, (size, last_access) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append(key)
+            self._total_bytes -= size
+            del self._entries[key]
+
+        for key in victims:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        if victims:
+            logger.debug(f"Evicted {len(victims)} entries from the HTTP cache")
+
+    def get(self, url, fetch, headers=None):
+        """Fetch a URL through the cache
+
+        `fetch` is called with the request headers and must return a requests response.
+        Cached bodies are revalidated with If-None-Match/If-Modified-Since and a 304
+        answer is turned into a CachedResponse built from the stored body.
+        """
+        headers = dict(headers or {})
+        key = self._key(url)
+        meta, body = self._load(key) if key in self._entries else (None, None)
+
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = fetch(headers)
+
+        if response.status_code == 304 and meta is not None:
+            with self._lock:
+                self.hits += 1
+            self._touch(key)
+            logger.info(f"Served {url} from the HTTP cache (304 Not Modified)")
+            return CachedResponse(url, body, meta.get('encoding'),
+                                  {'Content-Type': meta.get('content_type') or ''})
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200 and (
+                response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            try:
+                self._store(key, url, response)
+            except OSError as e:
+                logger.warning(f"Could not cache {url}: {str(e)}")
+
+        return response
@@ -61,7 +61,8 @@ def install_dependencies():
         "pandas",
         "scikit-learn",
         "pillow",
-        "numpy"
+        "numpy",
+        "pyarrow"
     ]
 
     for package in packages:
@@ -90,6 +91,10 @@ def create_sample_data():
     """Create sample data if needed"""
     print_step(4, "Checking for existing data or creating sample data")
 
+    from article_store import ArticleStore
+    if ArticleStore().exists():
+        print("✓ Found existing article data in news_data/articles")
+        return True
     if os.path.exists("news_data/all_articles.csv"):
         print("✓ Found existing article data at news_data/all_articles.csv")
         return True
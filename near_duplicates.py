@@ -0,0 +1,153 @@
+"""
+Near-duplicate article detection for the newspaper scraper
+Computes MinHash signatures over word shingles of the article content and looks them up
+in a persistent SQLite LSH index, so syndicated and wire copy published by several
+newspapers can be flagged or dropped as it is scraped
+"""
+import os
+import re
+import zlib
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Largest prime below 2**32; keeps (a * x + b) inside uint64 for 32-bit shingle hashes
+HASH_PRIME = np.uint64(4294967291)
+MAX_HASH = np.uint64(4294967295)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def shingle_hashes(text, shingle_size=5):
+    """Return the 32-bit hashes of the word shingles of a text"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        words_list = [' '.join(words)] if words else []
+    else:
+        words_list = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in set(words_list)),
+                       dtype=np.uint64)
+
+
+class MinHasher:
+    """MinHash signatures with fixed, seeded permutations so they are comparable across runs"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(HASH_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(HASH_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text)
+        if hashes.size == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        permuted = (np.outer(hashes, self.a) + self.b) % HASH_PRIME
+        return permuted.min(axis=0)
+
+
+def estimated_similarity(signature, other):
+    """Estimate the Jaccard similarity of two texts from their signatures"""
+    return float(np.mean(signature == other))
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index of article signatures
+
+    Signatures are split into `bands` bands of `num_perm / bands` rows; two articles are
+    candidates when any band hashes to the same bucket, and duplicates when their
+    estimated similarity is at least `threshold`. Each lookup touches one bucket per
+    band instead of scanning every stored article.
+    """
+
+    def __init__(self, db_path='news_data/near_duplicates.db', threshold=0.8, num_perm=64, bands=16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS signatures (
+                    url TEXT PRIMARY KEY,
+                    newspaper TEXT,
+                    signature BLOB NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS bands (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    url TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_bucket ON bands (band, bucket)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS duplicates (
+                    url TEXT PRIMARY KEY,
+                    duplicate_of TEXT NOT NULL,
+                    similarity REAL NOT NULL
+                )
+            """)
+
+    def _buckets(self, signature):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, zlib.crc32(rows.tobytes())
+
+    def _find(self, signature):
+        """Return (url, similarity) of the most similar stored article above the threshold"""
+        candidates = set()
+        for band, bucket in self._buckets(signature):
+            candidates.update(url for (url,) in self._conn.execute(
+                "SELECT url FROM bands WHERE band = ? AND bucket = ?", (band, bucket)))
+
+        best_url, best_similarity = None, 0.0
+        for url in candidates:
+            row = self._conn.execute("SELECT signature FROM signatures WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                continue
+            similarity = estimated_similarity(signature, np.frombuffer(row[0], dtype=np.uint64))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best_url, best_similarity = url, similarity
+        return best_url, best_similarity
+
+    def check_and_add(self, url, newspaper, text):
+        """Look up an article and add it to the index
+
+        Returns (duplicate_of, similarity) if a near-duplicate was already indexed, else (None, 0.0).
+        Duplicates are recorded in the duplicates table rather than indexed themselves, so
+        every cluster of copies points at its first article.
+        """
+        signature = self.hasher.signature(text)
+        with self._lock, self._conn:
+            existing = self._conn.execute("SELECT 1 FROM signatures WHERE url = ?", (url,)).fetchone()
+            if existing is not None:
+                return None, 0.0
+
+            duplicate_of, similarity = self._find(signature)
+            if duplicate_of is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO duplicates (url, duplicate_of, similarity) VALUES (?, ?, ?)",
+                    (url, duplicate_of, similarity))
+                return duplicate_of, similarity
+
+            self._conn.execute("INSERT INTO signatures (url, newspaper, signature) VALUES (?, ?, ?)",
+                               (url, newspaper, signature.tobytes()))
+            self._conn.executemany("INSERT INTO bands (band, bucket, url) VALUES (?, ?, ?)",
+                                   [(band, bucket, url) for band, bucket in self._buckets(signature)])
+        return None, 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,12 +3,33 @@ import time
 import random
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+from http_cache import HTTPCache
+from scrape_frontier import ScrapeFrontier, canonical_url, normalize_url
+from seen_filter import BloomFilter
+from page_archive import PageArchive
+from host_controller import HostController, parse_retry_after
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from selector_stats import SelectorStats, CONTAINER_FALLBACK, PARAGRAPH_FALLBACK
+from streaming_fetch import read_article_body, DEFAULT_MAX_PAGE_BYTES
+from telemetry import Telemetry, instrument_adapter, reset_connection_timings
+from feed_discovery import FeedReader, DiscoveryState, read_feed_response
+from article_store import ArticleStore, read_articles_csv
+from article_db import ArticleDatabase
+from body_store import BodyStore
+from article_record import ARTICLE_COLUMNS, Article, articles_to_frame, scrape_date
 import csv
-from datetime import datetime
+from datetime import datetime, timezone
 from urllib.parse import urlparse, urljoin
 import logging
 import re
+import json
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from functools import partial
 
 # Set up logging
 logging.basicConfig(
@@ -37,9 +58,393 @@ def get_random_user_agent():
     """Return a random user agent from the list"""
     return random.choice(USER_AGENTS)
 
+
+def supported_encodings():
+    """Return the Accept-Encoding value for the compression schemes we can decode"""
+    encodings = ['gzip', 'deflate']
+    try:
+        # urllib3 only decodes brotli responses when one of these packages is installed
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+
+class SessionPool:
+    """Pooled keep-alive HTTP sessions, one per newspaper base URL"""
+
+    def __init__(self, pool_connections=4, pool_maxsize=8, timeout=15, max_retries=0,
+                 adapter_factory=HTTPAdapter, recorder=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Builds the transport adapter (e.g. a ReplayAdapter for offline runs)
+        self.adapter_factory = adapter_factory
+        # Optional PageArchive that records every successful response
+        self.recorder = recorder
+        self.accept_encoding = supported_encodings()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, base_url):
+        """Return the shared session for a newspaper, creating it on first use"""
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                adapter = self.adapter_factory(pool_connections=self.pool_connections,
+                                               pool_maxsize=self.pool_maxsize,
+                                               max_retries=self.max_retries)
+                # Time the DNS lookup and connect of every new connection
+                instrument_adapter(adapter)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({
+                    'Accept-Encoding': self.accept_encoding,
+                    'Connection': 'keep-alive'
+                })
+                self._sessions[base_url] = session
+            return session
+
+    def get(self, newspaper, url, headers=None, **kwargs):
+        """GET a URL through the session of the given newspaper
+
+        Streamed responses are not recorded here; call record() once their body has been read.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session_for(newspaper['base_url']).get(url, headers=headers, **kwargs)
+        if not kwargs.get('stream'):
+            self.record(url, response)
+        return response
+
+    def record(self, url, response):
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+
+    def close(self):
+        """Close every pooled session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+# Tags that the generic fallbacks in scrape_article_content look inside
+CONTENT_FALLBACK_TAGS = ('article', 'div', 'p')
+
+_strainers = {}
+
+
+def outer_tag_names(selector_list):
+    """Return the tag names of the outermost compound of each selector, or None if one has no tag name"""
+    names = set()
+    for selector in selector_list.split(', '):
+        match = re.match(r'[a-zA-Z][a-zA-Z0-9]*', selector.strip())
+        if not match:
+            return None
+        names.add(match.group(0).lower())
+    return names
+
+
+def get_strainer(newspaper, page_type):
+    """Return a SoupStrainer that only builds the elements the selectors can match, or None
+
+    Listing pages only need the article containers, article pages only need the
+    content containers and the generic fallbacks.
+    """
+    if not newspaper.get('strain', True):
+        return None
+
+    selector_list = newspaper['article_selector'] if page_type == 'listing' else newspaper['content_selector']
+    key = (selector_list, page_type)
+    if key not in _strainers:
+        names = outer_tag_names(selector_list)
+        if names is not None and page_type != 'listing':
+            names.update(CONTENT_FALLBACK_TAGS)
+        _strainers[key] = SoupStrainer(sorted(names)) if names else None
+    return _strainers[key]
+
+
+def parse_html(html, newspaper, page_type):
+    """Parse a page with the newspaper's parser backend ('parser' key, lxml when installed)"""
+    parser = newspaper.get('parser', DEFAULT_PARSER)
+    return BeautifulSoup(html, parser, parse_only=get_strainer(newspaper, page_type))
+
+
+# Substrings that mark an anchor inside an article container as a link to an article
+ARTICLE_PATH_MARKERS = ('/news/', '/article/', '/story/', '/business/', '/politics/', '/sport/')
+
+
+class LinkExtractor:
+    """Single-pass article link extraction with selectors compiled once per newspaper"""
+
+    def __init__(self, newspaper):
+        self.base_url = newspaper['base_url']
+        self.article_selectors = [(selector, soupsieve.compile(selector))
+                                  for selector in newspaper['article_selector'].split(', ')]
+        self.title_selectors = [soupsieve.compile(selector)
+                                for selector in newspaper['title_selector'].split(', ')]
+
+    def extract(self, soup):
+        """Return the unique {'url', 'title'} article links found on a category page"""
+        links = []
+        seen_urls = set()
+        visited_anchors = set()
+
+        def add(href, title):
+            # Handle relative URLs
+            if not href.startswith('http'):
+                href = urljoin(self.base_url, href)
+            # Tracking parameters, fragments and AMP variants do not make a new article
+            key = canonical_url(href)
+            if title and key not in seen_urls:
+                seen_urls.add(key)
+                links.append({'url': normalize_url(href), 'title': title})
+
+        for selector, compiled in self.article_selectors:
+            elements = compiled.select(soup)
+            if not elements:
+                continue
+            logger.info(f"Selector '{selector}' matched {len(elements)} elements")
+
+            # Links come out in the original order: each title selector in turn over every
+            # element, with an element's own anchors right after its title from the first one
+            for index, title_selector in enumerate(self.title_selectors):
+                for element in elements:
+                    title_elem = title_selector.select_one(element)
+                    if title_elem is not None and title_elem.get('href'):
+                        add(title_elem.get('href'), title_elem.text.strip())
+                    if index == 0:
+                        self._add_anchors(element, visited_anchors, add)
+
+        return links
+
+    def _add_anchors(self, element, visited_anchors, add):
+        """Add the article links found directly in an article container"""
+        # Nested containers share anchors, so each anchor is only inspected once
+        for link in element.find_all('a', href=True):
+            if id(link) in visited_anchors:
+                continue
+            visited_anchors.add(id(link))
+
+            href = link['href']
+            if not any(marker in href for marker in ARTICLE_PATH_MARKERS):
+                continue
+
+            title = link.text.strip() or link.get('title', '')
+            if not title and link.find('h2'):
+                title = link.find('h2').text.strip()
+            if not title and link.find('h3'):
+                title = link.find('h3').text.strip()
+            add(href, title or "No title found")
+
+
+_link_extractors = {}
+_link_extractors_lock = threading.Lock()
+
+
+def get_link_extractor(newspaper):
+    """Return the cached LinkExtractor for a newspaper definition"""
+    key = (newspaper['base_url'], newspaper['article_selector'], newspaper['title_selector'])
+    with _link_extractors_lock:
+        extractor = _link_extractors.get(key)
+        if extractor is None:
+            extractor = _link_extractors[key] = LinkExtractor(newspaper)
+    return extractor
+
+
+def extract_article_links(soup, newspaper):
+    """Extract the unique article links from a parsed category page"""
+    return get_link_extractor(newspaper).extract(soup)
+
+
+def extract_article_content(soup, newspaper, selector_order=None):
+    """Extract the article text from a parsed article page"""
+    return trace_article_content(soup, newspaper, selector_order)[0]
+
+
+def trace_article_content(soup, newspaper, selector_order=None):
+    """Extract the article text and report which selectors were tried; returns (content, trace)
+
+    `selector_order` is the learned order of the newspaper's content selectors (see
+    SelectorStats.order); the first selector yielding substantial content wins. The
+    trace lists (selector, matched, characters) for every selector evaluated and the
+    winner, the selector that produced the returned content.
+    """
+    # Try different content selectors
+    content_selectors = selector_order or newspaper['content_selector'].split(', ')
+    content = ""
+    tried = []
+    winner = None
+
+    for selector in content_selectors:
+        paragraphs = soup.select(selector)
+        if paragraphs:
+            content = ' '.join(p.text.strip() for p in paragraphs)
+            winner = selector
+            tried.append((selector, True, len(content)))
+            if len(content) > 100:  # If we found substantial content, stop looking
+                break
+        else:
+            tried.append((selector, False, 0))
+
+    # If main selectors failed, try a more generic approach
+    if not content or len(content) < 100:
+        # Look for article containers
+        article_containers = soup.select('article, div.article, div.story')
+        for container in article_containers:
+            paragraphs = container.find_all('p')
+            content = ' '.join(p.text.strip() for p in paragraphs)
+            if len(content) > 100:
+                break
+        if article_containers:
+            winner = CONTAINER_FALLBACK
+        tried.append((CONTAINER_FALLBACK, bool(article_containers), len(content) if article_containers else 0))
+
+    if not content or len(content) < 100:
+        # Last resort: get all paragraphs in the page
+        paragraphs = soup.find_all('p')
+        content = ' '.join(p.text.strip() for p in paragraphs[:15])  # Limit to first 15 paragraphs
+        winner = PARAGRAPH_FALLBACK if paragraphs else None
+        tried.append((PARAGRAPH_FALLBACK, bool(paragraphs), len(content)))
+
+    return content, {'tried': tried, 'winner': winner if content else None}
+
+
+def extract_links_from_html(html, newspaper):
+    """Parse a category page and extract its article links; returns (links, parse seconds)
+
+    Module-level so it can run in a worker process.
+    """
+    start = time.perf_counter()
+    soup = parse_html(html, newspaper, 'listing')
+    parse_seconds = time.perf_counter() - start
+
+    # Log some of the HTML to help debug selector issues (prettify is expensive)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"First 500 chars of HTML: {soup.prettify()[:500]}")
+
+    return extract_article_links(soup, newspaper), parse_seconds
+
+
+def extract_content_from_html(html, newspaper, selector_order=None):
+    """Parse an article page and extract its text; returns (content, parse seconds, selector trace)
+
+    Module-level so it can run in a worker process.
+    """
+    start = time.perf_counter()
+    soup = parse_html(html, newspaper, 'article')
+    parse_seconds = time.perf_counter() - start
+    content, trace = trace_article_content(soup, newspaper, selector_order)
+    return content, parse_seconds, trace
+
+
+class ParseStage:
+    """CPU-bound extraction stage fed by the network threads
+
+    With workers > 0 jobs run in a process pool; at most `max_pending` jobs are queued
+    at once, so downloading threads block instead of piling up pages in memory.
+    With workers == 0 jobs run inline on the calling thread.
+    """
+
+    def __init__(self, workers=0, max_pending=None):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self._slots = threading.BoundedSemaphore(max_pending or max(2 * workers, 1))
+
+    def submit(self, function, *args):
+        """Queue a job and return a Future for its result"""
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, function, *args):
+        """Run a job and wait for its result"""
+        return self.submit(function, *args).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
 class NewspaperScraper:
-    def __init__(self):
+    def __init__(self, max_workers=None, min_delay=1, max_delay=3, sessions=None, http_cache=None,
+                 frontier=None, parse_workers=0, data_dir='news_data', controller=None, max_retry_after=30,
+                 breakers=None, near_duplicates=None, duplicate_mode='drop', selector_stats=None,
+                 stream_articles=False, max_page_bytes=DEFAULT_MAX_PAGE_BYTES, telemetry=None, seen=None,
+                 discovery=None, discovery_state=None, article_db=None, bodies=None):
         self.all_articles = []
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self.max_workers = max_workers
+        # Extraction runs in a process pool of this size during scrape_all_newspapers (0 = inline)
+        self.parse_workers = parse_workers
+        self.parse_stage = ParseStage(0)
+        # Adapts the delay and parallelism of each host to how it responds
+        self.controller = controller or HostController(min_delay, max_delay)
+        # 429/503 responses asking us to wait at most this many seconds are retried once
+        self.max_retry_after = max_retry_after
+        # Stops sending requests to hosts that keep failing (in-memory unless a persisted registry is given)
+        self.breakers = breakers or CircuitBreakerRegistry(path=None)
+        # Optional NearDuplicateIndex; duplicates are dropped ('drop') or saved and logged ('mark')
+        self.near_duplicates = near_duplicates
+        self.duplicate_mode = duplicate_mode
+        self.duplicates_found = {}
+        # Learns which content selector wins for each newspaper (in-memory unless a persisted one is given)
+        self.selector_stats = selector_stats or SelectorStats(path=None)
+        # Stream article pages and stop reading once the content is complete or at the byte cap
+        # (a newspaper's 'max_page_bytes' key overrides max_page_bytes)
+        self.stream_articles = stream_articles
+        self.max_page_bytes = max_page_bytes
+        # Streaming totals per newspaper name
+        self.stream_stats = {}
+        # Phase timings, status codes, sizes and yield per newspaper and category
+        self.telemetry = telemetry or Telemetry()
+        self.sessions = sessions or SessionPool()
+        # Optional HTTPCache used to revalidate category pages with conditional GETs
+        self.http_cache = http_cache
+        # Optional ScrapeFrontier; when set, runs are incremental and append to the CSV files
+        self.frontier = frontier
+        # Canonical URLs of articles already fetched, checked before the frontier (in-memory unless given)
+        self.seen = seen if seen is not None else BloomFilter(path=None, capacity=100000)
+        # 'html' scrapes category pages, 'feeds' reads each newspaper's feeds and sitemaps;
+        # None uses each newspaper's 'discovery' key (default 'html')
+        self.discovery = discovery
+        # When each feed was last read; older feed entries are skipped (in-memory unless given)
+        self.discovery_state = discovery_state or DiscoveryState(path=None)
+        self.run_started = datetime.now(timezone.utc)
+        # Optional ArticleDatabase that saved articles are upserted into, one transaction per batch
+        self.article_db = article_db
+        # Article bodies, stored once per distinct text; CSV rows only carry their hash and a snippet
+        self.bodies = bodies or BodyStore(os.path.join(data_dir, 'bodies'))
+        # Parse timings per newspaper name: [pages parsed, total seconds]
+        self.parse_stats = {}
+        self._stats_lock = threading.Lock()
         self.define_newspaper_structures()
 
     def define_newspaper_structures(self):
@@ -63,6 +468,21 @@ class NewspaperScraper:
                         "https://www.independent.co.uk/sport"
                     ]
                 },
+                # RSS/Atom feeds or sitemaps per category, used by feed discovery
+                "feeds": {
+                    "Business": [
+                        "https://www.independent.co.uk/news/business/rss"
+                    ],
+                    "Politics": [
+                        "https://www.independent.co.uk/news/uk/politics/rss"
+                    ],
+                    "Arts/Culture/Celebrities": [
+                        "https://www.independent.co.uk/arts-entertainment/rss"
+                    ],
+                    "Sports": [
+                        "https://www.independent.co.uk/sport/rss"
+                    ]
+                },
                 # Updated selectors based on current Independent website structure
                 "article_selector": "div.article, div.content, article, div.jsx-bylines",
                 "title_selector": "h2 a, h3 a, a.title, h1.headline",
@@ -86,6 +506,21 @@ class NewspaperScraper:
                         "https://edition.cnn.com/sport"
                     ]
                 },
+                # RSS/Atom feeds or sitemaps per category, used by feed discovery
+                "feeds": {
+                    "Business": [
+                        "http://rss.cnn.com/rss/money_latest.rss"
+                    ],
+                    "Politics": [
+                        "http://rss.cnn.com/rss/cnn_allpolitics.rss"
+                    ],
+                    "Arts/Culture/Celebrities": [
+                        "http://rss.cnn.com/rss/edition_entertainment.rss"
+                    ],
+                    "Sports": [
+                        "http://rss.cnn.com/rss/edition_sport.rss"
+                    ]
+                },
                 # Updated selectors based on current CNN website structure
                 "article_selector": "div.card, article, div.container__item, div.container_lead-plus-headlines__item",
                 "title_selector": "span.container__headline-text, h3.container__headline, a.container__link, h3 a, div.headline a, h2.headline a",
@@ -109,6 +544,21 @@ class NewspaperScraper:
                         "https://www.bbc.com/sport"
                     ]
                 },
+                # RSS/Atom feeds or sitemaps per category, used by feed discovery
+                "feeds": {
+                    "Business": [
+                        "https://feeds.bbci.co.uk/news/business/rss.xml"
+                    ],
+                    "Politics": [
+                        "https://feeds.bbci.co.uk/news/politics/rss.xml"
+                    ],
+                    "Arts/Culture/Celebrities": [
+                        "https://feeds.bbci.co.uk/news/entertainment_and_arts/rss.xml"
+                    ],
+                    "Sports": [
+                        "https://feeds.bbci.co.uk/sport/rss.xml"
+                    ]
+                },
                 # Updated selectors based on current BBC website structure
                 "article_selector": "div.gs-c-promo, article, div.media, div.media__panel, div.faux-block-link",
                 "title_selector": "h3.gs-c-promo-heading__title, h3.media__title, a.media__link, span.faux-block-link__overlay-link",
@@ -132,6 +582,21 @@ class NewspaperScraper:
                         "https://iharare.com/category/sports/"
                     ]
                 },
+                # RSS/Atom feeds or sitemaps per category, used by feed discovery
+                "feeds": {
+                    "Business": [
+                        "https://iharare.com/category/business/feed/"
+                    ],
+                    "Politics": [
+                        "https://iharare.com/category/politics/feed/"
+                    ],
+                    "Arts/Culture/Celebrities": [
+                        "https://iharare.com/category/entertainment/feed/"
+                    ],
+                    "Sports": [
+                        "https://iharare.com/category/sports/feed/"
+                    ]
+                },
                 "article_selector": "article, div.jeg_posts, div.jeg_post, div.post-wrap",
                 "title_selector": "h3.jeg_post_title a, h2.entry-title a, h3.entry-title a",
                 "content_selector": "div.entry-content p, div.content-inner p, div.jeg_share_container"
@@ -154,237 +619,796 @@ class NewspaperScraper:
                         "https://www.herald.co.zw/category/sports/"
                     ]
                 },
+                # RSS/Atom feeds or sitemaps per category, used by feed discovery
+                "feeds": {
+                    "Business": [
+                        "https://www.herald.co.zw/category/business/feed/"
+                    ],
+                    "Politics": [
+                        "https://www.herald.co.zw/category/politics/feed/"
+                    ],
+                    "Arts/Culture/Celebrities": [
+                        "https://www.herald.co.zw/category/entertainment/feed/"
+                    ],
+                    "Sports": [
+                        "https://www.herald.co.zw/category/sports/feed/"
+                    ]
+                },
                 "article_selector": "article, div.post, div.item, div.td_module_wrap",
                 "title_selector": "h3 a, h2.entry-title a, div.entry-title a, h3.entry-title a",
                 "content_selector": "div.entry-content p, div.td-post-content p, article p"
             }
         }
 
-    def scrape_article_links(self, url, newspaper):
-        """Scrape article links from a category page with more robust error handling and debugging"""
+    def record_parse_time(self, newspaper, seconds, url, page_type):
+        """Add a page parse time to the per-newspaper statistics"""
+        with self._stats_lock:
+            stats = self.parse_stats.setdefault(newspaper['name'], [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+        self.telemetry.record_parse(page_type, seconds)
+        logger.debug(f"Parsed {url} in {seconds * 1000:.1f} ms")
+
+    def log_parse_stats(self):
+        """Log the average parse time per page for each newspaper"""
+        for name, (pages, seconds) in self.parse_stats.items():
+            parser = next((newspaper.get('parser', DEFAULT_PARSER) for newspaper in self.newspapers.values()
+                           if newspaper['name'] == name), DEFAULT_PARSER)
+            logger.info(f"Parsed {pages} pages from {name} with {parser} "
+                        f"in {seconds * 1000 / pages:.1f} ms per page on average")
+
+    def request(self, newspaper, url, headers, use_cache=False, stream=False, body_reader=None):
+        """GET a URL through the host's circuit breaker
+
+        Raises CircuitOpenError without sending anything if the host's breaker is open.
+        """
+        host = self.breakers.before_request(url)
+        try:
+            response = self.send_request(newspaper, url, headers, use_cache, stream, body_reader)
+        except Exception:
+            self.breakers.record_failure(host)
+            raise
+
+        if response.status_code >= 500:
+            self.breakers.record_failure(host)
+        else:
+            self.breakers.record_success(host)
+        return response
+
+    def send_request(self, newspaper, url, headers, use_cache=False, stream=False, body_reader=None):
+        """GET a URL under the host controller, retrying once if the host asks us to wait briefly
+
+        With stream=True the body is read with read_stream(), or with body_reader(response)
+        when one is given, while the host slot is still held.
+        """
+        for attempt in range(2):
+            host = self.controller.acquire(url)
+            start = time.perf_counter()
+            reset_connection_timings()
+            try:
+                if use_cache and self.http_cache is not None:
+                    response = self.http_cache.get(
+                        url, lambda request_headers: self.sessions.get(newspaper, url, headers=request_headers),
+                        headers=headers)
+                else:
+                    response = self.sessions.get(newspaper, url, headers=headers,
+                                                 stream=stream or body_reader is not None)
+                    if body_reader is not None:
+                        body_reader(response)
+                    elif stream:
+                        self.read_stream(newspaper, url, response)
+            except Exception:
+                self.controller.release(host, None, time.perf_counter() - start)
+                self.telemetry.record_request(None, time.perf_counter() - start)
+                raise
+            self.telemetry.record_request(response, time.perf_counter() - start)
+
+            retry_after = None
+            if response.status_code in (429, 503):
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.controller.release(host, response.status_code, time.perf_counter() - start, retry_after)
+
+            if retry_after is None or attempt > 0 or retry_after > self.max_retry_after:
+                return response
+            logger.info(f"Retrying {url} once {host} allows it")
+        return response
+
+    def read_stream(self, newspaper, url, response):
+        """Read the body of a streamed article response, stopping early when the content is complete"""
+        if response.status_code != 200:
+            response.content  # Error pages are small, read them whole
+            return
+
+        # Only the selector extraction tries first can end the download early
+        selector = self.selector_stats.order(newspaper)[0] if newspaper.get('early_abort', True) else None
+        max_bytes = newspaper.get('max_page_bytes', self.max_page_bytes)
+        body, stats = read_article_body(response, selector, max_bytes)
+        # Hand the body to requests so response.text decodes it as for a normal response
+        response._content = body
+        # A page that was cut short is only a prefix of the page, so it is never archived
+        if stats['stopped'] == 'complete':
+            self.sessions.record(url, response)
+
+        if stats['stopped'] == 'byte_cap':
+            logger.info(f"      Stopped reading {url} at the {max_bytes // 1024} KB byte cap")
+        with self._stats_lock:
+            totals = self.stream_stats.setdefault(
+                newspaper['name'], {'pages': 0, 'stopped_early': 0, 'bytes_read': 0, 'bytes_saved': 0})
+            totals['pages'] += 1
+            totals['stopped_early'] += stats['stopped'] != 'complete'
+            totals['bytes_read'] += stats['bytes_read']
+            totals['bytes_saved'] += stats['bytes_saved']
+
+    def log_stream_stats(self):
+        for name, totals in sorted(self.stream_stats.items()):
+            logger.info(f"Streaming for {name}: {totals['stopped_early']} of {totals['pages']} article pages "
+                        f"stopped early{' and not archived' if self.sessions.recorder is not None else ''}, "
+                        f"{totals['bytes_read'] / 1024:.0f} KB read, {totals['bytes_saved'] / 1024:.0f} KB saved")
+
+    def run_summary(self):
+        """Return a summary of the last run, including work skipped by open circuit breakers"""
+        articles_per_newspaper = {}
+        for article in self.all_articles:
+            articles_per_newspaper[article.newspaper] = articles_per_newspaper.get(article.newspaper, 0) + 1
+
+        return {
+            'articles_scraped': len(self.all_articles),
+            'articles_per_newspaper': articles_per_newspaper,
+            'near_duplicates': dict(self.duplicates_found),
+            'seen_urls': len(self.seen),
+            'skipped_requests': self.breakers.skipped(),
+            'circuit_breakers': self.breakers.summary(),
+            'dead_selectors': self.selector_stats.dead_selectors(),
+            'streaming': {name: dict(totals) for name, totals in self.stream_stats.items()},
+            'hosts': self.host_state(),
+            'telemetry': self.telemetry.summary()
+        }
+
+    def host_state(self):
+        """Return the controller state of each newspaper's main host, keyed by newspaper name"""
+        return {newspaper['name']: self.controller.state(urlparse(newspaper['base_url']).netloc)
+                for newspaper in self.newspapers.values()}
+
+    def scrape_article_links(self, url, newspaper, raise_errors=False):
+        """Scrape article links from a category page with more robust error handling and debugging
+
+        Pages that cannot be fetched yield no links, or raise with `raise_errors` so a
+        caller that retries the page can tell them apart from pages without articles.
+        """
         headers = {'User-Agent': get_random_user_agent()}
         try:
-            # Add headers and timeout for the request
-            response = requests.get(url, headers=headers, timeout=15)
+            # Category pages are revalidated through the HTTP cache when one is configured
+            response = self.request(newspaper, url, headers, use_cache=True)
 
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-
-                # Log some of the HTML to help debug selector issues
-                logger.debug(f"First 500 chars of HTML: {soup.prettify()[:500]}")
-
-                # Try different article selectors
-                selectors = newspaper['article_selector'].split(', ')
-                article_links = []
-
-                for selector in selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        logger.info(f"Selector '{selector}' matched {len(elements)} elements")
-
-                        # Try different title selectors for each article element
-                        title_selectors = newspaper['title_selector'].split(', ')
-                        for title_selector in title_selectors:
-                            for element in elements:
-                                title_elem = element.select_one(title_selector)
-                                if title_elem and title_elem.get('href'):
-                                    href = title_elem.get('href')
-                                    title = title_elem.text.strip()
-                                    # Handle relative URLs
-                                    if not href.startswith('http'):
-                                        href = urljoin(newspaper['base_url'], href)
-
-                                    article_links.append({
-                                        'url': href,
-                                        'title': title
-                                    })
-
-                                # Also try to find links directly in the article container
-                                links = element.find_all('a')
-                                for link in links:
-                                    href = link.get('href')
-                                    if href and (
-                                        '/news/' in href or
-                                        '/article/' in href or
-                                        '/story/' in href or
-                                        '/business/' in href or
-                                        '/politics/' in href or
-                                        '/sport/' in href
-                                    ):
-                                        title = link.text.strip() or link.get('title', '')
-                                        if not title and link.find('h2'):
-                                            title = link.find('h2').text.strip()
-                                        if not title and link.find('h3'):
-                                            title = link.find('h3').text.strip()
-
-                                        # Handle relative URLs
-                                        if not href.startswith('http'):
-                                            href = urljoin(newspaper['base_url'], href)
-
-                                        article_links.append({
-                                            'url': href,
-                                            'title': title or "No title found"
-                                        })
-
-                # Remove duplicates
-                unique_links = []
-                seen_urls = set()
-                for article in article_links:
-                    if article['url'] not in seen_urls and article['title']:
-                        unique_links.append(article)
-                        seen_urls.add(article['url'])
+                unique_links, parse_seconds = self.parse_stage.run(extract_links_from_html, response.text, newspaper)
+                self.record_parse_time(newspaper, parse_seconds, url, 'listing')
 
                 logger.info(f"Found {len(unique_links)} unique article links")
                 return unique_links
-            else:
-                logger.warning(f"Failed to access {url}, status code: {response.status_code}")
-                return []
+            logger.warning(f"Failed to access {url}, status code: {response.status_code}")
+            error = requests.HTTPError(f"Status code {response.status_code} for {url}", response=response)
 
+        except CircuitOpenError as e:
+            logger.warning(f"{str(e)}: {url}")
+            error = e
         except Exception as e:
             logger.error(f"Error scraping URL {url}: {str(e)}")
-            return []
+            error = e
 
-    def scrape_article_content(self, article_url, article_title, newspaper):
-        """Scrape the content of an article with more robust error handling"""
-        try:
-            headers = {'User-Agent': get_random_user_agent()}
-            response = requests.get(article_url, headers=headers, timeout=15)
+        if raise_errors:
+            raise error
+        return []
+
+    def discovery_mode(self, newspaper):
+        """Return 'feeds' if article links of this newspaper come from its feeds, else 'html'"""
+        mode = self.discovery or newspaper.get('discovery', 'html')
+        return mode if mode == 'html' or newspaper.get('feeds') else 'html'
 
+    def discover_from_feed(self, url, newspaper, depth=0):
+        """Read article links from an RSS/Atom feed or sitemap, skipping entries from before its last read
+
+        Child sitemaps of a sitemap index are followed up to two levels deep.
+        """
+        headers = {'User-Agent': get_random_user_agent()}
+        since = self.discovery_state.since(url)
+        if since is not None:
+            headers['If-Modified-Since'] = self.discovery_state.if_modified_since(url)
+        reader = FeedReader(since)
+
+        def read_feed(response):
+            # The feed is parsed while it downloads; the body is only kept for the page archive
+            raw = bytearray() if response.status_code == 200 and self.sessions.recorder is not None else None
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                read_feed_response(response, reader, raw)
+            response._content = bytes(raw) if raw is not None else b''
+            if raw is not None:
+                # Archived like the HTML pages, so feeds mode can be replayed
+                self.sessions.record(url, response)
+
+        try:
+            response = self.request(newspaper, url, headers, body_reader=read_feed)
+        except CircuitOpenError as e:
+            logger.warning(f"{str(e)}: {url}")
+            return []
+        except Exception as e:
+            logger.error(f"Error reading feed {url}: {str(e)}")
+            return []
 
-                # Try different content selectors
-                content_selectors = newspaper['content_selector'].split(', ')
-                content = ""
+        if response.status_code == 304:
+            logger.info(f"Feed {url} has not changed since {since:%Y-%m-%d %H:%M}")
+            self.discovery_state.mark_read(url, self.run_started)
+            return []
+        if response.status_code != 200:
+            logger.warning(f"Failed to read feed {url}, status code: {response.status_code}")
+            return []
 
-                for selector in content_selectors:
-                    paragraphs = soup.select(selector)
-                    if paragraphs:
-                        content = ' '.join(p.text.strip() for p in paragraphs)
-                        if len(content) > 100:  # If we found substantial content, stop looking
-                            break
+        links = []
+        keys = set()
+        for entry in reader.entries:
+            article_url = normalize_url(entry['url'])
+            if canonical_url(article_url) not in keys:
+                keys.add(canonical_url(article_url))
+                links.append({'url': article_url, 'title': entry['title']})
+        for sitemap_url in reader.sitemaps:
+            if depth < 2:
+                links.extend(self.discover_from_feed(sitemap_url, newspaper, depth + 1))
 
-                # If main selectors failed, try a more generic approach
-                if not content or len(content) < 100:
-                    # Look for article containers
-                    article_containers = soup.select('article, div.article, div.story')
-                    for container in article_containers:
-                        paragraphs = container.find_all('p')
-                        content = ' '.join(p.text.strip() for p in paragraphs)
-                        if len(content) > 100:
-                            break
+        self.discovery_state.mark_read(url, self.run_started)
+        logger.info(f"Found {len(reader.entries)} new entries in feed {url} "
+                    f"({reader.skipped} older ones skipped, {reader.bytes_read // 1024} KB)")
+        return links
 
-                if not content or len(content) < 100:
-                    # Last resort: get all paragraphs in the page
-                    paragraphs = soup.find_all('p')
-                    content = ' '.join(p.text.strip() for p in paragraphs[:15])  # Limit to first 15 paragraphs
+    def fetch_article(self, article_url, newspaper):
+        """Download an article page; returns its HTML, or None if it could not be fetched"""
+        try:
+            headers = {'User-Agent': get_random_user_agent()}
+            response = self.request(newspaper, article_url, headers, stream=self.stream_articles)
 
-                return content
+            if response.status_code == 200:
+                return response.text
             else:
                 logger.warning(f"Failed to access article {article_url}, status code: {response.status_code}")
-                return ""
+                return None
 
+        except CircuitOpenError as e:
+            logger.warning(f"{str(e)}: {article_url}")
+            return None
+        except Exception as e:
+            logger.error(f"Error scraping article content {article_url}: {str(e)}")
+            return None
+
+    def download_and_queue(self, article, newspaper, category=None):
+        """Download an article and queue it for extraction; returns the extraction future"""
+        logger.info(f"      Scraping article: {article['title']}")
+        with self.telemetry.scope(newspaper=newspaper['name'], category=category, page_type='article'):
+            html = self.fetch_article(article['url'], newspaper)
+            if html is not None:
+                self.telemetry.record_yield(fetched=1)
+        return self.submit_article_extraction(html, newspaper)
+
+    def submit_article_extraction(self, html, newspaper):
+        """Queue an article page for content extraction in the parse stage"""
+        if html is None:
+            return None
+        return self.parse_stage.submit(extract_content_from_html, html, newspaper,
+                                       self.selector_stats.order(newspaper))
+
+    def article_content_result(self, future, article_url, newspaper):
+        """Wait for an extraction job and return the article content ("" on failure)"""
+        if future is None:
+            return ""
+        try:
+            content, parse_seconds, trace = future.result()
         except Exception as e:
             logger.error(f"Error scraping article content {article_url}: {str(e)}")
             return ""
+        self.record_parse_time(newspaper, parse_seconds, article_url, 'article')
+        self.selector_stats.record(newspaper['name'], trace)
+        return content
+
+    def scrape_article_content(self, article_url, article_title, newspaper):
+        """Scrape the content of an article with more robust error handling"""
+        html = self.fetch_article(article_url, newspaper)
+        return self.article_content_result(self.submit_article_extraction(html, newspaper), article_url, newspaper)
 
     def scrape_all_newspapers(self, max_articles_per_category=5):
-        """Scrape articles from all defined newspapers with improved error handling"""
+        """Scrape articles from all defined newspapers with improved error handling
+
+        Each newspaper is scraped by its own worker thread, so the politeness delays
+        of different hosts overlap instead of adding up.
+        """
         logger.info("Starting web scraping process")
 
-        for newspaper_id, newspaper in self.newspapers.items():
-            logger.info(f"Scraping from {newspaper['name']}")
+        max_workers = self.max_workers or len(self.newspapers)
+        inline_stage = self.parse_stage
+        if self.parse_workers:
+            self.parse_stage = ParseStage(self.parse_workers)
+            logger.info(f"Extracting pages in {self.parse_workers} worker processes")
+
+        try:
+            self.run_newspaper_workers(max_workers, max_articles_per_category)
+        finally:
+            self.parse_stage.shutdown()
+            self.parse_stage = inline_stage
+
+        self.log_parse_stats()
+        self.log_stream_stats()
+        for name, state in self.host_state().items():
+            logger.info(f"Host state for {name}: {state}")
+
+        # Create a DataFrame from all the scraped articles (empty if none could be scraped)
+        if not self.all_articles:
+            logger.warning("No articles were scraped successfully")
+        return articles_to_frame(self.all_articles)
+
+    def run_newspaper_workers(self, max_workers, max_articles_per_category):
+        """Scrape each newspaper on its own network thread and collect the articles"""
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scraper") as executor:
+            futures = [
+                executor.submit(self.scrape_newspaper, newspaper_id, newspaper, max_articles_per_category)
+                for newspaper_id, newspaper in self.newspapers.items()
+            ]
+
+            # Collect results in definition order so the DataFrame matches a sequential run
+            for (newspaper_id, newspaper), future in zip(self.newspapers.items(), futures):
+                try:
+                    self.all_articles.extend(future.result())
+                except Exception as e:
+                    logger.error(f"Error scraping {newspaper['name']}: {str(e)}")
+
+    def scrape_newspaper(self, newspaper_id, newspaper, max_articles_per_category=5):
+        """Scrape every category of a single newspaper and return its articles"""
+        logger.info(f"Scraping from {newspaper['name']}")
+        articles = []
+
+        csv_filename = os.path.join(self.data_dir, f"{newspaper_id}.csv")
+        if self.frontier is not None:
+            # Articles saved before the frontier existed count as already fetched
+            if not self.frontier.has_newspaper(newspaper_id):
+                self.frontier.seed_from_csv(csv_filename, newspaper_id)
+            # Append to the existing file so earlier runs are kept
+            write_header = not os.path.exists(csv_filename) or os.path.getsize(csv_filename) == 0
+            if not write_header:
+                # Files written before the body store get the same columns as the rows appended now
+                self.bodies.migrate_csv(csv_filename)
+            mode = 'a'
+        else:
+            write_header = True
+            mode = 'w'
+
+        with open(csv_filename, mode, newline='', encoding='utf-8') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            if write_header:
+                csv_writer.writerow(ARTICLE_COLUMNS)
+                csv_file.flush()
 
-            # Create a CSV file for this newspaper
-            csv_filename = f"news_data/{newspaper_id}.csv"
-            with open(csv_filename, 'w', newline='', encoding='utf-8') as csv_file:
-                csv_writer = csv.writer(csv_file)
-                csv_writer.writerow(['newspaper', 'category', 'title', 'url', 'content', 'date_scraped'])
+            # Scrape each category
+            for category, urls in newspaper['categories'].items():
+                logger.info(f"  Scraping category: {category}")
 
-                # Scrape each category
-                for category, urls in newspaper['categories'].items():
-                    logger.info(f"  Scraping category: {category}")
+                articles_scraped = 0
 
-                    articles_scraped = 0
-                    for url in urls:
-                        try:
-                            if articles_scraped >= max_articles_per_category:
-                                break
+                # Resume articles discovered by an interrupted run before visiting the category pages
+                feed_mode = self.discovery_mode(newspaper) == 'feeds' and newspaper['feeds'].get(category)
+                sources = list(newspaper['feeds'][category] if feed_mode else urls)
+                if self.frontier is not None:
+                    resumed = self.frontier.pending(newspaper_id, category)
+                    if resumed:
+                        logger.info(f"    Resuming {len(resumed)} unfinished articles")
+                        sources.insert(0, resumed)
 
+                for url in sources:
+                    try:
+                        if articles_scraped >= max_articles_per_category:
+                            break
+
+                        if isinstance(url, list):
+                            article_links = url
+                        else:
                             logger.info(f"    Accessing URL: {url}")
 
                             # Scrape article links
-                            article_links = self.scrape_article_links(url, newspaper)
-
-                            # Process each article link
-                            for article in article_links[:max_articles_per_category - articles_scraped]:
-                                try:
-                                    article_url = article['url']
-                                    article_title = article['title']
-
-                                    logger.info(f"      Scraping article: {article_title}")
-
-                                    # Add delay to avoid overloading the server
-                                    time.sleep(random.uniform(1, 3))
-
-                                    # Scrape article content
-                                    content = self.scrape_article_content(article_url, article_title, newspaper)
-
-                                    # Skip if content is too short
-                                    if len(content) < 50:
-                                        logger.warning(f"      Article content too short, skipping")
-                                        continue
-
-                                    # Save to CSV
-                                    csv_writer.writerow([
-                                        newspaper['name'],
-                                        category,
-                                        article_title,
-                                        article_url,
-                                        content,
-                                        datetime.now().strftime('%Y-%m-%d')
-                                    ])
-
-                                    # Add to all articles list
-                                    self.all_articles.append({
-                                        'newspaper': newspaper['name'],
-                                        'category': category,
-                                        'title': article_title,
-                                        'url': article_url,
-                                        'content': content,
-                                        'date_scraped': datetime.now().strftime('%Y-%m-%d')
-                                    })
-
-                                    articles_scraped += 1
-                                    logger.info(f"      Successfully scraped article")
-
-                                    if articles_scraped >= max_articles_per_category:
-                                        break
-
-                                except Exception as e:
-                                    logger.error(f"      Error processing article: {str(e)}")
-
-                        except Exception as e:
-                            logger.error(f"    Error scraping URL {url}: {str(e)}")
-
-        # Create a DataFrame from all the scraped articles
-        if self.all_articles:
-            return pd.DataFrame(self.all_articles)
-        else:
-            # Return an empty DataFrame if no articles could be scraped
-            logger.warning("No articles were scraped successfully")
-            return pd.DataFrame(columns=['newspaper', 'category', 'title', 'url', 'content', 'date_scraped'])
+                            with self.telemetry.scope(newspaper=newspaper['name'], category=category,
+                                                      page_type='feed' if feed_mode else 'listing'):
+                                if feed_mode:
+                                    article_links = self.discover_from_feed(url, newspaper)
+                                else:
+                                    article_links = self.scrape_article_links(url, newspaper)
+                                self.telemetry.record_yield(links=len(article_links))
+
+                        article_links = self.filter_new_links(article_links)
+
+                        # Download each article and queue it for extraction, so pages are
+                        # parsed in the parse stage while the next download is in flight.
+                        # The host controller decides how many downloads may overlap.
+                        batch = article_links[:max_articles_per_category - articles_scraped]
+                        if self.frontier is not None:
+                            # Only links about to be fetched are pending, so the next run only
+                            # resumes the articles an interrupted run left unfinished
+                            for article in batch:
+                                self.frontier.add_pending(article['url'], newspaper_id, category, article['title'])
+                        with ThreadPoolExecutor(max_workers=self.controller.max_concurrency,
+                                                thread_name_prefix=f"{newspaper_id}-fetch") as fetchers:
+                            extractions = list(fetchers.map(
+                                lambda article: self.download_and_queue(article, newspaper, category), batch))
+                        queued = list(zip(batch, extractions))
+                        saved = []
+
+                        # Process each article link
+                        for article, extraction in queued:
+                            try:
+                                article_url = article['url']
+                                article_title = article['title']
+
+                                with self.telemetry.scope(newspaper=newspaper['name'], category=category):
+                                    content = self.article_content_result(extraction, article_url, newspaper)
+
+                                # Skip if content is too short
+                                if len(content) < 50:
+                                    logger.warning(f"      Article content too short, skipping")
+                                    if self.frontier is not None:
+                                        self.frontier.mark_failed(article_url)
+                                    continue
+
+                                if self.near_duplicates is not None and \
+                                        self.is_dropped_duplicate(article_url, content, newspaper):
+                                    continue
+
+                                record = Article(newspaper['name'], category, article_title, article_url,
+                                                 content, scrape_date())
+
+                                # Save the body, then the row, flushing so a crash never loses a finished article
+                                self.bodies.put(content, record.content_hash)
+                                csv_writer.writerow(record.values())
+                                csv_file.flush()
+                                if self.frontier is not None:
+                                    self.frontier.mark_done(article_url)
+                                self.seen.add(canonical_url(article_url))
+                                with self.telemetry.scope(newspaper=newspaper['name'], category=category):
+                                    self.telemetry.record_yield(saved=1)
+
+                                # Add to this newspaper's articles
+                                saved.append(record)
+
+                                articles_scraped += 1
+                                logger.info(f"      Successfully scraped article: {article_title}")
+
+                            except Exception as e:
+                                logger.error(f"      Error processing article: {str(e)}")
+
+                        articles.extend(saved)
+                        self.save_to_database(saved)
+                        # The body store has the bodies now, so the run does not keep them in memory
+                        for record in saved:
+                            record.content = None
+
+                    except Exception as e:
+                        logger.error(f"    Error scraping URL {url}: {str(e)}")
+
+        return articles
+
+    def save_to_database(self, articles):
+        """Upsert a batch of saved articles into the article database in one transaction"""
+        if self.article_db is None or not articles:
+            return
+        try:
+            self.article_db.upsert(articles)
+        except Exception as e:
+            # The CSV file already holds these articles, so the next run's import can catch up
+            logger.error(f"Error saving {len(articles)} articles to the article database: {str(e)}")
+
+    def is_dropped_duplicate(self, article_url, content, newspaper):
+        """Check an article against the near-duplicate index; returns True if it should be dropped"""
+        duplicate_of, similarity = self.near_duplicates.check_and_add(article_url, newspaper['name'], content)
+        if duplicate_of is None:
+            return False
+
+        with self._stats_lock:
+            self.duplicates_found[newspaper['name']] = self.duplicates_found.get(newspaper['name'], 0) + 1
+
+        if self.duplicate_mode != 'drop':
+            logger.info(f"      Near-duplicate of {duplicate_of} ({similarity:.0%} similar), keeping it")
+            return False
+
+        logger.info(f"      Near-duplicate of {duplicate_of} ({similarity:.0%} similar), skipping")
+        # Remember the URL so later runs do not download the copy again
+        if self.frontier is not None:
+            self.frontier.mark_done(article_url)
+        self.seen.add(canonical_url(article_url))
+        return True
+
+    def filter_new_links(self, article_links):
+        """Drop links fetched before and keep those still to be fetched"""
+        new_links = []
+        for article in article_links:
+            # The in-memory filter answers for most known articles without a database lookup
+            if canonical_url(article['url']) in self.seen:
+                continue
+            if self.frontier is None or self.frontier.should_fetch(article['url']):
+                new_links.append(article)
+
+        skipped = len(article_links) - len(new_links)
+        if skipped:
+            logger.info(f"    Skipping {skipped} articles that were already fetched")
+        return new_links
+
+    def reextract_from_archive(self, archive):
+        """Rerun content extraction on archived article pages without touching the network
+
+        Every saved article, and every article the frontier recorded as failed, is looked
+        up in the archive and extracted again with the current selectors. The newspaper
+        CSV files are rewritten with the new content; returns all resulting articles.
+        """
+        logger.info(f"Re-extracting articles from the page archive ({len(archive)} pages)")
+
+        inline_stage = self.parse_stage
+        if self.parse_workers:
+            self.parse_stage = ParseStage(self.parse_workers)
+            logger.info(f"Extracting pages in {self.parse_workers} worker processes")
 
-def main():
+        try:
+            for newspaper_id, newspaper in self.newspapers.items():
+                try:
+                    self.all_articles.extend(self.reextract_newspaper(newspaper_id, newspaper, archive))
+                except Exception as e:
+                    logger.error(f"Error re-extracting {newspaper['name']}: {str(e)}")
+        finally:
+            self.parse_stage.shutdown()
+            self.parse_stage = inline_stage
+
+        self.log_parse_stats()
+        return articles_to_frame(self.all_articles)
+
+    def reextract_newspaper(self, newspaper_id, newspaper, archive):
+        """Re-extract one newspaper's archived articles and rewrite its CSV file"""
+        csv_filename = os.path.join(self.data_dir, f"{newspaper_id}.csv")
+        articles = []
+        if os.path.exists(csv_filename) and os.path.getsize(csv_filename) > 0:
+            with open(csv_filename, 'r', newline='', encoding='utf-8') as csv_file:
+                articles = [Article.from_dict(row) for row in csv.DictReader(csv_file)]
+
+        failed = []
+        if self.frontier is not None:
+            saved_urls = {canonical_url(article.url) for article in articles}
+            failed = [article for article in self.frontier.failed(newspaper_id)
+                      if canonical_url(article['url']) not in saved_urls]
+
+        if not articles and not failed:
+            return []
+        logger.info(f"Re-extracting {len(articles)} saved and {len(failed)} failed articles "
+                    f"from {newspaper['name']}")
+
+        # Queue every archived page first so the parse workers stay busy
+        saved_jobs = [(article, self.submit_article_extraction(archive.load_text(article['url']), newspaper))
+                      for article in articles]
+        failed_jobs = [(article, self.submit_article_extraction(archive.load_text(article['url']), newspaper))
+                       for article in failed]
+
+        results = []
+        updated = missing = 0
+        for article, extraction in saved_jobs:
+            if extraction is None:
+                # Saved before the archive existed; keep the old content
+                missing += 1
+                results.append(article)
+                continue
+            content = self.article_content_result(extraction, article['url'], newspaper)
+            if len(content) < 50:
+                logger.warning(f"  Re-extracted content too short, keeping the old content: {article['url']}")
+            else:
+                extracted = article.replace(content=content)
+                if extracted.content_hash != article.content_hash:
+                    updated += 1
+                article = extracted
+            results.append(article)
+
+        recovered = 0
+        for article, extraction in failed_jobs:
+            content = self.article_content_result(extraction, article['url'], newspaper)
+            if len(content) < 50:
+                continue
+            results.append(Article(newspaper['name'], article['category'], article['title'], article['url'],
+                                   content, scrape_date()))
+            self.frontier.mark_done(article['url'])
+            recovered += 1
+
+        # Bodies first (rows read from files older than the body store still carry theirs),
+        # then the CSV, written to a temporary file so an interrupted run never truncates it
+        for article in results:
+            if article.content:
+                self.bodies.put(article.content, article.content_hash)
+        with open(csv_filename + '.tmp', 'w', newline='', encoding='utf-8') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(ARTICLE_COLUMNS)
+            csv_writer.writerows(article.values() for article in results)
+        os.replace(csv_filename + '.tmp', csv_filename)
+
+        self.save_to_database(results)
+        for article in results:
+            article.content = None
+        logger.info(f"  {newspaper['name']}: {updated} articles changed, {recovered} recovered, "
+                    f"{missing} not in the archive")
+        return results
+
+
+def combine_newspaper_csvs(newspaper_ids, data_dir='news_data'):
+    """Load and concatenate the per-newspaper CSV files, moving bodies they still hold to the body store"""
+    frames = []
+    bodies = BodyStore(os.path.join(data_dir, 'bodies'))
+    for newspaper_id in newspaper_ids:
+        csv_filename = os.path.join(data_dir, f"{newspaper_id}.csv")
+        if os.path.exists(csv_filename) and os.path.getsize(csv_filename) > 0:
+            bodies.migrate_csv(csv_filename)
+            frames.append(read_articles_csv(csv_filename))
+
+    if not frames:
+        return pd.DataFrame(columns=ARTICLE_COLUMNS)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_args(argv=None):
+    """Parse command line options for the scraper"""
+    parser = argparse.ArgumentParser(description="Zimbabwe Newspaper Web Scraper")
+    parser.add_argument('--max-articles', type=int, default=5,
+                        help="Maximum number of articles to scrape per category")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of newspapers scraped concurrently (default: all of them)")
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of processes that parse pages (0 parses on the download threads)")
+    parser.add_argument('--max-host-concurrency', type=int, default=4,
+                        help="Upper limit on parallel requests to one host once it has proven fast and healthy")
+    parser.add_argument('--near-duplicates', choices=['drop', 'mark', 'off'], default='drop',
+                        help="Drop articles that are near-duplicates of already scraped ones, "
+                             "only record them ('mark'), or skip the check ('off')")
+    parser.add_argument('--failure-threshold', type=int, default=3,
+                        help="Consecutive failures after which a host is skipped for the rest of the run")
+    parser.add_argument('--pool-size', type=int, default=8,
+                        help="Maximum number of pooled keep-alive connections per newspaper")
+    parser.add_argument('--timeout', type=float, default=15,
+                        help="Request timeout in seconds")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always refetch category pages instead of revalidating the HTTP cache")
+    parser.add_argument('--cache-size', type=int, default=50,
+                        help="Maximum size of the on-disk HTTP cache in MB")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream article pages and stop downloading once the article content is complete")
+    parser.add_argument('--max-page-kb', type=int, default=DEFAULT_MAX_PAGE_BYTES // 1024,
+                        help="Streamed article pages are cut off after this many KB (default 2048)")
+    parser.add_argument('--metrics-file', default='news_data/scraper.prom',
+                        help="Prometheus text file the run's metrics are written to (default: news_data/scraper.prom)")
+    parser.add_argument('--discovery', choices=['html', 'feeds'], default=None,
+                        help="Find articles on category pages (html) or in RSS feeds and sitemaps (feeds); "
+                             "default: each newspaper's 'discovery' setting")
+    parser.add_argument('--seen-capacity', type=int, default=2000000,
+                        help="Number of URLs the seen-URL filter is sized for when it is created")
+    parser.add_argument('--archive', metavar='DIR', default='news_data/html_archive',
+                        help="Compressed archive that every fetched page is saved to (default: news_data/html_archive)")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="Do not save fetched pages")
+    parser.add_argument('--reextract', action='store_true',
+                        help="Re-extract the saved and failed articles from the page archive instead of scraping")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Serve pages from a recorded archive through a local replay server instead of the live sites")
+    parser.add_argument('--full', action='store_true',
+                        help="Rescrape everything and overwrite the CSV files instead of only fetching new articles")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main function to run the web scraper"""
+    args = parse_args(argv)
+
     logger.info("Zimbabwe Newspaper Web Scraper")
     logger.info("=============================")
 
+    # Replayed pages are already in an archive, so they are not saved again
+    archive = None
+    if args.reextract or not (args.no_archive or args.replay):
+        archive = PageArchive(args.archive)
+    replay_server = None
+    adapter_factory = HTTPAdapter
+    if args.replay:
+        from replay_server import ReplayServer, ReplayAdapter
+        replay_server = ReplayServer(PageArchive(args.replay))
+        server_url = replay_server.start()
+        adapter_factory = partial(ReplayAdapter, server_url)
+
     # Run web scraping
-    scraper = NewspaperScraper()
-    df = scraper.scrape_all_newspapers(max_articles_per_category=5)
+    sessions = SessionPool(pool_maxsize=args.pool_size, timeout=args.timeout,
+                           adapter_factory=adapter_factory, recorder=archive)
+    use_cache = not (args.no_cache or args.replay)
+    http_cache = HTTPCache(max_bytes=args.cache_size * 1024 * 1024) if use_cache else None
+    frontier = None if args.full else ScrapeFrontier()
+    # Full runs fetch everything again, so they only skip URLs seen earlier in the same run
+    seen = BloomFilter(path=None if args.full else 'news_data/seen_urls.bloom', capacity=args.seen_capacity)
+    if frontier is not None and len(seen) == 0:
+        for url in frontier.done_urls():
+            seen.add(canonical_url(url))
+    # Full runs read whole feeds again instead of only entries newer than the last read
+    discovery_state = DiscoveryState(path=None if args.full else 'news_data/discovery_state.json')
+    controller = HostController(max_concurrency=args.max_host_concurrency)
+    breakers = CircuitBreakerRegistry(failure_threshold=args.failure_threshold)
+    selector_stats = SelectorStats()
+    article_db = ArticleDatabase()
+    near_duplicates = None
+    if args.near_duplicates != 'off':
+        from near_duplicates import NearDuplicateIndex
+        near_duplicates = NearDuplicateIndex()
+    scraper = NewspaperScraper(max_workers=args.workers, sessions=sessions, http_cache=http_cache,
+                               frontier=frontier, parse_workers=args.parse_workers, controller=controller,
+                               breakers=breakers, near_duplicates=near_duplicates,
+                               duplicate_mode=args.near_duplicates, selector_stats=selector_stats,
+                               stream_articles=args.stream, max_page_bytes=args.max_page_kb * 1024,
+                               seen=seen, discovery=args.discovery, discovery_state=discovery_state,
+                               article_db=article_db)
+    if article_db.count() == 0:
+        # Articles saved before the database existed
+        for newspaper_id in scraper.newspapers:
+            csv_filename = os.path.join(scraper.data_dir, f"{newspaper_id}.csv")
+            if os.path.exists(csv_filename) and os.path.getsize(csv_filename) > 0:
+                scraper.bodies.migrate_csv(csv_filename)
+                with open(csv_filename, newline='', encoding='utf-8') as csv_file:
+                    article_db.upsert(csv.DictReader(csv_file))
+    try:
+        if args.reextract:
+            df = scraper.reextract_from_archive(archive)
+        else:
+            df = scraper.scrape_all_newspapers(max_articles_per_category=args.max_articles)
+    finally:
+        sessions.close()
+        breakers.save()
+        selector_stats.save()
+        seen.save()
+        discovery_state.save()
+        article_db.close()
+        if near_duplicates is not None:
+            near_duplicates.close()
+        if frontier is not None:
+            frontier.close()
+        if archive is not None:
+            archive.flush()
+            archive.close()
+            logger.info(f"Page archive {args.archive} holds {len(archive)} pages")
+        if replay_server is not None:
+            replay_server.stop()
+
+    if http_cache is not None:
+        logger.info(f"HTTP cache: {http_cache.hits} category pages not modified, {http_cache.misses} fetched")
+
+    # Record what was scraped and what was skipped
+    summary = scraper.run_summary()
+    with open('news_data/run_summary.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    scraper.telemetry.write_prometheus(args.metrics_file)
+    for host, skipped in summary['skipped_requests'].items():
+        logger.warning(f"Skipped {skipped} requests to {host} because its circuit breaker was open")
+    for newspaper_name, selectors in summary['dead_selectors'].items():
+        logger.warning(f"Content selectors for {newspaper_name} that never match: {', '.join(selectors)}")
+
+    incremental = frontier is not None and not args.reextract
+    if incremental:
+        logger.info(f"Scraped {len(df)} new articles")
+
+    # Save the articles to the columnar store; incremental runs only add the new ones
+    store = ArticleStore()
+    if store.available:
+        if incremental and store.exists():
+            store.append(df)
+        else:
+            if incremental:
+                # The first run with a store also takes in the articles of earlier runs
+                df = combine_newspaper_csvs(scraper.newspapers.keys())
+            store.replace(df)
+        logger.info("Scraping completed")
+        return
+
+    # Without pyarrow, save all articles to a single CSV file
+    if incremental:
+        # Incremental runs only return new articles, so rebuild the file from every newspaper CSV
+        df = combine_newspaper_csvs(scraper.newspapers.keys())
 
-    # Save all articles to a single CSV file
     if not df.empty:
         df.to_csv('news_data/all_articles.csv', index=False)
         logger.info(f"Saved {len(df)} articles to news_data/all_articles.csv")
@@ -0,0 +1,129 @@
+"""
+Append-only compressed archive of fetched pages keyed by URL
+Every page is written as its own gzip frame to pages.dat, and a fixed-width offset index
+(pages.idx) maps the SHA-1 of each URL to its frame. The index is memory-mapped when the
+archive is opened, so single pages can be read back without scanning the data file.
+Used to re-extract articles without network I/O and to replay runs offline.
+"""
+import os
+import json
+import gzip
+import mmap
+import struct
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SHA-1 of the URL, frame offset, frame length
+INDEX_RECORD = struct.Struct('<20sQI')
+
+
+def url_key(url):
+    return hashlib.sha1(url.encode('utf-8')).digest()
+
+
+class PageArchive:
+    """Append-only gzip-framed page store with a memory-mapped offset index"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.data_path = os.path.join(directory, 'pages.dat')
+        self.index_path = os.path.join(directory, 'pages.idx')
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Later records for the same URL override earlier ones
+        self._offsets = {}
+        if os.path.exists(self.index_path) and os.path.getsize(self.index_path) >= INDEX_RECORD.size:
+            with open(self.index_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                    # Ignore a partially written last record left by a crash
+                    usable = len(index) - len(index) % INDEX_RECORD.size
+                    for key, offset, length in INDEX_RECORD.iter_unpack(index[:usable]):
+                        self._offsets[key] = (offset, length)
+
+        self._data = open(self.data_path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        self._reader = open(self.data_path, 'rb')
+
+    def __contains__(self, url):
+        return url_key(url) in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def save(self, url, content, status_code=200, content_type='text/html; charset=utf-8', encoding=None):
+        """Append a page body (bytes) under its URL"""
+        meta = {'url': url, 'status_code': status_code, 'content_type': content_type, 'encoding': encoding}
+        frame = gzip.compress(json.dumps(meta).encode('utf-8') + b'\n' + content, compresslevel=6)
+
+        with self._lock:
+            # The data file is always written before its index record, so every indexed frame is complete
+            offset = self._data.seek(0, os.SEEK_END)
+            self._data.write(frame)
+            self._data.flush()
+            self._add_index_record(url, offset, len(frame))
+        return offset, len(frame)
+
+    def alias(self, url, target_url):
+        """Make `url` resolve to the frame already stored for `target_url`"""
+        location = self._offsets.get(url_key(target_url))
+        if location is not None:
+            with self._lock:
+                self._add_index_record(url, *location)
+
+    def _add_index_record(self, url, offset, length):
+        key = url_key(url)
+        self._index.write(INDEX_RECORD.pack(key, offset, length))
+        self._index.flush()
+        self._offsets[key] = (offset, length)
+
+    def _read_frame(self, offset, length):
+        with self._read_lock:
+            self._reader.seek(offset)
+            payload = gzip.decompress(self._reader.read(length))
+        header, _, body = payload.partition(b'\n')
+        return json.loads(header), body
+
+    def load(self, url):
+        """Return (metadata, body bytes) for a URL, or (None, None) if it was never archived"""
+        location = self._offsets.get(url_key(url))
+        if location is None:
+            return None, None
+        return self._read_frame(*location)
+
+    def load_text(self, url):
+        """Return the decoded page for a URL, or None if it was never archived"""
+        meta, body = self.load(url)
+        if meta is None:
+            return None
+        return body.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+    def urls(self):
+        """Return every URL whose frame is stored under its own address (reads each frame header)"""
+        return [self._read_frame(offset, length)[0]['url'] for offset, length in set(self._offsets.values())]
+
+    def flush(self):
+        """Force the archive files to disk"""
+        with self._lock:
+            for f in (self._data, self._index):
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        with self._lock:
+            for f in (self._data, self._index, self._reader):
+                f.close()
+
+    def record(self, url, response):
+        """Archive a successful response under the requested URL (and its final URL after redirects)"""
+        if response.status_code != 200:
+            return
+        content_type = response.headers.get('Content-Type', 'text/html')
+        encoding = response.encoding or response.apparent_encoding
+        self.save(url, response.content, content_type=content_type, encoding=encoding)
+        if response.url and response.url != url:
+            self.alias(response.url, url)
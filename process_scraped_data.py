@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """
 Script to process scraped news article data and create clusters for the web application.
-This script specifically ensures that data from all_articles.csv is properly processed.
+This script specifically ensures that the scraped articles are properly processed. They are
+read from the article database (an empty one is first filled from the article store, or
+all_articles.csv without it), and the clusters are saved back to it.
 """
 import os
-import json
-import pandas as pd
+import argparse
 import logging
 from datetime import datetime
 
+from article_db import open_article_database
+from article_record import ARTICLE_COLUMNS, articles_from_frame, group_by_category, dump_clusters
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,30 +25,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def check_file_exists(file_path):
-    """Check if a file exists and log its details"""
-    if os.path.exists(file_path):
-        file_size = os.path.getsize(file_path) / 1024  # Size in KB
-        logger.info(f"✓ Found {file_path} (Size: {file_size:.2f} KB)")
-        return True
-    else:
-        logger.error(f"✗ File not found: {file_path}")
-        return False
-
-
-def load_scraped_data():
-    """Load the scraped article data from CSV"""
-    csv_path = "news_data/all_articles.csv"
+def load_scraped_data(db, columns=None):
+    """Load the scraped article data from the article database
 
-    if not check_file_exists(csv_path):
-        raise FileNotFoundError(f"Could not find scraped data at {csv_path}")
+    Only `columns` are read (all by default).
+    """
+    if not db.count():
+        raise FileNotFoundError(f"Could not find scraped data in {db.db_path}, the article store or all_articles.csv")
 
     try:
-        df = pd.read_csv(csv_path)
-        logger.info(f"Successfully loaded {len(df)} articles from {csv_path}")
+        df = db.read(columns)
+        logger.info(f"Successfully loaded {len(df)} articles from {db.db_path}")
 
         # Check if dataframe has expected columns
-        expected_columns = ['newspaper', 'category', 'title', 'url', 'content', 'date_scraped']
+        expected_columns = columns or ARTICLE_COLUMNS
         missing_columns = [col for col in expected_columns if col not in df.columns]
 
         if missing_columns:
@@ -88,19 +82,10 @@ def create_clusters(df):
     categories = df['category'].unique()
     logger.info(f"Found {len(categories)} unique categories: {', '.join(categories)}")
 
-    # Create clusters based on categories
-    clusters = {}
-    for i, category in enumerate(categories):
-        # Filter articles for this category
-        category_articles = df[df['category'] == category]
-
-        # Convert to list of dictionaries for JSON serialization
-        articles_list = category_articles.to_dict('records')
-
-        # Add to clusters
-        clusters[str(i)] = articles_list
-
-        logger.info(f"Created cluster {i} for category '{category}' with {len(articles_list)} articles")
+    # Create clusters based on categories, holding compact Article records
+    clusters = group_by_category(articles_from_frame(df))
+    for cluster_id, articles in clusters.items():
+        logger.info(f"Created cluster {cluster_id} for category '{articles[0].category}' with {len(articles)} articles")
 
     return clusters
 
@@ -112,27 +97,44 @@ def save_clusters(clusters, output_path):
     # Ensure the directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    # Save to JSON
+    # Save to JSON, one article at a time
     with open(output_path, 'w') as f:
-        json.dump(clusters, f, indent=2)
+        dump_clusters(clusters, f)
 
     logger.info(f"Successfully saved {len(clusters)} clusters to {output_path}")
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Create the web application's clusters from the scraped articles")
+    parser.add_argument('--no-snippets', action='store_true',
+                        help="Do not load article snippets; the cluster file gets snippet: null")
+    parser.add_argument('--csv-engine', choices=['c', 'pyarrow'], default='c',
+                        help="Parser for all_articles.csv when it is imported into an empty article database")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main function to process scraped data and create clusters"""
+    args = parse_args(argv)
     print("=" * 80)
     print("Processing Scraped News Article Data")
     print("=" * 80)
 
     try:
-        # Load the scraped data
-        df = load_scraped_data()
-
-        # Create clusters
-        clusters = create_clusters(df)
-
-        # Save clusters for the web application
+        db = open_article_database(engine=args.csv_engine)
+        try:
+            # Load the scraped data, leaving out the snippets when they are not needed
+            columns = [column for column in ARTICLE_COLUMNS if column != 'snippet'] if args.no_snippets else None
+            df = load_scraped_data(db, columns=columns)
+
+            # Create clusters; the web application reads them from the article database
+            clusters = create_clusters(df)
+            db.save_clusters(clusters)
+        finally:
+            db.close()
+
+        # Export the clusters as JSON as well
         output_path = "static/cluster_data.json"
         save_clusters(clusters, output_path)
 
@@ -0,0 +1,243 @@
+"""
+Local replay server for offline scraper runs and benchmarks
+Serves pages from a PageArchive (recorded from live sites or synthesised from each
+newspaper's selectors) and provides a requests adapter that routes every request to it
+"""
+import re
+import sys
+import time
+import random
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urljoin, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+COMPOUND_PATTERN = re.compile(r"^([a-zA-Z0-9]*)((?:[.#][\w-]+|\[[^\]]+\])*)$")
+ATTRIBUTE_PATTERN = re.compile(r"\[([\w-]+)(?:([*^$~|]?=)'?([^'\]]*)'?)?\]")
+
+
+def compound_to_tag(compound):
+    """Turn a compound selector such as div.entry-content or div[id*='x'] into (open tag, close tag)"""
+    match = COMPOUND_PATTERN.match(compound)
+    if not match:
+        return '<div>', '</div>'
+    tag = match.group(1) or 'div'
+    qualifiers = match.group(2)
+
+    classes = re.findall(r"\.([\w-]+)", qualifiers)
+    ids = re.findall(r"#([\w-]+)", qualifiers)
+    attributes = []
+    for name, operator, value in ATTRIBUTE_PATTERN.findall(qualifiers):
+        # Substring and prefix matches are satisfied by wrapping the value
+        attributes.append(f'{name}="{"x-" + value + "-x" if operator == "*=" else value}"')
+    if classes:
+        attributes.append(f'class="{" ".join(classes)}"')
+    if ids:
+        attributes.append(f'id="{ids[0]}"')
+
+    attribute_text = (' ' + ' '.join(attributes)) if attributes else ''
+    return f'<{tag}{attribute_text}>', f'</{tag}>'
+
+
+def selector_to_html(selector, inner, anchor_href=None):
+    """Build nested HTML that matches a descendant selector and wraps `inner`
+
+    If the innermost compound is an anchor it receives `anchor_href`.
+    """
+    compounds = selector.split()
+    html = inner
+    for position, compound in enumerate(reversed(compounds)):
+        open_tag, close_tag = compound_to_tag(compound)
+        if position == 0 and anchor_href and open_tag.startswith('<a'):
+            open_tag = open_tag[:-1] + f' href="{anchor_href}">'
+            anchor_href = None
+        html = open_tag + html + close_tag
+    return html, anchor_href
+
+
+def synthetic_listing_page(newspaper_id, newspaper, n_articles=40, seed=0):
+    """Build a category page whose article cards follow the newspaper's selectors"""
+    rng = random.Random(seed)
+    article_selectors = newspaper['article_selector'].split(', ')
+    title_selectors = newspaper['title_selector'].split(', ')
+
+    cards = []
+    for i in range(n_articles):
+        href = f"/news/{newspaper_id}-synthetic-article-{seed}-{i}"
+        title = f"Synthetic {newspaper['name']} headline {i}"
+        title_html, pending_href = selector_to_html(rng.choice(title_selectors), title, anchor_href=href)
+        if pending_href:
+            # The title selector does not end in an anchor, so link the headline separately
+            title_html = f'<a href="{pending_href}">{title_html}</a>'
+        card_body = (title_html +
+                     f'<p>Summary of story {i}. {"Lorem ipsum dolor sit amet. " * rng.randint(2, 6)}</p>' +
+                     f'<a href="/topics/{i}">Topic</a><a href="/news/{newspaper_id}-synthetic-article-{seed}-{i}#comments">Comments</a>')
+        card_html, _ = selector_to_html(rng.choice(article_selectors), card_body)
+        cards.append(card_html)
+
+    navigation = ''.join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(30))
+    scripts = '<script>' + 'var x = 1;' * 500 + '</script>'
+    return (f"<!DOCTYPE html><html><head><title>{newspaper['name']}</title>{scripts}</head>"
+            f"<body><nav><ul>{navigation}</ul></nav><main>{''.join(cards)}</main>"
+            f"<footer>{navigation}</footer></body></html>")
+
+
+def synthetic_article_page(newspaper, title, n_paragraphs=12, seed=0):
+    """Build an article page whose body follows the newspaper's first content selector"""
+    rng = random.Random(seed)
+    content_selector = newspaper['content_selector'].split(', ')[0]
+    paragraphs = ''.join(
+        f"<p>{title}. Paragraph {i}. {'The quick brown fox jumps over the lazy dog. ' * rng.randint(3, 10)}</p>"
+        for i in range(n_paragraphs))
+
+    compounds = content_selector.split()
+    if compounds and compounds[-1] == 'p':
+        body, _ = selector_to_html(' '.join(compounds[:-1]), paragraphs) if len(compounds) > 1 else (paragraphs, None)
+    else:
+        body, _ = selector_to_html(content_selector, paragraphs)
+
+    scripts = '<script>' + 'var y = 2;' * 2000 + '</script>'
+    return (f"<!DOCTYPE html><html><head><title>{title}</title>{scripts}</head>"
+            f"<body><header><h1>{title}</h1></header>{body}<aside><p>Related stories</p></aside></body></html>")
+
+
+def synthetic_feed(newspaper_id, newspaper, n_articles=40, seed=0):
+    """Build an RSS feed listing the same articles as the synthetic category page, newest first"""
+    now = datetime.now(timezone.utc)
+    items = ''.join(
+        f"<item><title>Synthetic {newspaper['name']} headline {i}</title>"
+        f"<link>{urljoin(newspaper['base_url'], f'/news/{newspaper_id}-synthetic-article-{seed}-{i}')}</link>"
+        f"<description>Summary of story {i}.</description>"
+        f"<pubDate>{format_datetime(now - timedelta(hours=i), usegmt=True)}</pubDate></item>"
+        for i in range(n_articles))
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>{newspaper['name']}</title><link>{newspaper['base_url']}</link>{items}</channel></rss>")
+
+
+def build_synthetic_archive(newspapers, archive, articles_per_page=20):
+    """Fill an archive with synthetic category pages, feeds and article pages for every newspaper"""
+    for newspaper_id, newspaper in newspapers.items():
+        for seed, (category, urls) in enumerate(newspaper['categories'].items()):
+            for feed_url in newspaper.get('feeds', {}).get(category, []):
+                archive.save(feed_url, synthetic_feed(newspaper_id, newspaper, articles_per_page, seed).encode('utf-8'),
+                             content_type='application/rss+xml; charset=utf-8')
+            for url in urls:
+                archive.save(url, synthetic_listing_page(newspaper_id, newspaper, articles_per_page, seed).encode('utf-8'))
+                for i in range(articles_per_page):
+                    article_url = urljoin(newspaper['base_url'], f"/news/{newspaper_id}-synthetic-article-{seed}-{i}")
+                    title = f"Synthetic {newspaper['name']} headline {i}"
+                    archive.save(article_url, synthetic_article_page(newspaper, title, seed=seed * 1000 + i).encode('utf-8'))
+    archive.flush()
+    return archive
+
+
+def replay_path(url):
+    """Map an original URL to the path it is served under by the replay server"""
+    parts = urlsplit(url)
+    path = f"/{parts.scheme}/{parts.netloc}{parts.path or '/'}"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def original_url(path):
+    """Inverse of replay_path"""
+    scheme, _, rest = path.lstrip('/').partition('/')
+    return f"{scheme}://{rest}"
+
+
+class ReplayHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Streaming clients hang up as soon as they have the content they need
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class ReplayServer:
+    """Threaded local HTTP server that serves archived pages
+
+    `latency` adds a fixed delay to every response to emulate a remote host.
+    """
+
+    def __init__(self, archive, host='127.0.0.1', port=0, latency=0.0):
+        self.archive = archive
+        self.latency = latency
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = original_url(self.path)
+                meta, body = server.archive.load(url)
+                if meta is None:
+                    body = b'Not archived'
+                    self.send_response(404)
+                    self.send_header('Content-Type', 'text/plain')
+                else:
+                    self.send_response(meta.get('status_code', 200))
+                    self.send_header('Content-Type', meta.get('content_type') or 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+                with server._lock:
+                    server.requests_served += 1
+                    server.bytes_served += len(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Replay server: " + format % args)
+
+        self._httpd = ReplayHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread and return the server's base URL"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Replay server serving {len(self.archive)} pages at {self.url}")
+        return self.url
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests_served = 0
+            self.bytes_served = 0
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """requests adapter that sends every request to a ReplayServer instead of the live site"""
+
+    def __init__(self, server_url, **kwargs):
+        self.server_url = server_url.rstrip('/')
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = request.url
+        request.url = self.server_url + replay_path(url)
+        response = super().send(request, **kwargs)
+        # Report the original URL so callers cannot tell the page was replayed
+        response.url = url
+        return response
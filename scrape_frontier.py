@@ -0,0 +1,218 @@
+"""
+Persistent URL frontier for incremental, crash-resumable scraping
+Records every article URL queued for fetching in SQLite together with its fetch status,
+so later runs only download new articles and an interrupted run picks up where it stopped
+"""
+import os
+import csv
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Articles that failed or were too short are retried this many times before being given up
+MAX_ATTEMPTS = 3
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid',
+                   'mc_cid', 'mc_eid', '_ga', '_gl', 'ocid', 'cmpid', 'icid', 'ito', 'ref', 'ref_src',
+                   'at_medium', 'at_campaign', 'at_custom1', 'at_custom2', 'at_custom3', 'at_custom4'}
+TRACKING_PREFIXES = ('utm_', 'ns_', 'pk_', 'hmb_')
+
+# Query parameters that only ask for the AMP rendering of a page
+AMP_PARAMS = {('amp', ''), ('amp', '1'), ('amp', 'true'), ('outputtype', 'amp'), ('output', 'amp')}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    """Return the clean form of an article URL: the page to fetch and save
+
+    Drops fragments, tracking parameters and default ports, resolves AMP variants to the
+    regular page, lowercases the scheme and host and sorts the query.
+    """
+    parts = urlparse(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    path = parts.path
+
+    # Google AMP cache: https://www-site-com.cdn.ampproject.org/c/s/www.site.com/path
+    if host.endswith('.cdn.ampproject.org'):
+        segments = path.lstrip('/').split('/')
+        if len(segments) >= 3 and segments[0] in ('c', 'v', 'i'):
+            secure = segments[1] == 's'
+            return normalize_url(f"{'https' if secure else 'http'}://{'/'.join(segments[2 if secure else 1:])}"
+                                 + (f"?{parts.query}" if parts.query else ''))
+
+    # AMP subdomains and paths: amp.site.com/x, site.com/amp/x, site.com/x/amp, site.com/x.amp.html
+    if host.startswith('amp.'):
+        host = host[len('amp.'):]
+    if path.startswith('/amp/'):
+        path = path[len('/amp'):]
+    for suffix, replacement in (('/amp/', '/'), ('/amp', '/'), ('.amp.html', '.html'), ('.amp', '')):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)] + replacement
+            break
+
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not is_tracking_param(name) and (name.lower(), value.lower()) not in AMP_PARAMS)
+
+    return urlunparse((
+        scheme,
+        netloc,
+        path or '/',
+        parts.params,
+        urlencode(query),
+        ''  # Fragments never change the article
+    ))
+
+
+def canonical_url(url):
+    """Normalise an article URL so the same article always maps to the same key
+
+    On top of normalize_url, http and https addresses of a page and paths with and
+    without a trailing slash share one key.
+    """
+    parts = urlparse(normalize_url(url))
+    path = parts.path.rstrip('/') or '/'
+    scheme = 'https' if parts.scheme == 'http' else parts.scheme
+    return urlunparse((scheme, parts.netloc, path, parts.params, parts.query, ''))
+
+
+class ScrapeFrontier:
+    """SQLite-backed record of discovered and fetched article URLs"""
+
+    def __init__(self, db_path='news_data/frontier.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url TEXT PRIMARY KEY,
+                    fetch_url TEXT NOT NULL,
+                    newspaper_id TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    title TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    discovered_at TEXT NOT NULL,
+                    fetched_at TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_articles_pending "
+                "ON articles (newspaper_id, category, status)")
+
+    def _now(self):
+        return datetime.now().isoformat(timespec='seconds')
+
+    def has_newspaper(self, newspaper_id):
+        """Return True if any URL of this newspaper has been recorded"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM articles WHERE newspaper_id = ? LIMIT 1", (newspaper_id,)).fetchone()
+        return row is not None
+
+    def seed_from_csv(self, csv_path, newspaper_id):
+        """Mark the articles already saved in an existing CSV file as fetched"""
+        if not os.path.exists(csv_path):
+            return 0
+
+        rows = []
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                if record.get('url'):
+                    rows.append((canonical_url(record['url']), record['url'], newspaper_id, record.get('category', ''),
+                                 record.get('title'), self._now(), self._now()))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO articles "
+                "(url, fetch_url, newspaper_id, category, title, status, discovered_at, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, 'done', ?, ?)", rows)
+        logger.info(f"Seeded frontier with {len(rows)} articles from {csv_path}")
+        return len(rows)
+
+    def add_pending(self, url, newspaper_id, category, title):
+        """Record an article URL about to be fetched unless it is already known
+
+        The canonical form is the key that deduplicates variants of the URL; the URL itself
+        is kept as the address to fetch and save the article under.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO articles (url, fetch_url, newspaper_id, category, title, discovered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), url, newspaper_id, category, title, self._now()))
+
+    def should_fetch(self, url):
+        """Return True if the article has not been saved yet and may still be retried"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, attempts FROM articles WHERE url = ?", (canonical_url(url),)).fetchone()
+        if row is None:
+            return True
+        status, attempts = row
+        return status != 'done' and attempts < MAX_ATTEMPTS
+
+    def pending(self, newspaper_id, category):
+        """Return the URLs discovered by an earlier run that were never fetched, as they were found"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fetch_url, title FROM articles "
+                "WHERE newspaper_id = ? AND category = ? AND status != 'done' AND attempts < ? "
+                "ORDER BY discovered_at",
+                (newspaper_id, category, MAX_ATTEMPTS)).fetchall()
+        return [{'url': url, 'title': title} for url, title in rows]
+
+    def failed(self, newspaper_id):
+        """Return articles whose content could not be extracted, with their category"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fetch_url, category, title FROM articles "
+                "WHERE newspaper_id = ? AND status = 'failed' "
+                "ORDER BY discovered_at",
+                (newspaper_id,)).fetchall()
+        return [{'url': url, 'category': category, 'title': title} for url, category, title in rows]
+
+    def done_urls(self):
+        """Yield the canonical URL of every article that was saved or deliberately skipped"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM articles WHERE status = 'done'").fetchall()
+        for (url,) in rows:
+            yield url
+
+    def mark_done(self, url):
+        """Record that an article was fetched and saved"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE articles SET status = 'done', attempts = attempts + 1, fetched_at = ? WHERE url = ?",
+                (self._now(), canonical_url(url)))
+
+    def mark_failed(self, url):
+        """Record an unsuccessful fetch so the article is retried a limited number of times"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE articles SET status = 'failed', attempts = attempts + 1, fetched_at = ? WHERE url = ?",
+                (self._now(), canonical_url(url)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,92 @@
+"""
+Persistent Bloom filter of article URLs that have already been fetched
+Membership checks take constant time and the filter has a fixed size, however many URLs
+are added, at the cost of a small false-positive rate (an unseen URL reported as seen).
+The filter is saved to disk so it is shared by every category, newspaper and run.
+"""
+import os
+import math
+import struct
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Magic, number of bits, number of hash functions, number of URLs added, capacity
+HEADER = struct.Struct('<4sQIQQ')
+MAGIC = b'BLM1'
+
+
+class BloomFilter:
+    """Bloom filter sized for `capacity` items at the given false-positive rate"""
+
+    def __init__(self, path='news_data/seen_urls.bloom', capacity=2000000, error_rate=0.001):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            try:
+                self._load(path)
+                return
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable seen-URL filter {path}: {str(e)}")
+
+        self.capacity = capacity
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            magic, num_bits, num_hashes, count, capacity = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("not a Bloom filter file")
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("truncated Bloom filter file")
+        self.num_bits, self.num_hashes, self.count, self.capacity = num_bits, num_hashes, count, capacity
+        self._bits = bits
+
+    def _positions(self, key):
+        # Double hashing: k positions from two independent 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        h2 |= 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        positions = self._positions(key)
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+    def add(self, key):
+        """Add a key; returns True if it was (probably) not in the filter before"""
+        positions = self._positions(key)
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self._bits[position >> 3] & mask:
+                    self._bits[position >> 3] |= mask
+                    new = True
+            if new:
+                self.count += 1
+                if self.count == self.capacity + 1:
+                    logger.warning(f"Seen-URL filter holds more than its capacity of {self.capacity} URLs; "
+                                   f"false positives will rise, recreate it with a larger capacity")
+        return new
+
+    def __len__(self):
+        return self.count
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = HEADER.pack(MAGIC, self.num_bits, self.num_hashes, self.count, self.capacity) + bytes(self._bits)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,139 @@
+"""
+Per-newspaper hit and yield statistics for the article content selectors
+The scraper records which selectors matched and which one produced the saved content,
+and tries the selectors in order of their learned win rate so the usual winner is
+evaluated first. Run this module to print a report of the collected statistics.
+"""
+import os
+import json
+import argparse
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Names under which the generic fallback passes of the content extraction are recorded
+CONTAINER_FALLBACK = '(fallback) article containers'
+PARAGRAPH_FALLBACK = '(fallback) all paragraphs'
+
+# A selector evaluated on this many pages without ever matching is reported as dead
+DEAD_AFTER = 20
+
+
+class SelectorStats:
+    """Selector statistics keyed by newspaper name and selector, persisted between runs
+
+    For every selector it counts the pages it was tried on, the pages it matched at
+    least one element on, the pages whose saved content it produced and the characters
+    it yielded when it matched.
+    """
+
+    def __init__(self, path='news_data/selector_stats.json'):
+        self.path = path
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._stats = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable selector statistics {path}: {str(e)}")
+
+    @staticmethod
+    def score(counts):
+        """Smoothed win rate; selectors that were never tried score 0.5"""
+        return (counts['wins'] + 1) / (counts['tried'] + 2)
+
+    def order(self, newspaper):
+        """Return the newspaper's content selectors, most likely winner first
+
+        Ties keep the configured order, so a newspaper without statistics is unaffected.
+        """
+        selectors = newspaper['content_selector'].split(', ')
+        with self._lock:
+            stats = self._stats.get(newspaper['name'], {})
+            scores = {selector: self.score(stats[selector]) if selector in stats else 0.5
+                      for selector in selectors}
+        return sorted(selectors, key=lambda selector: -scores[selector])
+
+    def record(self, newspaper_name, trace):
+        """Add the trace of one extraction: {'tried': [(selector, matched, chars)], 'winner': selector}"""
+        with self._lock:
+            stats = self._stats.setdefault(newspaper_name, {})
+            for selector, matched, chars in trace['tried']:
+                counts = stats.setdefault(selector, {'tried': 0, 'hits': 0, 'wins': 0, 'chars': 0})
+                counts['tried'] += 1
+                if matched:
+                    counts['hits'] += 1
+                    counts['chars'] += chars
+            if trace['winner'] is not None:
+                stats[trace['winner']]['wins'] += 1
+
+    def report(self):
+        """Return {newspaper: [row per selector]} sorted by win rate, with hit rate and average yield"""
+        with self._lock:
+            stats = json.loads(json.dumps(self._stats))
+
+        report = {}
+        for newspaper_name, selectors in sorted(stats.items()):
+            rows = []
+            for selector, counts in selectors.items():
+                rows.append({
+                    'selector': selector,
+                    'tried': counts['tried'],
+                    'hit_rate': round(counts['hits'] / counts['tried'], 3) if counts['tried'] else 0.0,
+                    'win_rate': round(counts['wins'] / counts['tried'], 3) if counts['tried'] else 0.0,
+                    'avg_chars': round(counts['chars'] / counts['hits']) if counts['hits'] else 0,
+                    'dead': counts['tried'] >= DEAD_AFTER and counts['hits'] == 0
+                })
+            report[newspaper_name] = sorted(rows, key=lambda row: (-row['win_rate'], -row['hit_rate']))
+        return report
+
+    def dead_selectors(self):
+        """Return {newspaper: [selectors that never matched]}"""
+        return {newspaper_name: [row['selector'] for row in rows if row['dead']]
+                for newspaper_name, rows in self.report().items()
+                if any(row['dead'] for row in rows)}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._stats, indent=2)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def print_report(stats):
+    for newspaper_name, rows in stats.report().items():
+        print(f"\n{newspaper_name}")
+        print(f"  {'selector':<45} {'tried':>6} {'hit %':>6} {'win %':>6} {'avg chars':>9}")
+        for row in rows:
+            flag = '  DEAD' if row['dead'] else ''
+            print(f"  {row['selector'][:45]:<45} {row['tried']:>6} {row['hit_rate']:>6.0%} "
+                  f"{row['win_rate']:>6.0%} {row['avg_chars']:>9}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the learned content selector statistics")
+    parser.add_argument('--stats', default='news_data/selector_stats.json',
+                        help="Statistics file written by the scraper")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.stats):
+        print(f"No selector statistics found at {args.stats}; run the scraper first")
+        return
+
+    stats = SelectorStats(args.stats)
+    if args.json:
+        print(json.dumps(stats.report(), indent=2))
+    else:
+        print_report(stats)
+
+
+if __name__ == "__main__":
+    main()
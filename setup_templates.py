@@ -162,7 +162,14 @@ def setup_templates():
                 <tbody>
                     {% for article in articles %}
                     <tr>
-                        <td>{{ article.title }}</td>
+                        <td>
+                            {{ article.title }}
+                            {% if article.snippet %}<div class="small text-muted">{{ article.snippet }}</div>{% endif %}
+                            {% if article.content_hash %}
+                            <button class="btn btn-link btn-sm p-0 show-text" data-hash="{{ article.content_hash }}">Show full text</button>
+                            <div class="article-text small" style="display: none; white-space: pre-wrap;"></div>
+                            {% endif %}
+                        </td>
                         <td>{{ article.newspaper }}</td>
                         <td>{{ article.category }}</td>
                         <td><a href="{{ article.url }}" target="_blank">Read Article</a></td>
@@ -172,6 +179,27 @@ def setup_templates():
             </table>
         </div>
     </div>
+
+    <script>
+        // Article texts are only downloaded when a reader asks for them
+        document.querySelectorAll('.show-text').forEach(button => {
+            button.addEventListener('click', () => {
+                const text = button.nextElementSibling;
+                if (text.dataset.loaded) {
+                    text.style.display = text.style.display === 'none' ? 'block' : 'none';
+                    return;
+                }
+                fetch('/api/body/' + button.dataset.hash)
+                    .then(response => response.ok ? response.json() : Promise.reject(response.status))
+                    .then(data => { text.textContent = data.content; })
+                    .catch(() => { text.textContent = 'The full text of this article is not available.'; })
+                    .finally(() => {
+                        text.dataset.loaded = 'true';
+                        text.style.display = 'block';
+                    });
+            });
+        });
+    </script>
 </body>
 </html>"""
 
@@ -0,0 +1,138 @@
+"""
+Byte-capped streaming download of article pages
+The body is read in chunks and fed to an incremental HTML parser that watches the
+container of the content selector extraction will try first. Reading stops as soon as
+that container has been received in full, or when the site's byte cap is reached, so
+the scripts, comments and related-article blocks after the article are never downloaded.
+A body that was not read to the end is only a prefix of the page and must not be archived.
+"""
+import codecs
+import logging
+from html.parser import HTMLParser
+
+import soupsieve
+from bs4 import Tag
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGE_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 16 * 1024
+
+# Elements that never have an end tag
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                 'param', 'source', 'track', 'wbr'}
+
+
+def split_outer_compound(selector):
+    """Split a selector into its outermost compound and the rest, e.g. 'div.a p' -> ('div.a', 'p')"""
+    depth = 0
+    quote = None
+    for i, char in enumerate(selector):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        elif depth == 0 and (char.isspace() or char in '>+~'):
+            return selector[:i], selector[i:].strip(' >+~')
+    return selector, ''
+
+
+class ContentProbe(HTMLParser):
+    """Incremental parser that notices when an article's content container is complete
+
+    Only selectors of the form '<container> <descendants>' can be probed: once the first
+    container element has been closed with at least `min_chars` characters of text,
+    everything the selector can match in it has been received. Selectors without a
+    container (e.g. 'div.paragraph') match many sibling elements and are never probed.
+    """
+
+    def __init__(self, selector, min_chars=100):
+        super().__init__(convert_charrefs=True)
+        container, rest = split_outer_compound(selector.strip())
+        self.container = soupsieve.compile(container) if rest else None
+        self.min_chars = min_chars
+        self.done = False
+        # Open container elements: [tag name, nesting depth of that tag, characters of text]
+        self._open = []
+
+    @property
+    def enabled(self):
+        return self.container is not None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done or tag in VOID_ELEMENTS:
+            return
+        for entry in self._open:
+            if entry[0] == tag:
+                entry[1] += 1
+        try:
+            matched = self.container.match(Tag(name=tag, attrs={name: value or '' for name, value in attrs}))
+        except Exception:
+            matched = False
+        if matched:
+            self._open.append([tag, 1, 0])
+
+    def handle_endtag(self, tag):
+        for entry in list(self._open):
+            if entry[0] != tag:
+                continue
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._open.remove(entry)
+                if entry[2] >= self.min_chars:
+                    self.done = True
+
+    def handle_data(self, data):
+        if self._open:
+            length = len(data.strip())
+            for entry in self._open:
+                entry[2] += length
+
+
+def read_article_body(response, selector, max_bytes=DEFAULT_MAX_PAGE_BYTES, min_chars=100):
+    """Read a streamed response until the content container is complete or `max_bytes` is reached
+
+    `selector` is the content selector extraction will try first, or None to only apply
+    the byte cap. Returns (body bytes, stats) where stats has the decoded bytes read, the
+    wire bytes left unread when the Content-Length is known, and why reading stopped
+    ('complete', 'content' or 'byte_cap'). The response is closed.
+    """
+    probe = ContentProbe(selector, min_chars) if selector else None
+    if probe is not None and not probe.enabled:
+        probe = None
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+
+    chunks = []
+    bytes_read = 0
+    stopped = 'complete'
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            bytes_read += len(chunk)
+            if bytes_read >= max_bytes:
+                stopped = 'byte_cap'
+                break
+            if probe is not None:
+                probe.feed(decoder.decode(chunk))
+                if probe.done:
+                    stopped = 'content'
+                    break
+
+        bytes_saved = 0
+        content_length = response.headers.get('Content-Length', '')
+        if stopped != 'complete' and content_length.isdigit() and hasattr(response.raw, 'tell'):
+            bytes_saved = max(0, int(content_length) - response.raw.tell())
+            if stopped == 'content' and not bytes_saved:
+                # The container closed in the last chunk, so the whole page was read after all
+                stopped = 'complete'
+    finally:
+        # Closing an unfinished response drops its connection instead of draining the rest
+        response.close()
+
+    body = b''.join(chunks)[:max_bytes]
+    return body, {'bytes_read': min(bytes_read, max_bytes), 'bytes_saved': bytes_saved, 'stopped': stopped}
@@ -0,0 +1,270 @@
+"""
+Request and parse telemetry for the newspaper scraper
+Times the phases of every request (DNS lookup, connect including TLS, time to first byte,
+body download) and of every parse, and counts status codes, response sizes and article
+yield per newspaper and category. Results go into the JSON run summary and a Prometheus
+text file that the node_exporter textfile collector can pick up.
+"""
+import os
+import time
+import socket
+import threading
+import contextlib
+import logging
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('dns', 'connect', 'ttfb', 'download', 'parse')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Connection timings of the request in progress on each thread
+_connection_timings = threading.local()
+
+
+def reset_connection_timings():
+    _connection_timings.dns = 0.0
+    _connection_timings.connect = 0.0
+
+
+def connection_timings():
+    """Return (dns seconds, connect seconds) spent by this thread since the last reset"""
+    return getattr(_connection_timings, 'dns', 0.0), getattr(_connection_timings, 'connect', 0.0)
+
+
+class TimedConnectionMixin:
+    """Records DNS and connect time of new connections; reused keep-alive connections cost neither"""
+
+    def _new_conn(self):
+        # Resolve once here so the lookup can be timed, then connect to the resolved address
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            address = None  # Let urllib3 raise its usual resolution error
+        _connection_timings.dns = getattr(_connection_timings, 'dns', 0.0) + time.perf_counter() - start
+
+        if address is not None:
+            self._dns_host = address
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        start = time.perf_counter()
+        dns_before = getattr(_connection_timings, 'dns', 0.0)
+        super().connect()
+        dns = getattr(_connection_timings, 'dns', 0.0) - dns_before
+        _connection_timings.connect = getattr(_connection_timings, 'connect', 0.0) + \
+            time.perf_counter() - start - dns
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def instrument_adapter(adapter):
+    """Make a requests HTTPAdapter open connections that record their DNS and connect time"""
+    adapter.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                  'https': TimedHTTPSConnectionPool}
+    return adapter
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 4),
+                'mean': round(self.sum / self.count, 4) if self.count else 0.0}
+
+
+class Telemetry:
+    """Thread-safe metrics labelled by newspaper, category and page type
+
+    The labels of a measurement come from scope() blocks entered on the measuring thread,
+    so code deep in the request path does not need to know which category it serves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scope = threading.local()
+        self.started_at = time.time()
+        # (newspaper, category, page_type, phase) -> Histogram
+        self.timings = {}
+        # (newspaper, category, page_type, status) -> count
+        self.responses = {}
+        # (newspaper, category, page_type) -> [decoded bytes, wire bytes]
+        self.sizes = {}
+        # (newspaper, category) -> {'links', 'fetched', 'saved'}
+        self.yields = {}
+
+    @contextlib.contextmanager
+    def scope(self, **labels):
+        """Label every measurement made on this thread inside the block"""
+        previous = getattr(self._scope, 'labels', {})
+        self._scope.labels = dict(previous, **labels)
+        try:
+            yield
+        finally:
+            self._scope.labels = previous
+
+    def _labels(self, page_type=None):
+        labels = getattr(self._scope, 'labels', {})
+        return (labels.get('newspaper', ''), labels.get('category', ''),
+                page_type or labels.get('page_type', ''))
+
+    def _observe(self, key, phase, seconds):
+        histogram = self.timings.get(key + (phase,))
+        if histogram is None:
+            histogram = self.timings[key + (phase,)] = Histogram()
+        histogram.observe(max(0.0, seconds))
+
+    def record_request(self, response, total_seconds):
+        """Record a finished request; `response` is None when it failed without one"""
+        key = self._labels()
+        dns, connect = connection_timings()
+        status = str(response.status_code) if response is not None else 'error'
+
+        with self._lock:
+            self.responses[key + (status,)] = self.responses.get(key + (status,), 0) + 1
+            if response is None:
+                return
+            elapsed = getattr(response, 'elapsed', None)
+            # requests measures `elapsed` up to the parsed headers; the rest is the body download
+            headers_seconds = elapsed.total_seconds() if elapsed is not None else total_seconds
+            self._observe(key, 'dns', dns)
+            self._observe(key, 'connect', connect)
+            self._observe(key, 'ttfb', headers_seconds - dns - connect)
+            self._observe(key, 'download', total_seconds - headers_seconds)
+
+            size = len(response.content or b'')
+            raw = getattr(response, 'raw', None)
+            wire = raw.tell() if hasattr(raw, 'tell') else size
+            sizes = self.sizes.setdefault(key, [0, 0])
+            sizes[0] += size
+            sizes[1] += wire
+
+    def record_parse(self, page_type, seconds):
+        with self._lock:
+            self._observe(self._labels(page_type), 'parse', seconds)
+
+    def record_yield(self, links=0, fetched=0, saved=0):
+        """Count links discovered, article pages fetched and articles saved for the current category"""
+        newspaper, category, _ = self._labels()
+        with self._lock:
+            counts = self.yields.setdefault((newspaper, category), {'links': 0, 'fetched': 0, 'saved': 0})
+            counts['links'] += links
+            counts['fetched'] += fetched
+            counts['saved'] += saved
+
+    def summary(self):
+        """Return the metrics as nested dicts: newspaper -> category -> values"""
+        result = {}
+        with self._lock:
+            for (newspaper, category, page_type, phase), histogram in self.timings.items():
+                entry = result.setdefault(newspaper, {}).setdefault(category, {})
+                entry.setdefault('timings', {}).setdefault(page_type, {})[phase] = histogram.as_dict()
+            for (newspaper, category, page_type, status), count in self.responses.items():
+                entry = result.setdefault(newspaper, {}).setdefault(category, {})
+                entry.setdefault('status_codes', {}).setdefault(page_type, {})[status] = count
+            for (newspaper, category, page_type), (size, wire) in self.sizes.items():
+                entry = result.setdefault(newspaper, {}).setdefault(category, {})
+                entry.setdefault('bytes', {})[page_type] = {'decoded': size, 'wire': wire}
+            for (newspaper, category), counts in self.yields.items():
+                entry = result.setdefault(newspaper, {}).setdefault(category, {})
+                entry['yield'] = dict(counts, ratio=round(counts['saved'] / counts['fetched'], 3)
+                                      if counts['fetched'] else 0.0)
+        return {'duration_seconds': round(time.time() - self.started_at, 1), 'newspapers': result}
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        def labels(newspaper, category, page_type=None, **extra):
+            pairs = [('newspaper', newspaper), ('category', category)]
+            if page_type is not None:
+                pairs.append(('page_type', page_type))
+            pairs.extend(extra.items())
+            return ','.join(f'{name}="{escape(value)}"' for name, value in pairs)
+
+        lines = []
+        with self._lock:
+            for phase in PHASES:
+                name = f'scraper_{phase}_seconds'
+                lines.append(f'# HELP {name} Time spent in the {phase} phase')
+                lines.append(f'# TYPE {name} histogram')
+                for (newspaper, category, page_type, key_phase), histogram in sorted(self.timings.items()):
+                    if key_phase != phase:
+                        continue
+                    base = labels(newspaper, category, page_type)
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{base},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{base}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{base}}} {histogram.count}')
+
+            lines.append('# HELP scraper_responses_total Responses by status code ("error" if none arrived)')
+            lines.append('# TYPE scraper_responses_total counter')
+            for (newspaper, category, page_type, status), count in sorted(self.responses.items()):
+                lines.append(f'scraper_responses_total{{{labels(newspaper, category, page_type, status=status)}}} '
+                             f'{count}')
+
+            lines.append('# HELP scraper_response_bytes_total Response body bytes after decompression')
+            lines.append('# TYPE scraper_response_bytes_total counter')
+            for (newspaper, category, page_type), (size, _) in sorted(self.sizes.items()):
+                lines.append(f'scraper_response_bytes_total{{{labels(newspaper, category, page_type)}}} {size}')
+            lines.append('# HELP scraper_wire_bytes_total Response body bytes as received')
+            lines.append('# TYPE scraper_wire_bytes_total counter')
+            for (newspaper, category, page_type), (_, wire) in sorted(self.sizes.items()):
+                lines.append(f'scraper_wire_bytes_total{{{labels(newspaper, category, page_type)}}} {wire}')
+
+            for field, help_text in (('links', 'Article links discovered'),
+                                     ('fetched', 'Article pages downloaded'),
+                                     ('saved', 'Articles saved')):
+                name = f'scraper_articles_{field}_total'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (newspaper, category), counts in sorted(self.yields.items()):
+                    lines.append(f'{name}{{{labels(newspaper, category)}}} {counts[field]}')
+
+        lines.append('# HELP scraper_last_run_timestamp_seconds When the scrape finished')
+        lines.append('# TYPE scraper_last_run_timestamp_seconds gauge')
+        lines.append(f'scraper_last_run_timestamp_seconds {time.time():.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text file atomically so a collector never reads half a file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(path + '.tmp', path)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,258 @@
+"""
+Shared work queue and article sink for distributed scraping
+Category pages and article URLs are queued as tasks that workers lease, process and
+acknowledge. A lease that is not acknowledged in time (the worker crashed or hung) expires
+and the task is handed to another worker. Leases also enforce per-host politeness across
+every worker: a task is only leased once its host's next request slot has come up.
+
+SQLiteWorkQueue keeps everything in one SQLite file, which serves any number of worker
+processes on one machine (or on machines sharing a filesystem with working locks). A
+networked store only needs to implement the WorkQueue methods.
+"""
+import os
+import csv
+import time
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+from scrape_frontier import canonical_url
+from article_record import ARTICLE_COLUMNS
+from body_store import BodyStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: the sink is only safe for threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Tasks that fail this many times are given up
+MAX_ATTEMPTS = 3
+
+CSV_COLUMNS = ARTICLE_COLUMNS
+
+
+class WorkQueue(ABC):
+    """Interface of a leased task queue
+
+    Tasks are dicts with id, kind ('category' or 'article'), url, newspaper_id, category,
+    title, host and attempts.
+    """
+
+    @abstractmethod
+    def add_categories(self, newspaper_id, categories):
+        """Queue the category pages of a newspaper ({category: [urls]}); finished ones are queued again"""
+
+    @abstractmethod
+    def add_articles(self, newspaper_id, category, links, limit=None):
+        """Queue article links ([{'url', 'title'}]) not seen before; returns how many were added"""
+
+    @abstractmethod
+    def lease(self, worker_id):
+        """Lease the next task whose host may be contacted now, or return None"""
+
+    @abstractmethod
+    def ack(self, task_id, worker_id):
+        """Mark a leased task as done"""
+
+    @abstractmethod
+    def fail(self, task_id, worker_id):
+        """Return a leased task to the queue, or give it up after MAX_ATTEMPTS"""
+
+    @abstractmethod
+    def defer_host(self, host, seconds):
+        """Keep every worker away from a host for `seconds` (e.g. after a Retry-After)"""
+
+    @abstractmethod
+    def drained(self):
+        """Return True when no task is waiting or leased"""
+
+    @abstractmethod
+    def counts(self):
+        """Return {kind: {status: count}}"""
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """WorkQueue stored in a SQLite database shared by every worker process
+
+    Leasing runs in an immediate transaction, so two workers never lease the same task.
+    Each lease of a host moves its next allowed request `host_delay` seconds ahead.
+    """
+
+    def __init__(self, db_path='news_data/work_queue.db', lease_seconds=120, host_delay=1.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.host_delay = host_delay
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode, transactions are started explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    url_key TEXT NOT NULL UNIQUE,
+                    url TEXT NOT NULL,
+                    newspaper_id TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    title TEXT,
+                    host TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'ready',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, host)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host TEXT PRIMARY KEY,
+                    next_allowed REAL NOT NULL
+                )
+            """)
+
+    def _transaction(self, work):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add_categories(self, newspaper_id, categories):
+        rows = [('category', canonical_url(url), url, newspaper_id, category, None, urlparse(url).netloc, time.time())
+                for category, urls in categories.items() for url in urls]
+
+        def work(conn):
+            conn.executemany("""
+                INSERT INTO tasks (kind, url_key, url, newspaper_id, category, title, host, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url_key) DO UPDATE SET status = 'ready', attempts = 0
+                WHERE tasks.status IN ('done', 'failed')
+            """, rows)
+        self._transaction(work)
+        return len(rows)
+
+    def add_articles(self, newspaper_id, category, links, limit=None):
+        def work(conn):
+            added = 0
+            for link in links:
+                if limit is not None and added >= limit:
+                    break
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO tasks (kind, url_key, url, newspaper_id, category, title, host, created_at)
+                    VALUES ('article', ?, ?, ?, ?, ?, ?, ?)
+                """, (canonical_url(link['url']), link['url'], newspaper_id, category, link['title'],
+                      urlparse(link['url']).netloc, time.time()))
+                added += cursor.rowcount
+            return added
+        return self._transaction(work)
+
+    def lease(self, worker_id):
+        def work(conn):
+            now = time.time()
+            # Hand out tasks whose worker died again
+            conn.execute("UPDATE tasks SET status = 'ready', lease_owner = NULL "
+                         "WHERE status = 'leased' AND lease_expires < ?", (now,))
+            # Articles first, so discovered work is finished before more is discovered
+            row = conn.execute("""
+                SELECT tasks.* FROM tasks LEFT JOIN hosts ON hosts.host = tasks.host
+                WHERE tasks.status = 'ready' AND COALESCE(hosts.next_allowed, 0) <= ?
+                ORDER BY tasks.kind = 'article' DESC, tasks.id
+                LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ? WHERE id = ?",
+                         (worker_id, now + self.lease_seconds, row['id']))
+            conn.execute("""
+                INSERT INTO hosts (host, next_allowed) VALUES (?, ?)
+                ON CONFLICT (host) DO UPDATE SET next_allowed = MAX(hosts.next_allowed, excluded.next_allowed)
+            """, (row['host'], now + self.host_delay))
+            return dict(row)
+        return self._transaction(work)
+
+    def ack(self, task_id, worker_id):
+        def work(conn):
+            conn.execute("UPDATE tasks SET status = 'done', attempts = attempts + 1, lease_owner = NULL "
+                         "WHERE id = ? AND status = 'leased' AND lease_owner = ?", (task_id, worker_id))
+        self._transaction(work)
+
+    def fail(self, task_id, worker_id):
+        def work(conn):
+            conn.execute("""
+                UPDATE tasks SET attempts = attempts + 1, lease_owner = NULL,
+                    status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'ready' END
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (MAX_ATTEMPTS, task_id, worker_id))
+        self._transaction(work)
+
+    def defer_host(self, host, seconds):
+        def work(conn):
+            conn.execute("""
+                INSERT INTO hosts (host, next_allowed) VALUES (?, ?)
+                ON CONFLICT (host) DO UPDATE SET next_allowed = MAX(hosts.next_allowed, excluded.next_allowed)
+            """, (host, time.time() + seconds))
+        self._transaction(work)
+
+    def drained(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tasks WHERE status IN ('ready', 'leased') LIMIT 1").fetchone()
+        return row is None
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status").fetchall()
+        counts = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CSVArticleSink:
+    """Appends scraped articles to the per-newspaper CSV files shared by all workers
+
+    Each write holds an exclusive lock on the file, so rows from different processes never
+    interleave. Bodies go to the shared body store in data_dir/bodies, which needs no lock.
+    """
+
+    def __init__(self, data_dir='news_data', bodies=None):
+        self.data_dir = data_dir
+        self.bodies = bodies or BodyStore(os.path.join(data_dir, 'bodies'))
+        self._lock = threading.Lock()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def write(self, newspaper_id, article):
+        if article.get('content'):
+            self.bodies.put(article['content'], article.get('content_hash'))
+        csv_filename = os.path.join(self.data_dir, f"{newspaper_id}.csv")
+        with self._lock, open(csv_filename, 'a', newline='', encoding='utf-8') as csv_file:
+            if fcntl is not None:
+                fcntl.flock(csv_file.fileno(), fcntl.LOCK_EX)
+            try:
+                # Only the first writer of an empty file adds the header
+                if csv_file.seek(0, os.SEEK_END) == 0:
+                    csv.writer(csv_file).writerow(CSV_COLUMNS)
+                csv.writer(csv_file).writerow([article[column] for column in CSV_COLUMNS])
+                csv_file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(csv_file.fileno(), fcntl.LOCK_UN)
@@ -75,7 +75,8 @@ def install_dependencies():
         "pandas",
         "scikit-learn",
         "pillow",
-        "numpy"
+        "numpy",
+        "pyarrow"
     ]
 
     for package in packages:
@@ -103,18 +104,17 @@ def run_web_scraper():
     if success:
         print("\n✓ Web scraping complete.")
 
-        # Verify that data was collected
-        if os.path.exists("news_data/all_articles.csv"):
-            import pandas as pd
-            try:
-                df = pd.read_csv("news_data/all_articles.csv")
-                print(f"✓ Successfully collected {len(df)} articles.")
-            except Exception as e:
-                print(f"✗ Error reading scraped data: {str(e)}")
-                return False
-        else:
+        # Verify that data was collected; the article store is counted from its metadata
+        from article_store import count_articles
+        try:
+            count = count_articles("news_data/all_articles.csv")
+        except Exception as e:
+            print(f"✗ Error reading scraped data: {str(e)}")
+            return False
+        if count is None:
             print("✗ No data was collected. Check the logs for errors.")
             return False
+        print(f"✓ Successfully collected {count} articles.")
 
         return True
     else: